@@ -10,17 +10,100 @@
 그리고 사용자에게 CBL, 전력 절감량을 제시하여 전력절감에 도움을 준다.
 """
 
-from flask import Flask, request, jsonify
+import json
+from datetime import datetime
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_restful import Api
 
 import common.model_training as mt
 import common.data_load as dl
 import common.ai as ai
 import common.dr as dr
+import common.schedule_store as schedule_store
+import common.jobs as jobs
+from routes import metrics, profiling, settings
 
 app = Flask(__name__)
 api = Api(app)
 
+# 응답 JSON 변환 시간도 단계로 측정
+jsonify = metrics.timed("serialize")(jsonify)
+
+
+def _route_name():
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+@app.before_request
+def begin_metrics():
+    metrics.begin(_route_name())
+
+
+@app.after_request
+def defer_metrics(response):
+    # 스트리밍 응답(/label_batch)은 전송이 끝날 때 요청 처리시간을 집계
+    if response.is_streamed:
+        g.metrics_streamed = True
+        response.call_on_close(metrics.end)
+    return response
+
+
+@app.teardown_request
+def end_metrics(error=None):
+    if error is not None:
+        metrics.count_error(error)
+    if not g.get("metrics_streamed"):
+        metrics.end()
+
+
+# 프로파일링을 사용하지 않으면 hook을 등록하지 않는다 (routes.profiling 참고)
+if profiling.ENABLED:
+
+    @app.before_request
+    def begin_profile():
+        reason = profiling.requested(request.headers.get(profiling.HEADER))
+        if reason:
+            g.profile = profiling.start(reason)
+
+    @app.after_request
+    def save_profile(response):
+        # 스트리밍 응답은 응답 생성까지만 프로파일링된다
+        profile = g.pop("profile", None)
+        if profile is not None:
+            duration = profile.stop()
+            body = request.get_json(silent=True) or {}
+            target = body.get("device_id") or body.get("house_no")
+            try:
+                response.headers[profiling.HEADER + "-Name"] = profile.save(
+                    _route_name(), target, duration
+                )
+            except Exception as ex:
+                print(f"[profiling] save failed: {ex}")
+        return response
+
+    @app.teardown_request
+    def stop_profile(error=None):
+        # after_request 전에 오류로 종료된 경우
+        profile = g.pop("profile", None)
+        if profile is not None:
+            profile.stop()
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_info():
+    """라우트별, 단계별 처리시간 히스토그램과 오류 건수 (Prometheus text format)
+
+    단계(stage): load_datas, load_arrays, load_csv, model_load, sliding_window,
+    predict, serialize. load_datas의 detail은 쿼리 파일명
+
+        Output example:
+            aihems_stage_duration_seconds_bucket{route="/label",stage="predict",
+                detail="devices",le="0.01"} 12
+            aihems_errors_total{route="/label",exception="KeyError"} 1
+    """
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 
 @app.route("/make_model_status", methods=["POST"])
 def make_model_status():
@@ -29,18 +112,25 @@ def make_model_status():
              XBGboost: 2020.12.24 채택
 
         Input example:
-            {"device_id" : "000D6F000F745CBD1", "is_csv":true}
+            {"device_id" : "000D6F000F745CBD1", "is_csv":true, "is_async":true}
             is_csv : false => 데이터베이스 사용
+            is_async : true => 학습작업을 등록하고 작업ID를 바로 반환 (/job_status로 조회)
 
     Returns:
         string: 분류모델 정보
 
         Output example:
             {
-                "dump_path": "./pickles/devices/000D6F000F745CBD1.pkl",
+                "dump_path": "./pickles/devices/3b/1f/000D6F000F745CBD1/000001.ubj",
                 "flag_success": true,
                 "score": "0.9977365841899287"
             }
+            is_async : true
+            {
+                "flag_success": true,
+                "job_id": "3f2b0c1e9a7d4c6b8e5f0a1d2c3b4a59",
+                "merged": false
+            }
     """
     try:
         device_id = request.json["device_id"]
@@ -50,6 +140,10 @@ def make_model_status():
         except KeyError:
             is_csv = False
 
+        if request.json.get("is_async", False):
+            job_id, merged = jobs.submit("status", device_id, {"is_csv": is_csv})
+            return jsonify({"flag_success": True, "job_id": job_id, "merged": merged})
+
         # model_type: random forest, xgboost classifier
         path, score = mt.make_model_status(
             device_id=device_id, model_type="xgboost classifier", is_csv=is_csv
@@ -63,6 +157,7 @@ def make_model_status():
             }
         )
     except Exception as ex:
+        metrics.count_error(ex)
         return jsonify({"flag_success": False, "error": str(ex)})
 
 
@@ -73,8 +168,9 @@ def make_model_elec():
              XGBboost
 
         POST example:
-            {"house_no":"20190325000002", "is_csv":true}
+            {"house_no":"20190325000002", "is_csv":true, "is_async":true}
             is_csv : false => 데이터베이스 사용
+            is_async : true => 학습작업을 등록하고 작업ID를 바로 반환 (/job_status로 조회)
 
     Returns:
         string: 예측모델 정보
@@ -93,11 +189,96 @@ def make_model_elec():
         except KeyError:
             is_csv = False
 
+        if request.json.get("is_async", False):
+            job_id, merged = jobs.submit("elec", house_no, {"is_csv": is_csv})
+            return jsonify({"flag_success": True, "job_id": job_id, "merged": merged})
+
         # model_type: linear regression, xgboost regressor
         score = mt.make_model_elec(house_no=house_no, is_csv=is_csv)
 
         return jsonify({"flag_success": True, "best_score": str(score)})
     except Exception as ex:
+        metrics.count_error(ex)
+        return jsonify({"flag_success": False, "error": str(ex)})
+
+
+@app.route("/job_status", methods=["POST"])
+def job_status():
+    """학습작업 상태 조회
+
+        POST example:
+            {"job_id":"3f2b0c1e9a7d4c6b8e5f0a1d2c3b4a59"}
+
+    Returns:
+        string: 작업 상태
+
+        Output example:
+            {
+                "flag_success": true,
+                "job_id": "3f2b0c1e9a7d4c6b8e5f0a1d2c3b4a59",
+                "kind": "status",
+                "target": "000D6F000F745CBD1",
+                "state": "running",
+                "progress": 0.3,
+                "message": "fitting",
+                "elapsed": 12.4,
+                ...
+            }
+            state : queued, running, succeeded, failed
+    """
+    try:
+        job = jobs.status(request.json["job_id"])
+        job.pop("result")
+
+        return jsonify({"flag_success": True, **job})
+    except Exception as ex:
+        metrics.count_error(ex)
+        return jsonify({"flag_success": False, "error": str(ex)})
+
+
+@app.route("/job_result", methods=["POST"])
+def job_result():
+    """학습작업 결과 조회
+
+        POST example:
+            {"job_id":"3f2b0c1e9a7d4c6b8e5f0a1d2c3b4a59"}
+
+    Returns:
+        string: 학습 결과 (작업이 완료되지 않았으면 flag_success: false)
+
+        Output example:
+            {
+                "flag_success": true,
+                "job_id": "3f2b0c1e9a7d4c6b8e5f0a1d2c3b4a59",
+                "best_score": "0.9977365841899287",
+                "dump_path": "./pickles/devices/3b/1f/000D6F000F745CBD1/000001.ubj",
+                "elapsed": 95.2
+            }
+    """
+    try:
+        job = jobs.status(request.json["job_id"])
+
+        if job["state"] != "succeeded":
+            return jsonify(
+                {
+                    "flag_success": False,
+                    "job_id": job["job_id"],
+                    "state": job["state"],
+                    "error": job["error"] or f"job is {job['state']}",
+                }
+            )
+
+        return jsonify(
+            {
+                "flag_success": True,
+                "job_id": job["job_id"],
+                "best_score": str(job["result"]["best_score"]),
+                "dump_path": job["result"]["dump_path"],
+                "elapsed": job["elapsed"],
+            }
+        )
+    except Exception as ex:
+        metrics.count_error(ex)
         return jsonify({"flag_success": False, "error": str(ex)})
 
 
@@ -148,8 +329,75 @@ def label():
 
         return jsonify({"flag_success": True, "predicted_status": pred_y})
     except Exception as ex:
+        metrics.count_error(ex)
+        return jsonify({"flag_success": False, "error": str(ex)})
+
+
+@app.route("/label_batch", methods=["POST"])
+def label_batch():
+    """여러 디바이스/일자의 전력 사용상태 라벨링
+    게이트웨이별로 로그를 한번에 조회하고 디바이스별로 결과를 순차 반환
+
+        Input example:
+            {
+                "targets": [
+                    {
+                        "device_id" : "000D6F000F745CBD1",
+                        "gateway_id": "ep18270363",
+                        "collect_date":"20191106"
+                    },
+                    ...
+                ],
+                "is_csv":true
+            }
+            is_csv : false => 데이터베이스 사용
+
+    Returns:
+        string: 디바이스별 일자별 분당 전력 사용상태 (한줄에 한 디바이스, JSON Lines)
+
+        Output example:
+            {"flag_success": true, "device_id": "000D6F000F745CBD1",
+             "gateway_id": "ep18270363",
+             "predicted_status": {"20191106": [0, 0, ...]}}
+            {"flag_success": false, "device_id": "00158D0001A457111",
+             "gateway_id": "ep18270363", "error": "..."}
+    """
+    try:
+        targets = [
+            (target["device_id"], target["gateway_id"], target["collect_date"])
+            for target in request.json["targets"]
+        ]
+
+        # csv를 사용여부를 확인. is_csv의 기본값은 데이터베이스사용(is_csv=Flase)
+        try:
+            is_csv = request.json["is_csv"]
+        except KeyError:
+            is_csv = False
+    except Exception as ex:
+        metrics.count_error(ex)
         return jsonify({"flag_success": False, "error": str(ex)})
 
+    def generate():
+        for device_id, gateway_id, pred_y, error in dl.labeling_batch(
+            targets=targets, is_csv=is_csv
+        ):
+            result = {
+                "flag_success": error is None,
+                "device_id": device_id,
+                "gateway_id": gateway_id,
+            }
+            if error is None:
+                result["predicted_status"] = pred_y
+            else:
+                result["error"] = error
+
+            with metrics.span("serialize"):
+                line = json.dumps(result) + "\n"
+
+            yield line
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
 
 @app.route("/elec", methods=["POST"])
 def elec():
@@ -193,6 +441,7 @@ def elec():
 
         return jsonify({"flag_success": True, "predict_use_energy": pred_y})
     except Exception as ex:
+        metrics.count_error(ex)
         return jsonify({"flag_success": False, "error": str(ex)})
 
 
@@ -200,6 +449,9 @@ def elec():
 def ai_schedule():
     """디바이스의 요일별 차단 차단 스케줄을 반환
 
+    일괄 생성(common.schedule_batch)된 당일 스케줄이 있으면 저장된 결과를 반환하고
+    없으면 바로 생성한다. generated_at은 스케줄 생성일시
+
     Returns:
         string: 요일별 전력 차단 스케줄을 JSON형식으로 반환
     """
@@ -207,7 +459,17 @@ def ai_schedule():
         device_id = request.json["device_id"]
         gateway_id = request.json["gateway_id"]
 
-        weeks = dl.check_weeks(device_id, gateway_id)
+        # 일괄 생성된 당일 스케줄이 있으면 사용
+        elec_df, generated_at = schedule_store.load_schedule(device_id)
+
+        if elec_df is None:
+            # 적재기간과 스케줄 데이터(항상 켜짐 여부, 필요하면 로그)를 동시에 조회
+            weeks, (always_on, logs) = settings.gather(
+                lambda: dl.check_weeks(device_id, gateway_id),
+                lambda: ai.get_schedule_inputs(device_id, gateway_id),
+            )
+        else:
+            weeks = dl.check_weeks(device_id, gateway_id)
 
         if weeks < 4:
             return jsonify(
@@ -217,7 +479,10 @@ def ai_schedule():
                 }
             )
 
-        elec_df = ai.get_ai_schedule(device_id, gateway_id)
+        if elec_df is None:
+            elec_df = ai.build_ai_schedule(always_on, logs)
+            generated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
         elec_df.columns = [
             "dayofweek",
             "time",
@@ -233,10 +498,12 @@ def ai_schedule():
             {
                 "flag_success": True,
                 "device_id": device_id,
+                "generated_at": generated_at,
                 "result": df_elec,
             }
         )
     except Exception as ex:
+        metrics.count_error(ex)
         return jsonify({"flag_success": False, "error": str(ex)})
 
 
@@ -263,6 +530,7 @@ def cbl_info():
             }
         )
     except Exception as ex:
+        metrics.count_error(ex)
         return jsonify({"flag_success": False, "error": str(ex)})
 
 
@@ -294,6 +562,62 @@ def dr_recommandation():
             }
         )
     except Exception as ex:
+        metrics.count_error(ex)
+        return jsonify({"flag_success": False, "error": str(ex)})
+
+
+@app.route("/dr_event", methods=["POST"])
+def dr_event():
+    """DR요청에 참여하는 가구들의 CBL, 전력 절감량, 참여 추천 디바이스
+
+    가구별로 나누지 않고 한번에 조회하며 결과는 DR 종료시까지 캐시한다.
+
+        Input example:
+            {"request_dr_no": "2019102101", "house_nos": ["20180810000001", ...]}
+            house_nos : 생략하면 전체 가구
+
+    Returns:
+        string: 가구별 DR 참여 추천 디바이스 정보
+
+        Output example:
+            {
+                "flag_success": true,
+                "request_dr_no": "2019102101",
+                "results": {
+                    "20180810000001": {
+                        "dr_success": true,
+                        "cbl": "645.202",
+                        "reduction_energy": "171.7803",
+                        "recommendation": {"0": {"device_id": ...}, ...}
+                    },
+                    ...
+                }
+            }
+            recommendation : 참여할 수 없으면 "0", 추천할 디바이스가 없으면 null
+    """
+    try:
+        request_dr_no = request.json["request_dr_no"]
+        house_nos = request.json.get("house_nos")
+
+        results = dr.dr_event(request_dr_no=request_dr_no, house_nos=house_nos)
+
+        return jsonify(
+            {
+                "flag_success": True,
+                "request_dr_no": request_dr_no,
+                "results": {
+                    house_no: {
+                        "dr_success": result["dr_success"],
+                        "cbl": str(result["cbl"]),
+                        "reduction_energy": str(result["reduction_energy"]),
+                        "recommendation": result["recommendation"],
+                    }
+                    for house_no, result in results.items()
+                },
+            }
+        )
+    except Exception as ex:
+        metrics.count_error(ex)
         return jsonify({"flag_success": False, "error": str(ex)})
 
 
@@ -0,0 +1,14 @@
+"""성능 측정
+
+common 모듈의 주요 함수에 대한 벤치마크 모음.
+프로젝트 루트에서 모듈로 실행한다.
+
+    usage example:
+        root> python -m benchmarks.sliding_window
+        root> python -m benchmarks.model_artifacts
+        root> python -m benchmarks.synthetic_data
+        root> python -m benchmarks.suite
+        root> python -m benchmarks.startup
+        root> python -m benchmarks.recommendation
+        root> python -m benchmarks.schedule_regression
+"""
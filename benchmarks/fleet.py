@@ -0,0 +1,89 @@
+"""벤치마크 환경 준비
+
+합성 데이터 DB(benchmarks.synthetic_data)를 data source로 설정하고
+모델 저장소, 학습작업 저장소를 작업 경로로 바꾼 후 첫번째 가구의 디바이스 분류모델과
+가구 예측모델을 학습해둔다. 운영 DB, ./pickles는 사용하지 않는다.
+
+합성 데이터는 어제까지 생성하므로 DB 파일이 오늘 만든 것이 아니면 다시 만든다.
+"""
+import os
+from datetime import datetime, timedelta
+
+import common.jobs as jobs
+import common.model_store as model_store
+import common.model_training as mt
+from benchmarks import synthetic_data
+from routes import datasource, settings
+
+WORK_DIR = "./datas/bench"
+# 디바이스 분류모델 학습 타입
+STATUS_MODEL_TYPE = "xgboost classifier"
+
+
+def prepare(houses=5, devices=4, days=42, seed=0, work_dir=WORK_DIR, train=True):
+    """벤치마크 환경 준비
+
+    Args:
+        houses (int, optional): 가구 수. Defaults to 5.
+        devices (int, optional): 가구당 디바이스 수. Defaults to 4.
+        days (int, optional): 로그 일수 (스케줄 생성에 4주 이상 필요). Defaults to 42.
+        seed (int, optional): 난수 seed. Defaults to 0.
+        work_dir (str, optional): 작업 경로. Defaults to WORK_DIR.
+        train (bool, optional): 첫번째 가구 모델 학습여부. Defaults to True.
+
+    Returns:
+        dictionary: 벤치마크 대상 (가구, 게이트웨이, 디바이스, 일자, DR 요청)
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    path = os.path.join(work_dir, f"fleet_{houses}x{devices}x{days}_{seed}.sqlite")
+    today = datetime.now().strftime("%Y%m%d")
+
+    if (
+        not os.path.exists(path)
+        or datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y%m%d") != today
+    ):
+        print(f"[bench] generating {path}")
+        counts = synthetic_data.generate(
+            path, houses=houses, devices=devices, days=days, seed=seed
+        )
+        print(f"[bench] {counts}")
+
+    settings.set_data_source(datasource.SQLiteDataSource(path))
+    model_store.set_store(
+        model_store.ModelStore(
+            root=os.path.join(work_dir, "pickles"),
+            index_path=os.path.join(work_dir, "pickles", "models.sqlite"),
+        )
+    )
+    jobs.set_manager(jobs.JobManager(path=os.path.join(work_dir, "jobs.sqlite")))
+
+    house_no = synthetic_data.house_no(0)
+    device_ids = [synthetic_data.device_id(0, device) for device in range(devices)]
+
+    if train:
+        trained = model_store.existing("devices", device_ids)
+        for device_id in device_ids:
+            if device_id not in trained:
+                print(f"[bench] training devices/{device_id}")
+                mt.make_model_status(device_id, model_type=STATUS_MODEL_TYPE)
+
+        if not model_store.existing("houses", [house_no]):
+            print(f"[bench] training houses/{house_no}")
+            mt.make_model_elec(house_no)
+
+    label_dates = [
+        (datetime.now() - timedelta(days=d)).strftime("%Y%m%d") for d in (3, 2)
+    ]
+
+    return {
+        "path": path,
+        "houses": houses,
+        "devices": devices,
+        "days": days,
+        "house_no": house_no,
+        "gateway_id": synthetic_data.gateway_id(0),
+        "device_ids": device_ids,
+        "label_dates": label_dates,
+        "today": today,
+        "request_dr_no": synthetic_data.dr_request_no(0, 0),
+    }
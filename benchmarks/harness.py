@@ -0,0 +1,200 @@
+"""벤치마크 측정, 결과 저장, 기준 결과 비교
+
+측정 결과는 케이스별 지연시간 분포(p50/p95/p99 등, ms)와 처리량(초당 호출 수)이며
+JSON으로 저장한다. 기준 결과(baseline)와 비교하여 p50이 TOLERANCE 이상 느려지고
+MIN_REGRESSION_MS 이상 차이가 나면 성능 저하로 판단한다.
+"""
+import json
+import os
+import platform
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+# 성능 저하 판단 기준 (p50 증가율)
+TOLERANCE = 0.2
+# 이보다 작은 차이는 측정 오차로 본다(ms)
+MIN_REGRESSION_MS = 0.5
+
+
+def summarize(samples, elapsed, items=1):
+    """측정시간 요약
+
+    Args:
+        samples (list): 호출별 실행시간(초)
+        elapsed (float): 전체 실행시간(초)
+        items (int, optional): 호출당 처리 건수 (ex. 디바이스 수). Defaults to 1.
+
+    Returns:
+        dictionary: 호출 수, 지연시간(ms) 통계, 처리량
+    """
+    ms = np.asarray(samples) * 1000
+
+    return {
+        "calls": len(ms),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "mean_ms": round(float(ms.mean()), 4),
+        "min_ms": round(float(ms.min()), 4),
+        "max_ms": round(float(ms.max()), 4),
+        "throughput_per_s": round(len(ms) / elapsed, 3),
+        "items_per_s": round(len(ms) * items / elapsed, 3),
+    }
+
+
+def measure(func, repeat=20, warmup=1, concurrency=1, items=1):
+    """함수 실행시간 측정
+
+    Args:
+        func (function): 측정할 함수 (인자 없음)
+        repeat (int, optional): 측정 횟수. Defaults to 20.
+        warmup (int, optional): 측정 전 실행 횟수 (캐시 등). Defaults to 1.
+        concurrency (int, optional): 동시 실행 thread 수. Defaults to 1.
+        items (int, optional): 호출당 처리 건수. Defaults to 1.
+
+    Returns:
+        dictionary: summarize 결과
+    """
+    for _ in range(warmup):
+        func()
+
+    def timed(_):
+        started = time.perf_counter()
+        func()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            samples = list(executor.map(timed, range(repeat)))
+    else:
+        samples = [timed(i) for i in range(repeat)]
+    elapsed = time.perf_counter() - started
+
+    result = summarize(samples, elapsed, items=items)
+    result["concurrency"] = concurrency
+
+    return result
+
+
+def run_cases(group, cases, repeat=20, concurrency=1, only=None):
+    """케이스 목록 측정
+
+    Args:
+        group (str): 케이스 그룹명 (micro, macro)
+        cases (list): (이름, 함수, 옵션) 리스트. 옵션은 measure의 인자 (repeat 등)
+        repeat (int, optional): 기본 측정 횟수. Defaults to 20.
+        concurrency (int, optional): 동시 실행 thread 수. Defaults to 1.
+        only (str, optional): 이름에 이 문자열이 포함된 케이스만 측정.
+            Defaults to None(전체).
+
+    Returns:
+        dictionary: "{그룹}.{이름}"별 측정 결과
+    """
+    results = {}
+
+    for name, func, options in cases:
+        key = f"{group}.{name}"
+        if only and only not in key:
+            continue
+
+        options = dict({"repeat": repeat, "concurrency": concurrency}, **options)
+        try:
+            results[key] = measure(func, **options)
+        except Exception as ex:
+            print(f"[bench] {key} failed: {ex}")
+            results[key] = {"error": str(ex)}
+            continue
+
+        result = results[key]
+        print(
+            f"[bench] {key:<48} p50 {result['p50_ms']:>10.3f}ms "
+            f"p95 {result['p95_ms']:>10.3f}ms p99 {result['p99_ms']:>10.3f}ms "
+            f"{result['throughput_per_s']:>10.1f}/s"
+        )
+
+    return results
+
+
+def environment():
+    """측정 환경 정보"""
+    import pandas as pd
+
+    return {
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def save(path, results, meta=None):
+    """측정 결과를 JSON으로 저장
+
+    Args:
+        path (str): 저장 경로
+        results (dictionary): 케이스별 측정 결과
+        meta (dictionary, optional): 측정 조건 (데이터 크기 등). Defaults to None.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(path, "w") as f:
+        json.dump(
+            {"environment": environment(), "meta": meta or {}, "results": results},
+            f,
+            indent=2,
+            ensure_ascii=False,
+        )
+
+
+def load(path):
+    """저장된 측정 결과 (없으면 None)"""
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """기준 결과와 비교
+
+    Args:
+        results (dictionary): 케이스별 측정 결과
+        baseline (dictionary): 기준 결과 (load 반환값)
+        tolerance (float, optional): 허용 p50 증가율. Defaults to TOLERANCE.
+
+    Returns:
+        list: 성능이 저하된 (케이스, 기준 p50, 현재 p50, 증가율) 리스트
+    """
+    regressions = []
+    base_results = baseline.get("results", {})
+
+    print(f"{'case':<56}{'base p50':>12}{'p50':>12}{'change':>10}")
+    for key, result in results.items():
+        base = base_results.get(key)
+        if base is None or "p50_ms" not in base or "p50_ms" not in result:
+            continue
+
+        change = result["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0
+        regressed = (
+            change > tolerance
+            and result["p50_ms"] - base["p50_ms"] >= MIN_REGRESSION_MS
+        )
+        if regressed:
+            regressions.append((key, base["p50_ms"], result["p50_ms"], change))
+
+        print(
+            f"{key:<56}{base['p50_ms']:>10.3f}ms{result['p50_ms']:>10.3f}ms"
+            f"{change:>+9.1%}{'  REGRESSION' if regressed else ''}"
+        )
+
+    return regressions
@@ -0,0 +1,149 @@
+"""API 라우트별 벤치마크 케이스
+
+Flask test client로 api.py의 모든 라우트를 호출한다. 요청 파싱, JSON 직렬화를
+포함한 요청 단위 지연시간을 측정하며 응답이 실패(flag_success false)이면
+케이스 오류로 기록한다.
+"""
+import json
+import time
+
+# 비동기 학습작업 완료 대기 제한시간(초)
+JOB_TIMEOUT = 600
+# 작업 상태 조회 간격(초)
+JOB_POLL_INTERVAL = 0.2
+# 학습 케이스 측정 횟수
+TRAINING_REPEAT = 3
+
+
+def _post(client, url, body):
+    """POST 요청 후 응답 JSON (실패 응답이면 예외)"""
+    response = client.post(url, json=body)
+    if response.status_code != 200:
+        raise RuntimeError(f"{url}: HTTP {response.status_code}")
+
+    if response.mimetype == "application/x-ndjson":
+        results = [json.loads(line) for line in response.data.splitlines() if line]
+    else:
+        results = [response.get_json()]
+
+    for result in results:
+        if not result.get("flag_success"):
+            raise RuntimeError(f"{url}: {result.get('error')}")
+
+    return results[0]
+
+
+def _async_training(client, device_id):
+    """비동기 학습 등록부터 결과 조회까지"""
+    job_id = _post(
+        client, "/make_model_status", {"device_id": device_id, "is_async": True}
+    )["job_id"]
+
+    deadline = time.perf_counter() + JOB_TIMEOUT
+    while True:
+        state = _post(client, "/job_status", {"job_id": job_id})["state"]
+        if state in ("succeeded", "failed"):
+            break
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"job {job_id} is {state}")
+        time.sleep(JOB_POLL_INTERVAL)
+
+    return _post(client, "/job_result", {"job_id": job_id})
+
+
+def cases(fleet, client):
+    """(이름, 함수, 측정 옵션) 리스트
+
+    Args:
+        fleet (dictionary): benchmarks.fleet.prepare 반환값
+        client (FlaskClient): api.app.test_client()
+
+    Returns:
+        list: 벤치마크 케이스
+    """
+    house_no = fleet["house_no"]
+    gateway_id = fleet["gateway_id"]
+    device_ids = fleet["device_ids"]
+    device_id = device_ids[0]
+    request_dr_no = fleet["request_dr_no"]
+    targets = [
+        {"device_id": device, "gateway_id": gateway_id, "collect_date": collect_date}
+        for device in device_ids
+        for collect_date in fleet["label_dates"]
+    ]
+
+    training = {"repeat": TRAINING_REPEAT, "warmup": 0}
+
+    return [
+        (
+            "/label",
+            lambda: _post(
+                client,
+                "/label",
+                {
+                    "device_id": device_id,
+                    "gateway_id": gateway_id,
+                    "collect_date": fleet["label_dates"][0],
+                },
+            ),
+            {},
+        ),
+        (
+            "/label_batch",
+            lambda: _post(client, "/label_batch", {"targets": targets}),
+            {"items": len(targets)},
+        ),
+        (
+            "/elec",
+            lambda: _post(
+                client, "/elec", {"house_no": house_no, "date": fleet["today"]}
+            ),
+            {},
+        ),
+        (
+            "/schedule",
+            lambda: _post(
+                client, "/schedule", {"device_id": device_id, "gateway_id": gateway_id}
+            ),
+            {},
+        ),
+        (
+            "/cbl_info",
+            lambda: _post(
+                client,
+                "/cbl_info",
+                {"house_no": house_no, "request_dr_no": request_dr_no},
+            ),
+            {},
+        ),
+        (
+            "/dr_recommandation",
+            lambda: _post(
+                client,
+                "/dr_recommandation",
+                {"house_no": house_no, "request_dr_no": request_dr_no},
+            ),
+            {},
+        ),
+        (
+            "/dr_event",
+            lambda: _post(client, "/dr_event", {"request_dr_no": request_dr_no}),
+            {"items": fleet["houses"]},
+        ),
+        ("/metrics", lambda: client.get("/metrics").get_data(), {}),
+        (
+            "/make_model_status",
+            lambda: _post(client, "/make_model_status", {"device_id": device_id}),
+            training,
+        ),
+        (
+            "/make_model_status(async)+/job_status+/job_result",
+            lambda: _async_training(client, device_ids[-1]),
+            training,
+        ),
+        (
+            "/make_model_elec",
+            lambda: _post(client, "/make_model_elec", {"house_no": house_no}),
+            training,
+        ),
+    ]
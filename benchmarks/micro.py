@@ -0,0 +1,183 @@
+"""common 모듈 함수별 벤치마크 케이스
+
+benchmarks.fleet.prepare로 준비한 합성 데이터 환경에서 실행한다.
+학습 함수는 오래 걸리므로 측정 횟수를 줄인다.
+"""
+import numpy as np
+
+import common.ai as ai
+import common.data_load as dl
+import common.dr as dr
+import common.model_store as model_store
+import common.model_training as mt
+import common.relabel_batch as relabel_batch
+import common.schedule_batch as schedule_batch
+import routes.settings as settings
+
+# 학습 케이스 측정 횟수
+TRAINING_REPEAT = 3
+
+
+def cases(fleet):
+    """(이름, 함수, 측정 옵션) 리스트
+
+    Args:
+        fleet (dictionary): benchmarks.fleet.prepare 반환값
+
+    Returns:
+        list: 벤치마크 케이스
+    """
+    house_no = fleet["house_no"]
+    gateway_id = fleet["gateway_id"]
+    device_ids = fleet["device_ids"]
+    device_id = device_ids[0]
+    label_date = fleet["label_dates"][0]
+    request_dr_no = fleet["request_dr_no"]
+    targets = [
+        (device, gateway_id, collect_date)
+        for device in device_ids
+        for collect_date in fleet["label_dates"]
+    ]
+
+    # 메모리상 입력 데이터 (조회시간 제외)
+    rng = np.random.default_rng(0)
+    month = rng.random((1440 * 30, 2)) * 100
+    schedule_logs = ai.get_schedule_logs(device_id, gateway_id)
+    relabel_logs = settings.load_datas(
+        query_file="rl_select_logs.sql",
+        params={
+            "gateway_id": gateway_id,
+            "device_ids": (device_id,),
+            "start_date": fleet["label_dates"][0],
+            "end_date": fleet["label_dates"][-1],
+        },
+    )
+    always_on = {
+        row.device_id: row.always_on
+        for row in settings.load_datas(
+            query_file="ai_select_devices.sql", params={}
+        ).itertuples()
+    }
+
+    training = {"repeat": TRAINING_REPEAT, "warmup": 0}
+
+    return [
+        (
+            "data_load.sliding_window_transform",
+            lambda: dl.sliding_window_transform(month, month[:, 0], step_size=30),
+            {},
+        ),
+        (
+            "data_load.labeling",
+            lambda: dl.labeling(device_id, gateway_id, label_date),
+            {},
+        ),
+        (
+            "data_load.labeling_batch",
+            lambda: list(dl.labeling_batch(targets)),
+            {"items": len(targets)},
+        ),
+        (
+            "data_load.predict_elec",
+            lambda: dl.predict_elec(house_no, fleet["today"]),
+            {},
+        ),
+        (
+            "data_load.check_weeks",
+            lambda: dl.check_weeks(device_id, gateway_id),
+            {},
+        ),
+        ("ai.get_always_on", lambda: ai.get_always_on(device_id), {}),
+        (
+            "ai.get_schedule_logs",
+            lambda: ai.get_schedule_logs(device_id, gateway_id),
+            {},
+        ),
+        (
+            "ai.get_gateway_schedule_logs",
+            lambda: ai.get_gateway_schedule_logs(gateway_id, device_ids),
+            {"items": len(device_ids)},
+        ),
+        ("ai.make_week_schedule", lambda: ai.make_week_schedule(schedule_logs), {}),
+        (
+            "ai.get_one_day_schedule",
+            lambda: ai.get_one_day_schedule(device_id, gateway_id, 1),
+            {},
+        ),
+        (
+            "ai.get_ai_schedule",
+            lambda: ai.get_ai_schedule(device_id, gateway_id),
+            {},
+        ),
+        (
+            "schedule_batch.make_gateway_schedules",
+            lambda: schedule_batch.make_gateway_schedules(
+                gateway_id,
+                [(device, always_on.get(device)) for device in device_ids],
+                fleet["today"],
+            ),
+            {"items": len(device_ids)},
+        ),
+        (
+            "dr.cbl_info",
+            lambda: (dr.clear_cache(), dr.cbl_info(house_no, request_dr_no)),
+            {},
+        ),
+        (
+            "dr.get_dr_recommandation",
+            lambda: (
+                dr.clear_cache(),
+                dr.get_dr_recommandation(house_no, request_dr_no),
+            ),
+            {},
+        ),
+        (
+            "dr.dr_event",
+            lambda: (dr.clear_cache(), dr.dr_event(request_dr_no)),
+            {"items": fleet["houses"]},
+        ),
+        (
+            "model_store.load_model",
+            lambda: model_store.load_model("devices", device_id),
+            {},
+        ),
+        (
+            "model_store.existing",
+            lambda: model_store.existing("devices", device_ids),
+            {},
+        ),
+        (
+            "model_store.current_models",
+            lambda: model_store.current_models("devices", device_ids),
+            {},
+        ),
+        (
+            "relabel_batch.label_device",
+            lambda: relabel_batch.label_device(
+                relabel_logs, fleet["label_dates"][0], fleet["label_dates"][-1]
+            ),
+            {},
+        ),
+        (
+            "model_training.load_status_arrays",
+            lambda: mt.load_status_arrays(device_id),
+            {},
+        ),
+        (
+            "model_training.make_model_status",
+            lambda: mt.make_model_status(
+                device_id, model_type="xgboost classifier", n_jobs=1
+            ),
+            training,
+        ),
+        (
+            "model_training.make_model_status_incremental",
+            lambda: mt.make_model_status_incremental(device_id),
+            training,
+        ),
+        (
+            "model_training.make_model_elec",
+            lambda: mt.make_model_elec(house_no),
+            training,
+        ),
+    ]
@@ -0,0 +1,120 @@
+"""학습모델 파일 형식 벤치마크
+
+이전 형식(GridSearchCV 전체 pickle)과 model_artifact 형식(최적 모델만 저장)의
+디스크 크기와 cold load(캐시 없이 파일에서 읽기) 시간을 비교하고,
+두 형식의 예측 결과가 같은지 확인한다.
+XGBoost 모델은 파일에서 읽은 모델의 학습 파라미터와 증분학습(이어서 학습한 트리)의
+파라미터(max_depth 등)가 설정한 값과 같은지도 확인한다.
+
+    usage example:
+        root> python -m benchmarks.model_artifacts
+"""
+import json
+import os
+import tempfile
+import timeit
+
+import joblib
+import numpy as np
+from sklearn import model_selection
+
+import common.data_load as dl
+import common.model_artifact as model_artifact
+import common.model_training as mt
+from routes import classifications
+
+
+def make_cases(rng, days=30):
+    """(설명, 모델 타입, x, y) 리스트. 디바이스 분류모델은 분단위 days일치"""
+    n = 1440 * days
+    status = rng.integers(0, 2, n)
+    x = np.column_stack([status * 50 + rng.random(n) * 10, rng.random(n) * 100])
+    device_x, device_y = dl.sliding_window_transform(x, status, step_size=30, lag=10)
+
+    house_x = rng.random((365, 7 * 8)) * 1000
+    house_y = house_x[:, -8] + rng.random(365) * 10
+
+    return [
+        ("device", "xgboost classifier", device_x, device_y),
+        ("house", "linear regression", house_x, house_y),
+    ]
+
+
+def fit(model_type, x, y):
+    model, params = classifications.select_classification_model(model_type)
+    gs = model_selection.GridSearchCV(estimator=model, param_grid=params, cv=5)
+    gs.fit(x, y)
+
+    return gs
+
+
+def check_params(model_type, base_path, x, y):
+    """파일에서 읽은 모델과 증분학습한 모델이 설정한 학습 파라미터를 유지하는지 확인"""
+    _, grid = classifications.select_classification_model(model_type)
+    expected = {name: values[0] for name, values in grid.items() if len(values) == 1}
+
+    estimator = model_artifact.load_estimator(base_path)
+    params = estimator.get_params()
+    for name, value in expected.items():
+        assert params[name] == value, f"{name}: loaded {params[name]} != {value}"
+
+    meta = model_artifact.load_meta(base_path)
+    model = mt.fit_incremental(estimator, meta["params"], x, y)
+    # 추가한 트리의 학습 설정 (booster 설정)
+    config = json.loads(model.get_booster().save_config())
+    train_param = config["learner"]["gradient_booster"]["tree_train_param"]
+    for name in ("max_depth", "colsample_bytree", "colsample_bylevel"):
+        assert np.isclose(
+            float(train_param[name]), expected[name]
+        ), f"{name}: continued {train_param[name]} != {expected[name]}"
+
+    rounds = model.get_booster().num_boosted_rounds()
+    assert rounds == expected["n_estimators"] + mt.INCREMENTAL_ESTIMATORS
+
+
+def measure(func, repeat):
+    """최소 실행시간(초)"""
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main(repeat=20):
+    rng = np.random.default_rng(0)
+
+    print(
+        f"{'case':<8}{'pkl(KB)':>10}{'native(KB)':>12}{'pkl load(ms)':>14}"
+        f"{'native load(ms)':>17}{'speedup':>9}"
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, model_type, x, y in make_cases(rng):
+            gs = fit(model_type, x, y)
+
+            pkl_path = os.path.join(tmp_dir, f"{name}.pkl")
+            joblib.dump(gs, pkl_path)
+            base_path = os.path.join(tmp_dir, f"{name}_native")
+            path = model_artifact.save_model(gs, base_path, {"score": gs.best_score_})
+
+            expected = joblib.load(pkl_path).predict(x)
+            actual = model_artifact.load_estimator(base_path).predict(x)
+            assert np.allclose(actual, expected)
+            if model_type.startswith("xgboost"):
+                check_params(model_type, base_path, x, y)
+
+            pkl_size = os.path.getsize(pkl_path)
+            native_size = os.path.getsize(path) + os.path.getsize(
+                model_artifact.meta_path(base_path)
+            )
+            pkl_load = measure(lambda: joblib.load(pkl_path), repeat)
+            native_load = measure(
+                lambda: model_artifact.load_estimator(base_path), repeat
+            )
+
+            print(
+                f"{name:<8}{pkl_size / 1024:>10.1f}{native_size / 1024:>12.1f}"
+                f"{pkl_load * 1000:>14.2f}{native_load * 1000:>17.2f}"
+                f"{pkl_load / native_load:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
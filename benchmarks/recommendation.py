@@ -0,0 +1,139 @@
+"""DR 추천 디바이스 선택 벤치마크
+
+디바이스가 많은 가구들의 조회 결과를 만들어 dr.recommend의 선택 방식(greedy, knapsack)별
+처리시간을 측정하고 가구당 처리시간이 BUDGET_MS를 넘는지 확인한다.
+knapsack은 greedy보다 사용량 합계가 작지 않은지(상한 안에서 더 많이 사용)도 확인한다.
+
+측정 결과는 benchmarks.harness 형식으로 저장하고 기준 결과와 비교한다.
+
+    usage example:
+        root> python -m benchmarks.recommendation --save-baseline
+        root> python -m benchmarks.recommendation --houses 200 --devices 100
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+import common.dr as dr
+from benchmarks import harness
+
+RESULT_PATH = "./datas/bench/recommendation.json"
+BASELINE_PATH = "./datas/bench/recommendation_baseline.json"
+# 가구당 처리시간 상한(ms)
+BUDGET_MS = 10.0
+SOLVERS = ("greedy", "knapsack")
+
+
+def make_houses(houses=100, devices=50, seed=0):
+    """가구별 디바이스 조회 결과(dr_select_recommendation_batch.sql 형식)와 CBL
+
+    Returns:
+        dataframe: 디바이스 목록 (추천 순서)
+        dataframe: cbl_event 형식의 가구별 CBL
+    """
+    rng = np.random.default_rng(seed)
+    house_nos = [f"2020{h + 1:010d}" for h in range(houses)]
+    n = houses * devices
+
+    use = rng.gamma(2.0, 40.0, n)
+    # 일부 디바이스는 사용 이력이 없음 (nan)
+    use[rng.random(n) < 0.02] = np.nan
+    df = pd.DataFrame(
+        {
+            "house_no": np.repeat(house_nos, devices),
+            "device_id": [f"SD{i:012d}" for i in range(n)],
+            "energy_wait": rng.gamma(1.0, 2.0, n),
+            "energy_use": use,
+        }
+    )
+
+    # 전체 사용량의 20~80%를 CBL로 사용
+    total = df.groupby("house_no", sort=False)["energy_use"].sum().to_numpy()
+    cbl = total * rng.uniform(0.2, 0.8, houses)
+    cbl = pd.DataFrame(
+        {
+            "cbl": cbl,
+            "reduction_energy": pd.Series(
+                [dr.reduction_energy_of(value) for value in cbl], dtype=object
+            ).values,
+        },
+        index=pd.Index(house_nos, name="house_no"),
+    )
+
+    return df, cbl
+
+
+def used_energy(results):
+    """가구별 참여 디바이스 사용량 합계"""
+    return np.array(
+        [
+            df.loc[df["permission"], "energy_sum"].astype(float).sum()
+            for df in results.values()
+        ]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DR 추천 디바이스 선택 벤치마크")
+    parser.add_argument("--houses", type=int, default=100, help="가구 수")
+    parser.add_argument("--devices", type=int, default=50, help="가구당 디바이스 수")
+    parser.add_argument("--repeat", type=int, default=10, help="측정 횟수")
+    parser.add_argument(
+        "--budget", type=float, default=BUDGET_MS, help="가구당 처리시간 상한(ms)"
+    )
+    parser.add_argument("--output", default=RESULT_PATH, help="결과 저장 경로")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="기준 결과 경로")
+    parser.add_argument("--save-baseline", action="store_true", help="결과를 기준 결과로 저장")
+    parser.add_argument(
+        "--tolerance", type=float, default=harness.TOLERANCE, help="허용 p50 증가율"
+    )
+    args = parser.parse_args()
+
+    df, cbl = make_houses(args.houses, args.devices)
+    limit = (cbl["cbl"] - cbl["reduction_energy"].astype(float)).to_numpy()
+
+    results, used, failed = {}, {}, False
+    for solver in SOLVERS:
+        used[solver] = used_energy(dr.recommend(df, cbl, solver=solver))
+        if (used[solver] >= limit).any():
+            print(f"[bench] recommendation.{solver}: usage over limit")
+            failed = True
+
+        result = results[f"recommendation.{solver}"] = harness.measure(
+            lambda: dr.recommend(df, cbl, solver=solver),
+            repeat=args.repeat,
+            items=args.houses,
+        )
+        per_house = result["p50_ms"] / args.houses
+        print(
+            f"[bench] recommendation.{solver:<10} p50 {result['p50_ms']:>10.1f}ms "
+            f"per house {per_house:>8.3f}ms "
+            f"used {used[solver].sum() / limit.sum():>6.1%} of limit"
+        )
+        if per_house > args.budget:
+            print(f"[bench] recommendation.{solver}: over budget {args.budget}ms")
+            failed = True
+
+    if (used["knapsack"] < used["greedy"] - 1e-6).any():
+        print("[bench] recommendation.knapsack: less usage than greedy")
+        failed = True
+
+    meta = {"houses": args.houses, "devices": args.devices, "repeat": args.repeat}
+    harness.save(args.output, results, meta)
+    if args.save_baseline:
+        harness.save(args.baseline, results, meta)
+        return 1 if failed else 0
+
+    baseline = harness.load(args.baseline)
+    if baseline is None:
+        print(f"[bench] no baseline at {args.baseline}")
+    elif harness.compare(results, baseline, tolerance=args.tolerance):
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""요일별 스케줄 회귀 확인
+
+요일마다 로그를 조회하여 pandas로 처리하던 기존 구현(get_one_day_schedule x 7)과
+4주 로그를 한번에 조회하여 요일별로 한번에 처리하는 구현(build_ai_schedule,
+make_week_schedule)의 /schedule 응답이 같은지 확인한다.
+
+고정 seed로 만든 로그에 대해 항상 켜짐 디바이스, 사용기록이 없는 요일/일자,
+자정을 넘어가는 사용 구간, 로그가 빠진 분 등을 확인하고, --fleet이면 합성 데이터
+환경(benchmarks.fleet)의 디바이스별로 요일별 조회(기존)와 한번 조회(변경)를 비교한다.
+다른 결과가 있으면 종료코드 1로 끝난다.
+
+    usage example:
+        root> python -m benchmarks.schedule_regression
+        root> python -m benchmarks.schedule_regression --fleet
+"""
+import argparse
+import sys
+import warnings
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import common.ai as ai
+
+COLUMNS = ["dayofweek", "start", "end", "duration", "status"]
+# 로그 기준일자 (전날까지 4주)
+END_DATE = "20201130"
+SEEDS = range(4)
+
+
+def day_schedule_legacy(df, dayofweek):
+    """한 요일의 로그로 스케줄 생성 (기존 get_one_day_schedule의 처리, 비교용)"""
+    if sum(df.status.apply(lambda x: int(x))) == 0:
+        return pd.DataFrame(
+            [[str(dayofweek), "00:00:00", "23:59:00", "1439", "0"]],
+            columns=COLUMNS,
+        )
+
+    df["pre_status"] = df.groupby(by=["curr_dd"], dropna=False)["status"].shift(
+        periods=1, fill_value=0
+    )
+
+    diff = df.query("pre_status != status").reset_index(drop=True)
+
+    diff.insert(
+        loc=len(diff.columns),
+        column="start",
+        value=diff["curr_dt"].shift(1).fillna(pd.to_datetime(diff["curr_dd"])),
+    )
+
+    diff.insert(
+        loc=len(diff.columns),
+        column="duration",
+        value=(diff["curr_dt"] - diff["start"]).apply(lambda x: x.seconds / 60),
+    )
+
+    diff = diff.loc[:, ["day_nm", "start", "curr_dt", "duration", "pre_status"]].rename(
+        columns={
+            "curr_dt": "end",
+            "pre_status": "status",
+            "day_nm": "dayofweek",
+        }
+    )
+    diff.query(
+        "index == 0 | (duration >= 60 & status == 0) "
+        "| (duration >= 30 & status == 1)",
+        inplace=True,
+    )
+
+    diff["start_tm"] = diff["start"].apply(lambda x: str(x).split()[1])
+
+    diff = diff.sort_values("start_tm").reset_index(drop=True)
+    diff.insert(
+        loc=len(diff.columns),
+        column="rnk",
+        value=diff.groupby(by=["start_tm"])["status"].rank(
+            ascending=False, method="first"
+        ),
+    )
+
+    diff.query("rnk == 1", inplace=True)
+    diff.insert(
+        loc=len(diff.columns),
+        column="pre_status",
+        value=diff["status"].shift(1),
+    )
+
+    diff = (
+        diff.query("status != pre_status", inplace=False)
+        .drop(columns=["rnk", "pre_status"])
+        .reset_index(drop=True)
+    )
+
+    diff.insert(
+        loc=len(diff.columns),
+        column="end_tm",
+        value=diff["start_tm"]
+        .shift(-1)
+        .apply(
+            lambda x: str(x + pd.Timedelta(seconds=-60)).split()[2]
+            if x is not np.nan
+            else "23:59:00"
+        ),
+    )
+
+    diff["duration"] = (
+        pd.to_datetime(diff["end_tm"], format="%H:%M:%S")
+        - pd.to_datetime(diff["start_tm"], format="%H:%M:%S")
+    ).dt.total_seconds() / 60
+
+    return diff.loc[
+        :, ["dayofweek", "start_tm", "end_tm", "duration", "status"]
+    ].rename(columns={"start_tm": "start", "end_tm": "end"})
+
+
+def ai_schedule_legacy(always_on, day_logs):
+    """요일별 로그로 주간 스케줄 생성 (기존 get_ai_schedule, 비교용)
+
+    Args:
+        always_on (int): 항상 켜짐 여부 (1: 항상 켜짐)
+        day_logs (function): 요일(1:일 ~ 7:토)의 로그를 반환하는 함수
+            (기존 요일별 조회와 같이 일시 순 정렬)
+    """
+    df = pd.DataFrame(columns=COLUMNS)
+
+    for dayofweek in range(1, 8):
+        if always_on == 1:
+            tmp = pd.DataFrame(
+                [[str(dayofweek), "00:00:00", "23:59:00", "1439", "1"]],
+                columns=COLUMNS,
+            )
+        else:
+            tmp = day_schedule_legacy(day_logs(dayofweek), dayofweek)
+
+        df = pd.concat([df, tmp], ignore_index=True)
+
+    return df.loc[:, COLUMNS]
+
+
+def response(df):
+    """/schedule 응답의 스케줄 부분 (api.ai_schedule과 같은 변환)"""
+    df = df.copy()
+    df.columns = ["dayofweek", "time", "end", "duration", "appliance_status"]
+
+    return df.loc[:, ["dayofweek", "time", "appliance_status"]].to_dict("index")
+
+
+def make_logs(seed, pattern):
+    """get_schedule_logs 형식의 4주간 분단위 로그
+
+    Args:
+        seed (int): 난수 seed
+        pattern (str): 사용 패턴
+            random: 임의로 켜고 끄는 디바이스
+            sparse: random에서 로그의 30%가 빠진 경우
+            night: 밤(22~23시)에 켜서 자정을 넘겨 새벽(0~2시)에 끄는 디바이스
+            idle_days: 주말과 일부 평일에는 사용기록이 없는 디바이스
+            idle: 사용기록이 없는 디바이스
+
+    Returns:
+        dataframe: 요일(day_nm), 일시(curr_dt), 일자(curr_dd), 사용상태(status)
+    """
+    rng = np.random.default_rng(seed)
+    end = datetime.strptime(END_DATE, "%Y%m%d")
+    days = [end - timedelta(days=i) for i in range(28, 0, -1)]
+    minutes = np.arange(1440)
+
+    status = []
+    for i, day in enumerate(days):
+        if pattern in ("random", "sparse"):
+            toggle = rng.random(1440) < np.where(rng.random() < 0.5, 0.02, 0.05)
+            values = np.cumsum(toggle) % 2
+        elif pattern == "night":
+            values = np.zeros(1440, dtype=np.int64)
+            values[: int(rng.integers(0, 150))] = 1
+            values[int(rng.integers(1320, 1440)) :] = 1
+        elif pattern == "idle_days":
+            values = np.zeros(1440, dtype=np.int64)
+            if day.weekday() < 5 and i % 3:
+                start = int(rng.integers(360, 1200))
+                values[start : start + int(rng.integers(20, 180))] = 1
+        else:
+            values = np.zeros(1440, dtype=np.int64)
+        status.append(values)
+
+    df = pd.DataFrame(
+        {
+            "curr_dt": np.concatenate(
+                [np.datetime64(day) + minutes.astype("timedelta64[m]") for day in days]
+            ),
+            "status": np.concatenate(status).astype(np.int64),
+        }
+    )
+    if pattern == "sparse":
+        df = df.loc[rng.random(len(df)) >= 0.3].reset_index(drop=True)
+
+    df["curr_dd"] = df["curr_dt"].dt.strftime("%Y%m%d")
+    # DAYOFWEEK (1:일 ~ 7:토)
+    df["day_nm"] = (df["curr_dt"].dt.dayofweek + 1) % 7 + 1
+
+    return df.loc[:, ["day_nm", "curr_dt", "curr_dd", "status"]]
+
+
+def compare(name, legacy, current):
+    """두 스케줄의 /schedule 응답(값과 타입) 비교. 다르면 출력하고 False"""
+    expected, actual = response(legacy), response(current)
+    same = expected == actual and all(
+        type(a) is type(b)
+        for row_a, row_b in zip(expected.values(), actual.values())
+        for a, b in zip(row_a.values(), row_b.values())
+    )
+    if not same:
+        print(f"[schedule] {name}: different")
+        print(legacy.to_string())
+        print(current.to_string())
+
+    return same
+
+
+def check_logs():
+    """고정 로그에 대한 비교. (비교 수, 다른 수)"""
+    checked, failed = 0, 0
+
+    for pattern in ("random", "sparse", "night", "idle_days", "idle"):
+        for seed in SEEDS:
+            logs = make_logs(seed, pattern)
+            for always_on in (0, 1):
+                legacy = ai_schedule_legacy(
+                    always_on,
+                    lambda d: logs.loc[logs["day_nm"] == d]
+                    .sort_values("curr_dt")
+                    .reset_index(drop=True),
+                )
+                current = ai.build_ai_schedule(always_on, logs)
+
+                checked += 1
+                failed += not compare(f"{pattern}/{seed}/{always_on}", legacy, current)
+
+    return checked, failed
+
+
+def day_logs(device_id, gateway_id, dayofweek):
+    """요일별 로그 조회 (기존 조회). SQLite는 일시를 문자열로 반환하므로 변환"""
+    df = ai.get_schedule_logs(device_id, gateway_id, dayofweek=dayofweek)
+    df["curr_dt"] = pd.to_datetime(df["curr_dt"])
+
+    return df
+
+
+def check_fleet():
+    """합성 데이터 환경의 디바이스별 비교 (요일별 조회 / 한번 조회). (비교 수, 다른 수)"""
+    from benchmarks import fleet, synthetic_data
+
+    env = fleet.prepare(train=False)
+    checked, failed = 0, 0
+
+    for house in range(env["houses"]):
+        gateway_id = synthetic_data.gateway_id(house)
+        for device in range(env["devices"]):
+            device_id = synthetic_data.device_id(house, device)
+            legacy = ai_schedule_legacy(
+                ai.get_always_on(device_id),
+                lambda d: day_logs(device_id, gateway_id, d),
+            )
+            current = ai.get_ai_schedule(device_id, gateway_id)
+
+            checked += 1
+            failed += not compare(device_id, legacy, current)
+
+    return checked, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="요일별 스케줄 회귀 확인")
+    parser.add_argument("--fleet", action="store_true", help="합성 데이터 환경의 디바이스도 비교")
+    args = parser.parse_args()
+
+    # 기존 구현의 경고 (빈 DataFrame concat, 문자열과 Timedelta 연산 등)
+    warnings.simplefilter("ignore")
+
+    checked, failed = check_logs()
+    print(f"[schedule] logs: {checked} schedules, {failed} different")
+
+    if args.fleet:
+        fleet_checked, fleet_failed = check_fleet()
+        print(f"[schedule] fleet: {fleet_checked} devices, {fleet_failed} different")
+        failed += fleet_failed
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
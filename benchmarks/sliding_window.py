@@ -0,0 +1,95 @@
+"""sliding_window_transform 벤치마크
+
+기존 list 기반 구현과 strided view 기반 구현의 결과 일치 여부와
+실행시간을 하루/한달/1년(분단위) 데이터 크기별로 비교한다.
+
+    usage example:
+        root> python -m benchmarks.sliding_window
+"""
+import timeit
+
+import numpy as np
+
+import common.data_load as dl
+
+# 분단위 데이터 건수
+SCALES = {
+    "day": 1440,
+    "month": 1440 * 30,
+    "year": 1440 * 365,
+}
+
+
+def sliding_window_transform_legacy(x, y, step_size=10, lag=2, is_training=1):
+    """list 기반의 기존 구현 (비교용)"""
+    n_shape = np.shape(x)
+
+    cols = n_shape[1] if len(n_shape) > 1 else 1
+
+    if is_training:
+        x = [[0.0 for i in range(cols)]] * (step_size - 1) + x.tolist()
+    else:
+        x = x.tolist()
+
+    x_transformed = [
+        x[i - step_size + lag : i + lag]
+        for i in range(len(x) + 1 - lag)
+        if i > step_size - 1
+    ]
+
+    x_transformed = np.reshape(x_transformed, (-1, (step_size * cols)))
+
+    return x_transformed, y[:-lag] if lag > 0 else y
+
+
+def measure(func, number):
+    """최소 실행시간(초)"""
+    return min(timeit.repeat(func, number=1, repeat=number))
+
+
+def main(repeat=3):
+    rng = np.random.default_rng(0)
+    cases = [
+        # (설명, step_size, lag, is_training): labeling / make_model_status
+        ("labeling", 30, 10, 0),
+        ("training", 30, 10, 1),
+    ]
+
+    print(
+        f"{'case':<10}{'scale':<8}{'rows':>9}{'legacy(s)':>12}"
+        f"{'copy(s)':>10}{'f32(s)':>10}{'view(s)':>10}{'speedup':>9}"
+    )
+
+    for name, step_size, lag, is_training in cases:
+        for scale, n in SCALES.items():
+            x = rng.random((n, 2)) * 100
+            y = rng.integers(0, 2, n)
+            kwargs = dict(step_size=step_size, lag=lag, is_training=is_training)
+
+            expected_x, expected_y = sliding_window_transform_legacy(x, y, **kwargs)
+            actual_x, actual_y = dl.sliding_window_transform(x, y, **kwargs)
+            assert actual_x.dtype == expected_x.dtype
+            assert np.array_equal(actual_x, expected_x)
+            assert np.array_equal(actual_y, expected_y)
+
+            legacy = measure(
+                lambda: sliding_window_transform_legacy(x, y, **kwargs), repeat
+            )
+            copy = measure(lambda: dl.sliding_window_transform(x, y, **kwargs), repeat)
+            f32 = measure(
+                lambda: dl.sliding_window_transform(x, y, dtype=np.float32, **kwargs),
+                repeat,
+            )
+            view = measure(
+                lambda: dl.sliding_window_transform(x, y, as_view=True, **kwargs),
+                repeat,
+            )
+
+            print(
+                f"{name:<10}{scale:<8}{n:>9}{legacy:>12.4f}{copy:>10.4f}"
+                f"{f32:>10.4f}{view:>10.6f}{legacy / copy:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
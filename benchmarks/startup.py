@@ -0,0 +1,182 @@
+"""API 시작시간 벤치마크
+
+새 프로세스에서 api.py를 import하는 시간(cold start)과 예측 API(/label, /elec,
+/schedule, DR)만 사용하는 프로세스가 첫 응답까지 걸리는 시간, 메모리 사용량(최대 RSS)을
+측정한다. 학습용 라이브러리(sklearn 학습 모듈, lightgbm 등)가 import되었는지도 함께 출력한다.
+
+측정 결과는 benchmarks.harness 형식으로 저장하고 기준 결과와 비교한다.
+
+    usage example:
+        root> python -m benchmarks.startup --save-baseline
+        root> python -m benchmarks.startup --repeat 10
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks import harness
+
+RESULT_PATH = "./datas/bench/startup.json"
+BASELINE_PATH = "./datas/bench/startup_baseline.json"
+# 학습에 사용하는 모듈 (import 여부 출력)
+TRAINING_MODULES = ("sklearn.ensemble", "sklearn.model_selection", "lightgbm")
+PHASES = ("import_api", "first_inference")
+
+
+def peak_rss_mb():
+    """현재 프로세스의 최대 RSS(MB)
+
+    ru_maxrss는 fork한 부모 프로세스의 사용량이 남아있을 수 있으므로
+    linux에서는 /proc의 VmHWM을 사용한다.
+    """
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+
+    # linux 외에는 KB(macOS는 bytes) 단위
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def child(phase):
+    """측정 대상 프로세스 (새 프로세스에서 실행)
+
+    Args:
+        phase (str): import_api 또는 first_inference
+    """
+    started = time.perf_counter()
+
+    if phase == "first_inference":
+        from benchmarks import fleet
+
+        target = fleet.prepare(train=False)
+
+    import api
+
+    if phase == "first_inference":
+        client = api.app.test_client()
+        dr_body = {
+            "house_no": target["house_no"],
+            "request_dr_no": target["request_dr_no"],
+        }
+        for url, body in [
+            (
+                "/label",
+                {
+                    "device_id": target["device_ids"][0],
+                    "gateway_id": target["gateway_id"],
+                    "collect_date": target["label_dates"][0],
+                },
+            ),
+            ("/elec", {"house_no": target["house_no"], "date": target["today"]}),
+            (
+                "/schedule",
+                {
+                    "device_id": target["device_ids"][0],
+                    "gateway_id": target["gateway_id"],
+                },
+            ),
+            ("/cbl_info", dr_body),
+            ("/dr_recommandation", dr_body),
+        ]:
+            result = client.post(url, json=body).get_json()
+            if not result["flag_success"]:
+                raise RuntimeError(f"{url}: {result['error']}")
+
+    print(
+        json.dumps(
+            {
+                "elapsed": time.perf_counter() - started,
+                "rss_mb": peak_rss_mb(),
+                "training_modules": [m for m in TRAINING_MODULES if m in sys.modules],
+            }
+        )
+    )
+
+
+def run_phase(phase, repeat):
+    """새 프로세스에서 repeat번 측정
+
+    프로세스 전체 실행시간(인터프리터 시작 포함)을 지연시간으로 사용한다.
+
+    Returns:
+        dictionary: harness.summarize 결과와 RSS, 학습용 모듈 import 여부
+    """
+    samples, rss, reports = [], [], []
+    started = time.perf_counter()
+
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup", "--child", phase],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        samples.append(time.perf_counter() - begin)
+        reports.append(json.loads(output.strip().splitlines()[-1]))
+        rss.append(reports[-1]["rss_mb"])
+
+    result = harness.summarize(samples, time.perf_counter() - started)
+    result["in_process_ms"] = round(
+        sorted(r["elapsed"] for r in reports)[len(reports) // 2] * 1000, 4
+    )
+    result["rss_mb"] = round(sorted(rss)[len(rss) // 2], 1)
+    result["training_modules"] = reports[-1]["training_modules"]
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API 시작시간 벤치마크")
+    parser.add_argument("--child", choices=PHASES, help=argparse.SUPPRESS)
+    parser.add_argument("--repeat", type=int, default=5, help="단계별 측정 횟수")
+    parser.add_argument("--output", default=RESULT_PATH, help="결과 저장 경로")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="기준 결과 경로")
+    parser.add_argument("--save-baseline", action="store_true", help="결과를 기준 결과로 저장")
+    parser.add_argument(
+        "--tolerance", type=float, default=harness.TOLERANCE, help="허용 p50 증가율"
+    )
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return 0
+
+    # 합성 데이터와 모델은 미리 준비 (측정 프로세스는 학습하지 않는다)
+    from benchmarks import fleet
+
+    fleet.prepare()
+
+    results = {}
+    for phase in PHASES:
+        result = results[f"startup.{phase}"] = run_phase(phase, args.repeat)
+        print(
+            f"[bench] startup.{phase:<20} p50 {result['p50_ms']:>10.1f}ms "
+            f"in process {result['in_process_ms']:>10.1f}ms "
+            f"rss {result['rss_mb']:>7.1f}MB "
+            f"training modules {result['training_modules'] or '-'}"
+        )
+
+    meta = {"repeat": args.repeat}
+    harness.save(args.output, results, meta)
+    if args.save_baseline:
+        harness.save(args.baseline, results, meta)
+        return 0
+
+    baseline = harness.load(args.baseline)
+    if baseline is None:
+        print(f"[bench] no baseline at {args.baseline}")
+        return 0
+
+    return 1 if harness.compare(results, baseline, tolerance=args.tolerance) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""종단간 벤치마크
+
+합성 데이터 환경(benchmarks.fleet)에서 common 함수별(micro), API 라우트별(macro)
+지연시간과 처리량을 측정하여 JSON으로 저장하고 기준 결과(baseline)와 비교한다.
+성능 저하가 있으면 종료코드 1로 끝난다.
+
+기준 결과는 측정한 장비에 따라 다르므로 저장소에 포함하지 않는다.
+변경 전에 --save-baseline으로 저장해두고 변경 후 다시 실행하여 비교한다.
+
+    usage example:
+        root> python -m benchmarks.suite --save-baseline
+        root> python -m benchmarks.suite
+        root> python -m benchmarks.suite --only dr. --repeat 50 --concurrency 4
+"""
+import argparse
+import sys
+import time
+
+from benchmarks import fleet, harness, macro, micro
+
+RESULT_PATH = "./datas/bench/results.json"
+BASELINE_PATH = "./datas/bench/baseline.json"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="종단간 벤치마크")
+    parser.add_argument("--houses", type=int, default=5, help="가구 수")
+    parser.add_argument("--devices", type=int, default=4, help="가구당 디바이스 수")
+    parser.add_argument("--days", type=int, default=42, help="로그 일수")
+    parser.add_argument("--repeat", type=int, default=20, help="케이스별 측정 횟수")
+    parser.add_argument("--concurrency", type=int, default=1, help="동시 실행 thread 수")
+    parser.add_argument("--only", default=None, help="이름에 포함된 케이스만 측정")
+    parser.add_argument(
+        "--group",
+        choices=["all", "micro", "macro"],
+        default="all",
+        help="측정 그룹",
+    )
+    parser.add_argument("--output", default=RESULT_PATH, help="결과 저장 경로")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="기준 결과 경로")
+    parser.add_argument("--save-baseline", action="store_true", help="결과를 기준 결과로 저장")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=harness.TOLERANCE,
+        help="허용 p50 증가율",
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    target = fleet.prepare(houses=args.houses, devices=args.devices, days=args.days)
+    print(f"[bench] fleet ready ({time.perf_counter() - started:.1f}s)")
+
+    options = {
+        "repeat": args.repeat,
+        "concurrency": args.concurrency,
+        "only": args.only,
+    }
+    results = {}
+    if args.group in ("all", "micro"):
+        results.update(harness.run_cases("micro", micro.cases(target), **options))
+    if args.group in ("all", "macro"):
+        from api import app
+
+        client = app.test_client()
+        results.update(
+            harness.run_cases("macro", macro.cases(target, client), **options)
+        )
+
+    meta = {
+        "houses": args.houses,
+        "devices": args.devices,
+        "days": args.days,
+        "repeat": args.repeat,
+        "concurrency": args.concurrency,
+    }
+    harness.save(args.output, results, meta)
+    print(f"[bench] saved {args.output}")
+
+    if args.save_baseline:
+        harness.save(args.baseline, results, meta)
+        print(f"[bench] saved baseline {args.baseline}")
+        return 0
+
+    baseline = harness.load(args.baseline)
+    if baseline is None:
+        print(f"[bench] no baseline at {args.baseline}")
+        return 0
+    if baseline.get("meta") != meta:
+        print(f"[bench] baseline conditions differ: {baseline.get('meta')}")
+
+    regressions = harness.compare(results, baseline, tolerance=args.tolerance)
+    failed = [key for key, result in results.items() if "error" in result]
+    for key, base, current, change in regressions:
+        print(
+            f"[bench] regression {key}: {base:.3f}ms -> {current:.3f}ms ({change:+.1%})"
+        )
+    for key in failed:
+        print(f"[bench] failed {key}: {results[key]['error']}")
+
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
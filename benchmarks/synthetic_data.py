@@ -0,0 +1,250 @@
+"""합성 데이터 생성
+
+SQLite data source(routes.datasource.SQLiteDataSource)용 DB를 만들고
+가구/게이트웨이/디바이스, 분단위 전력 사용 로그, DR 요청 등 API가 조회하는
+테이블에 운영 DB와 같은 형식의 합성 데이터를 적재한다.
+
+디바이스마다 요일별 사용 시간대를 정해두고 사용중이면 정격전력, 대기중이면
+대기전력 근처의 값을 만든다. 마지막 UNLABELED_DAYS일은 라벨링되지 않은
+상태(APPLIANCE_STATUS NULL)로 둔다. 로그는 어제까지 생성한다.
+
+    usage example:
+        root> python -m benchmarks.synthetic_data --houses 10 --devices 5 --days 60
+        root> set AIHEMS_DATA_SOURCE=sqlite
+        root> python api.py
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from routes import datasource, settings
+
+# 라벨링되지 않은 최근 일수
+UNLABELED_DAYS = 7
+# executemany 한번에 저장할 건수
+INSERT_BATCH_SIZE = 100000
+# 가구별 DR 요청 수
+DR_REQUESTS = 3
+
+
+def house_no(house):
+    return f"2020{house + 1:010d}"
+
+
+def gateway_id(house):
+    return f"gw{house + 1:08d}"
+
+
+def device_id(house, device):
+    return f"SD{house + 1:08d}{device + 1:04d}"
+
+
+def device_logs(rng, start, days, labeled_days):
+    """한 디바이스의 분단위 로그 컬럼
+
+    Returns:
+        dictionary: 컬럼별 배열 (COLLECT_DATE, COLLECT_TIME 제외)
+    """
+    n = days * 1440
+    rated = rng.uniform(30, 1500)
+    standby = rng.uniform(0.3, 3)
+
+    # 요일별 사용 시작분, 사용시간(분)
+    use_start = rng.integers(6 * 60, 21 * 60, 7)
+    use_minutes = rng.integers(30, 240, 7)
+
+    minute = np.tile(np.arange(1440), days)
+    weekday = np.repeat((np.arange(days) + start.weekday()) % 7, 1440)
+    # 날마다 사용 시작시각이 조금씩 다르다
+    jitter = np.repeat(rng.integers(-20, 21, days), 1440)
+    begin = use_start[weekday] + jitter
+    status = (minute >= begin) & (minute < begin + use_minutes[weekday])
+    # 사용시간대가 아닌 짧은 사용
+    status |= rng.random(n) < 0.002
+
+    power = np.where(status, rated * rng.uniform(0.8, 1.1, n), standby)
+    power *= rng.uniform(0.95, 1.05, n)
+    energy_diff = np.round(power / 60, 3)
+
+    appliance_status = status.astype(object)
+    appliance_status[labeled_days * 1440 :] = None
+
+    return {
+        "ENERGY": np.round(np.cumsum(energy_diff), 3),
+        "ENERGY_DIFF": energy_diff,
+        "POWER": np.round(power, 3),
+        "ONOFF": (power > standby * 2).astype(int),
+        "APPLIANCE_STATUS": appliance_status,
+    }
+
+
+def generate(path, houses=10, devices=5, days=60, seed=0):
+    """합성 데이터 DB 생성 (기존 파일은 삭제)
+
+    Args:
+        path (str): DB 파일 경로
+        houses (int, optional): 가구 수. Defaults to 10.
+        devices (int, optional): 가구당 디바이스 수. Defaults to 5.
+        days (int, optional): 로그 일수. Defaults to 60.
+        seed (int, optional): 난수 seed. Defaults to 0.
+
+    Returns:
+        dictionary: 테이블별 적재 건수
+    """
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    source = datasource.SQLiteDataSource(path)
+    source.create_schema()
+    conn = source.connect()
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+
+    rng = np.random.default_rng(seed)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = today - timedelta(days=days)
+    dates = np.repeat(
+        [(start + timedelta(days=d)).strftime("%Y%m%d") for d in range(days)], 1440
+    )
+    times = np.tile([f"{m // 60:02d}{m % 60:02d}" for m in range(1440)], days)
+    labeled_days = max(days - UNLABELED_DAYS, 0)
+    counts = {"AH_USE_LOG_BYMINUTE": 0}
+
+    for house in range(houses):
+        gw = gateway_id(house)
+        conn.execute(
+            "INSERT INTO AH_GATEWAY_INSTALL (GATEWAY_ID, HOUSE_NO) VALUES (?, ?)",
+            (gw, house_no(house)),
+        )
+
+        for device in range(devices):
+            dv = device_id(house, device)
+            conn.execute(
+                "INSERT INTO AH_DEVICE (DEVICE_ID, DEVICE_NAME, FLAG_USE_AI) "
+                "VALUES (?, ?, 'Y')",
+                (dv, f"device {device + 1}"),
+            )
+            conn.execute(
+                "INSERT INTO AH_DEVICE_INSTALL (GATEWAY_ID, DEVICE_ID) VALUES (?, ?)",
+                (gw, dv),
+            )
+            conn.execute(
+                "INSERT INTO AH_DEVICE_MODEL (DEVICE_ID, ALWAYS_ON) VALUES (?, ?)",
+                (dv, int(rng.random() < 0.1)),
+            )
+
+            logs = device_logs(rng, start, days, labeled_days)
+            rows = zip(
+                [gw] * len(dates),
+                [dv] * len(dates),
+                dates.tolist(),
+                times.tolist(),
+                *(logs[col].tolist() for col in logs),
+            )
+            sql = (
+                "INSERT INTO AH_USE_LOG_BYMINUTE (GATEWAY_ID, DEVICE_ID, "
+                "COLLECT_DATE, COLLECT_TIME, ENERGY, ENERGY_DIFF, POWER, ONOFF, "
+                "APPLIANCE_STATUS) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            )
+            while True:
+                batch = [row for _, row in zip(range(INSERT_BATCH_SIZE), rows)]
+                if not batch:
+                    break
+                conn.executemany(sql, batch)
+                counts["AH_USE_LOG_BYMINUTE"] += len(batch)
+
+            status = logs["APPLIANCE_STATUS"][: labeled_days * 1440].astype(bool)
+            energy = logs["ENERGY_DIFF"][: labeled_days * 1440]
+            conn.execute(
+                "INSERT INTO AH_DEVICE_ENERGY_HISTORY (GATEWAY_ID, DEVICE_ID, "
+                "WAIT_ENERGY, WAIT_TIME, USE_ENERGY, USE_TIME) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    gw,
+                    dv,
+                    float(energy[~status].sum()),
+                    float((~status).sum()),
+                    float(energy[status].sum()),
+                    float(status.sum()),
+                ),
+            )
+
+            # 오늘의 소켓 상태 (DR 추천시 최근 5분 조회)
+            on = rng.random() < 0.5
+            conn.executemany(
+                "INSERT INTO AH_LOG_SOCKET (GATEWAY_ID, DEVICE_ID, COLLECT_DATE, "
+                "COLLECT_TIME, ONOFF, POWER) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        gw,
+                        dv,
+                        today.strftime("%Y%m%d"),
+                        f"{m // 60:02d}{m % 60:02d}",
+                        int(on),
+                        float(rng.uniform(10, 100) if on else rng.uniform(0, 0.4)),
+                    )
+                    for m in range(1440)
+                ],
+            )
+
+        # 최근 평일 오후의 DR 요청 (정시 종료(14:00 ~ 15:00)와 59분 종료를 번갈아 생성)
+        for i in range(DR_REQUESTS):
+            day = today - timedelta(days=1 + i)
+            while day.weekday() >= 5:
+                day -= timedelta(days=1)
+            begin = day + timedelta(hours=int(rng.integers(13, 18)))
+            conn.execute(
+                "INSERT INTO AH_DR_REQUEST (REQUEST_DR_NO, START_DATE, END_DATE) "
+                "VALUES (?, ?, ?)",
+                (
+                    dr_request_no(house, i),
+                    begin.strftime("%Y-%m-%d %H:%M:%S"),
+                    (begin + timedelta(minutes=60 - i % 2)).strftime(
+                        "%Y-%m-%d %H:%M:%S"
+                    ),
+                ),
+            )
+
+        conn.commit()
+
+    for table in (
+        "AH_GATEWAY_INSTALL",
+        "AH_DEVICE_INSTALL",
+        "AH_DEVICE_ENERGY_HISTORY",
+        "AH_LOG_SOCKET",
+        "AH_DR_REQUEST",
+    ):
+        counts[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    conn.execute("ANALYZE")
+    conn.close()
+
+    return counts
+
+
+def dr_request_no(house, i):
+    return f"{house + 1:06d}{i + 1:04d}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="합성 데이터 생성")
+    parser.add_argument("--path", default=settings.SQLITE_PATH, help="DB 파일 경로")
+    parser.add_argument("--houses", type=int, default=10, help="가구 수")
+    parser.add_argument("--devices", type=int, default=5, help="가구당 디바이스 수")
+    parser.add_argument("--days", type=int, default=60, help="로그 일수")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = generate(
+        args.path,
+        houses=args.houses,
+        devices=args.devices,
+        days=args.days,
+        seed=args.seed,
+    )
+    print(f"[synthetic] {args.path}: {counts} ({time.perf_counter() - started:.1f}s)")
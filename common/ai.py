@@ -10,6 +10,100 @@ import datetime
 import routes.settings as settings
 
 
+def get_always_on(device_id):
+    """디바이스가 항상 켜져 있어야 하는지 조회.
+
+    Args:
+        device_id (str): 디바이스ID
+
+    Returns:
+        int: 항상 켜짐 여부 (1: 항상 켜짐)
+    """
+    df = settings.load_datas(
+        query_file="ai_select_always_on.sql", params={"device_id": device_id}
+    )
+    always_on = df.loc[0, "always_on"]
+
+    return always_on
+
+
+def get_schedule_logs(
+    device_id, gateway_id, collect_date=None, dayofweek=None
+):
+    """기준날짜로부터 4주간의 분단위 전력 사용상태 조회.
+
+    Args:
+        device_id (str): 디바이스ID
+        gateway_id (str): 게이터웨이ID
+        collect_date (string, optional): 지정일자. Defaults to None.
+            지정날짜가 없으면 현재날짜로 설정
+        dayofweek (int, optional): 요일 (1:일 2:월 3:화 4:수 5:목 6:금 7:토).
+            Defaults to None(전체 요일)
+
+    Returns:
+        dataframe: 요일(day_nm), 일시(curr_dt), 일자(curr_dd), 사용상태(status)
+    """
+    # 지정된 일자가 없으면 현재 날짜로 지정
+    collect_date = (
+        collect_date
+        if collect_date
+        else datetime.datetime.now().strftime("%Y%m%d")
+    )
+
+    df = settings.load_datas(
+        query_file="ai_select_device_schedule_logs.sql",
+        params={
+            "gateway_id": gateway_id,
+            "device_id": device_id,
+            "collect_date": collect_date,
+            "dayofweek": dayofweek,
+        },
+    )
+
+    return df
+
+
+def get_gateway_schedule_logs(gateway_id, device_ids, collect_date=None):
+    """게이트웨이의 여러 디바이스 4주간 분단위 전력 사용상태를 한번에 조회.
+
+    Args:
+        gateway_id (str): 게이트웨이ID
+        device_ids (list): 디바이스ID 리스트
+        collect_date (string, optional): 지정일자. Defaults to None.
+            지정날짜가 없으면 현재날짜로 설정
+
+    Returns:
+        dictionary: 디바이스ID별 get_schedule_logs 형식의 dataframe
+    """
+    collect_date = (
+        collect_date
+        if collect_date
+        else datetime.datetime.now().strftime("%Y%m%d")
+    )
+
+    if not device_ids:
+        return {}
+
+    df = settings.load_datas(
+        query_file="ai_select_schedule_logs.sql",
+        params={
+            "gateway_id": gateway_id,
+            "device_ids": tuple(device_ids),
+            "collect_date": collect_date,
+        },
+    )
+
+    columns = ["day_nm", "curr_dt", "curr_dd", "status"]
+    groups = df.groupby("device_id", sort=False).indices
+
+    return {
+        device_id: df.iloc[groups.get(device_id, [])]
+        .loc[:, columns]
+        .reset_index(drop=True)
+        for device_id in device_ids
+    }
+
+
 def get_one_day_schedule(device_id, gateway_id, dayofweek, collect_date=None):
     """디바이스의 전력 사용여부를 확인하여 해당 요일의 전력 차단 스케줄.
 
@@ -29,196 +123,268 @@ def get_one_day_schedule(device_id, gateway_id, dayofweek, collect_date=None):
     dayofweek = dayofweek + 1 if dayofweek is not None else 1
 
     # 디바이스가 항상 켜져 있어야 하는 경우는 모든 시간 사용상태를 1로 반환
-    sql = f"""
-        SELECT
-             IFNULL(T.ALWAYS_ON, 0)  AS always_on
-        FROM AH_DEVICE_MODEL T
-        WHERE 1 = 1
-        AND T.DEVICE_ID  = '{device_id}'
-    """
-    with settings.open_db_connection() as conn:
-        always_on = pd.read_sql(sql, con=conn).loc[0, "always_on"]
+    if get_always_on(device_id) == 1:
+        return _fixed_schedule(dayofweek, status=1)
 
-    if always_on == 1:
-        df = pd.DataFrame(
-            [[str(dayofweek), "00:00:00", "23:59:00", "1439", "1"]],
-            columns=[
-                "dayofweek",
-                "start",
-                "end",
-                "duration",
-                "status",
-            ],
-        )
+    df = get_schedule_logs(
+        device_id, gateway_id, collect_date=collect_date, dayofweek=dayofweek
+    )
 
-        return df
+    return make_day_schedule(df, dayofweek)
 
-    # 지정된 일자가 없으면 현재 날짜로 지정
-    collect_date = (
-        collect_date
-        if collect_date
-        else datetime.datetime.now().strftime("%Y%m%d")
+
+def _fixed_schedule(dayofweek, status):
+    """하루종일 같은 상태인 스케줄
+
+    Args:
+        dayofweek (int): 요일 (1:일 2:월 3:화 4:수 5:목 6:금 7:토)
+        status (int): 사용상태
+
+    Returns:
+        dataframe: 해당 요일의 전력 차단 스케줄
+    """
+    return pd.DataFrame(
+        [[str(dayofweek), "00:00:00", "23:59:00", "1439", str(status)]],
+        columns=[
+            "dayofweek",
+            "start",
+            "end",
+            "duration",
+            "status",
+        ],
     )
 
-    sql = f"""
-        SELECT
-              T.DAY_NM            AS day_nm
-            , T.COLLECT_DD        AS curr_dt
-            , T.COLLECT_DATE      AS curr_dd
-            , T.APPLIANCE_STATUS  AS status
-        FROM (
-              SELECT
-                      STR_TO_DATE(CONCAT(T.COLLECT_DATE
-                                       , T.COLLECT_TIME)
-                                , '%Y%m%d%H%i')         AS COLLECT_DD
-                    , DAYOFWEEK(T.COLLECT_DATE)         AS DAY_NM
-                    , T.COLLECT_DATE
-                    , T.ENERGY_DIFF
-                    , IFNULL(T.APPLIANCE_STATUS, 0)     AS APPLIANCE_STATUS
-                FROM AH_USE_LOG_BYMINUTE T
-               WHERE 1=1
-                 AND T.GATEWAY_ID = '{gateway_id}'
-                 AND T.DEVICE_ID = '{device_id}'
-                 AND T.COLLECT_DATE >= DATE_FORMAT(
-                                        DATE_ADD(
-                                            STR_TO_DATE('{collect_date}'
-                                                       , '%Y%m%d')
-                                          , INTERVAL -28 DAY)
-                                       , '%Y%m%d')
-                AND T.COLLECT_DATE < '{collect_date}'
-            ) T
-        WHERE 1=1
-          AND T.DAY_NM = '{dayofweek}'
-        ORDER BY
-              T.COLLECT_DD
+
+def make_day_schedule(df, dayofweek):
+    """한 요일의 분단위 전력 사용상태로 전력 차단 스케줄 생성.
+
+    Args:
+        df (dataframe): 해당 요일의 분단위 전력 사용상태 (일시 순 정렬)
+        dayofweek (int): 요일 (1:일 2:월 3:화 4:수 5:목 6:금 7:토)
+
+    Returns:
+        dataframe: 해당 요일의 전력 차단 스케줄
     """
+    return make_week_schedule(df)[dayofweek - 1]
 
-    with settings.open_db_connection() as conn:
-        df = pd.read_sql(sql, con=conn)
-
-    if sum(df.status.apply(lambda x: int(x))) == 0:
-        return pd.DataFrame(
-            [[str(dayofweek), "00:00:00", "23:59:00", "1439", "0"]],
-            columns=[
-                "dayofweek",
-                "start",
-                "end",
-                "duration",
-                "status",
-            ],
-        )
 
-    # 데이터 전처리 ############################################################
-    # 가전기구 사용/대기 상태를 1분전 상태와 비교하여 상태가
-    # 다를경우(ON->OFF, OFF->ON)일 경우만 추출
-    # 60분이상 미사용상태이거나 30분이상 사용상태일 경우만 추출하여
-    # 요일별 시간대별로 사용 대기 상태를 추출한다.
-    df["pre_status"] = df.groupby(by=["curr_dd"], dropna=False)[
-        "status"
-    ].shift(periods=1, fill_value=0)
-
-    diff = df.query("pre_status != status").reset_index(drop=True)
-
-    diff.insert(
-        loc=len(diff.columns),
-        column="start",
-        value=diff["curr_dt"].shift(1).fillna(pd.to_datetime(diff["curr_dd"])),
-    )
+# 분(0~1439) -> "HH:MM:SS"
+_MINUTE_LABELS = np.array(
+    [f"{m // 60:02d}:{m % 60:02d}:00" for m in range(1440)], dtype=object
+)
 
-    diff.insert(
-        loc=len(diff.columns),
-        column="duration",
-        value=(diff["curr_dt"] - diff["start"]).apply(
-            lambda x: x.seconds / 60
-        ),
-    )
 
-    diff = diff.loc[
-        :, ["day_nm", "start", "curr_dt", "duration", "pre_status"]
-    ].rename(
-        columns={
-            "curr_dt": "end",
-            "pre_status": "status",
-            "day_nm": "dayofweek",
-        }
-    )
-    # 60분이상 미사용상태이거나 30분이상 사용상태일 경우만 추출
-    diff.query(
-        "index == 0 | (duration >= 60 & status == 0) "
-        "| (duration >= 30 & status == 1)",
-        inplace=True,
-    )
+def make_week_schedule(df):
+    """분단위 전력 사용상태로 요일별 전력 차단 스케줄을 한번에 생성.
 
-    diff["start_tm"] = diff["start"].apply(lambda x: str(x).split()[1])
+    일시 대신 요일, 하루중 분(0~1439) 정수 배열로 변환하여
+    사용/대기 상태가 바뀌는 구간(run)을 찾고 스케줄로 변환한다.
 
-    diff = diff.sort_values("start_tm").reset_index(drop=True)
-    # 해당 시간에 상태가 중복되면 상태 1(on)이 우선권을 가짐
-    diff.insert(
-        loc=len(diff.columns),
-        column="rnk",
-        value=diff.groupby(by=["start_tm"])["status"].rank(
-            ascending=False, method="first"
-        ),
-    )
+    Args:
+        df (dataframe): 요일(day_nm), 일시(curr_dt), 일자(curr_dd),
+            사용상태(status). 일시 순 정렬
 
-    diff.query("rnk == 1", inplace=True)
-    # 연속되는 상태를 제거
-    diff.insert(
-        loc=len(diff.columns),
-        column="pre_status",
-        value=diff["status"].shift(1),
+    Returns:
+        list: 요일별(1:일 ~ 7:토) 전력 차단 스케줄 dataframe 리스트
+    """
+    status = df["status"].to_numpy().astype(np.int64)
+    day_dtype = df["day_nm"].dtype
+    day = df["day_nm"].to_numpy().astype(np.int64)
+    curr_dt = pd.to_datetime(df["curr_dt"]).to_numpy()
+    minute = (
+        curr_dt.astype("datetime64[m]") - curr_dt.astype("datetime64[D]")
+    ).astype(np.int64)
+    curr_dd = df["curr_dd"].to_numpy()
+
+    # 요일별로 묶되 요일 내에서는 일시 순서를 유지
+    order = np.argsort(day, kind="stable")
+    day, minute, curr_dd, status = (
+        day[order],
+        minute[order],
+        curr_dd[order],
+        status[order],
     )
 
-    diff = (
-        diff.query("status != pre_status", inplace=False)
-        .drop(columns=["rnk", "pre_status"])
-        .reset_index(drop=True)
+    day_start, day_end, day_status = _run_length_schedule(
+        day, minute, curr_dd, status
     )
 
-    diff.insert(
-        loc=len(diff.columns),
-        column="end_tm",
-        value=diff["start_tm"]
-        .shift(-1)
-        .apply(
-            lambda x: str(x + pd.Timedelta(seconds=-60)).split()[2]
-            if x is not np.nan
-            else "23:59:00"
-        ),
+    used = np.bincount(day, weights=status, minlength=8)
+    bounds = np.searchsorted(day_start[0], np.arange(1, 9))
+
+    schedules = []
+    for dayofweek in range(1, 8):
+        lo, hi = bounds[dayofweek - 1], bounds[dayofweek]
+
+        # 사용기록이 없는 요일은 하루종일 대기상태
+        if used[dayofweek] == 0 or lo == hi:
+            schedules.append(_fixed_schedule(dayofweek, status=0))
+            continue
+
+        start = day_start[1][lo:hi]
+        end = day_end[lo:hi]
+        schedules.append(
+            pd.DataFrame(
+                {
+                    "dayofweek": day_start[0][lo:hi].astype(day_dtype),
+                    "start": _MINUTE_LABELS[start],
+                    "end": _MINUTE_LABELS[end],
+                    "duration": (end - start).astype(np.float64),
+                    "status": day_status[lo:hi],
+                }
+            )
+        )
+
+    return schedules
+
+
+def _run_length_schedule(day, minute, curr_dd, status):
+    """사용/대기 상태 구간(run)으로 스케줄 생성
+
+    1. 일자별로 1분전 상태와 비교하여 상태가 바뀌는 지점을 찾는다.
+       (일자의 첫 데이터는 이전 상태를 대기(0)로 본다)
+    2. 바뀌기 전 상태가 60분이상 대기이거나 30분이상 사용인 구간만 남긴다.
+       (요일의 첫 구간은 자정부터 시작하며 항상 남긴다)
+    3. 같은 시작시간에 여러 주의 상태가 겹치면 사용(1)이 우선권을 가진다.
+    4. 연속되는 같은 상태를 합치고, 다음 구간 시작 1분전을 종료시간으로 한다.
+
+    Args:
+        day (array): 요일 (요일 순 정렬, 요일 내 일시 순)
+        minute (array): 하루중 분(0~1439)
+        curr_dd (array): 일자
+        status (array): 사용상태
+
+    Returns:
+        tuple: (요일, 시작분) 배열
+        array: 종료분
+        array: 구간 상태
+    """
+    n = len(status)
+
+    # 1. 상태가 바뀌는 지점
+    new_date = np.ones(n, dtype=bool)
+    new_date[1:] = (curr_dd[1:] != curr_dd[:-1]) | (day[1:] != day[:-1])
+    pre_status = np.empty_like(status)
+    pre_status[1:] = status[:-1]
+    pre_status[new_date] = 0
+
+    changed = np.flatnonzero(status != pre_status)
+    t_day, t_minute, t_status = (
+        day[changed],
+        minute[changed],
+        pre_status[changed],
     )
 
-    diff["duration"] = (
-        pd.to_datetime(diff["end_tm"], format="%H:%M:%S")
-        - pd.to_datetime(diff["start_tm"], format="%H:%M:%S")
-    ).dt.total_seconds() / 60
-    # 데이터 전처리 #############################################################
+    # 2. 직전 변경 지점부터의 구간 길이(분). 날짜를 넘어가면 하루 단위로 나머지
+    first = np.ones(len(changed), dtype=bool)
+    first[1:] = t_day[1:] != t_day[:-1]
+    t_start = np.empty_like(t_minute)
+    t_start[1:] = t_minute[:-1]
+    t_start[first] = 0
+    duration = (t_minute - t_start) % 1440
+
+    keep = (
+        first
+        | ((duration >= 60) & (t_status == 0))
+        | ((duration >= 30) & (t_status == 1))
+    )
+    k_day, k_start, k_status = t_day[keep], t_start[keep], t_status[keep]
+
+    # 3. 같은 (요일, 시작분)은 상태가 큰 값(사용)을 우선
+    order = np.lexsort((-k_status, k_start, k_day))
+    k_day, k_start, k_status = k_day[order], k_start[order], k_status[order]
+    unique = np.ones(len(k_day), dtype=bool)
+    unique[1:] = (k_day[1:] != k_day[:-1]) | (k_start[1:] != k_start[:-1])
+    k_day, k_start, k_status = k_day[unique], k_start[unique], k_status[unique]
+
+    # 4. 연속되는 같은 상태 제거
+    first = np.ones(len(k_day), dtype=bool)
+    first[1:] = k_day[1:] != k_day[:-1]
+    distinct = first.copy()
+    distinct[1:] |= k_status[1:] != k_status[:-1]
+    k_day, k_start, k_status = (
+        k_day[distinct],
+        k_start[distinct],
+        k_status[distinct],
+    )
 
-    df = diff.loc[
-        :, ["dayofweek", "start_tm", "end_tm", "duration", "status"]
-    ].rename(columns={"start_tm": "start", "end_tm": "end"})
+    last = np.ones(len(k_day), dtype=bool)
+    last[:-1] = k_day[1:] != k_day[:-1]
+    k_end = np.full(len(k_day), 1439, dtype=np.int64)
+    k_end[:-1] = k_start[1:] - 1
+    k_end[last] = 1439
 
-    return df
+    return (k_day, k_start), k_end, k_status
 
 
-def get_ai_schedule(device_id, gateway_id):
+def get_ai_schedule(device_id, gateway_id, collect_date=None):
     """디바이스의 요일별 스케줄 조회.
 
+    항상 켜짐 여부와 4주간의 로그를 한번씩만 조회한 후
+    요일별로 나누어 스케줄을 생성한다.
+
     Args:
         device_id (str): 디바이스ID
         gateway_id (str): 게이트웨이ID
+        collect_date (string, optional): 지정일자. Defaults to None.
+            지정날짜가 없으면 현재날짜로 설정
 
     Returns:
         dataframe: 요일별 전력 차단 스케줄 조회
     """
+    always_on, logs = get_schedule_inputs(
+        device_id, gateway_id, collect_date=collect_date
+    )
+
+    return build_ai_schedule(always_on, logs)
+
+
+def get_schedule_inputs(device_id, gateway_id, collect_date=None):
+    """스케줄 생성에 필요한 항상 켜짐 여부와 4주간의 로그 조회.
+
+    항상 켜짐 디바이스는 로그가 필요 없으므로 조회하지 않는다.
+
+    Args:
+        device_id (str): 디바이스ID
+        gateway_id (str): 게이트웨이ID
+        collect_date (string, optional): 지정일자. Defaults to None.
+            지정날짜가 없으면 현재날짜로 설정
+
+    Returns:
+        int: 항상 켜짐 여부 (1: 항상 켜짐)
+        dataframe: get_schedule_logs로 조회한 로그 (항상 켜짐이면 None)
+    """
+    always_on = get_always_on(device_id)
+    if always_on == 1:
+        return always_on, None
+
+    return always_on, get_schedule_logs(
+        device_id, gateway_id, collect_date=collect_date
+    )
+
+
+def build_ai_schedule(always_on, logs):
+    """조회한 데이터로 요일별 스케줄 생성.
+
+    Args:
+        always_on (int): 항상 켜짐 여부 (1: 항상 켜짐)
+        logs (dataframe): get_schedule_logs로 조회한 4주간의 로그
+
+    Returns:
+        dataframe: 요일별 전력 차단 스케줄
+    """
     df = pd.DataFrame(
         columns=["dayofweek", "start", "end", "duration", "status"]
     )
 
-    for i in range(7):
-        tmp = get_one_day_schedule(
-            device_id=device_id, gateway_id=gateway_id, dayofweek=i
-        )
+    if always_on == 1:
+        schedules = [
+            _fixed_schedule(dayofweek, status=1) for dayofweek in range(1, 8)
+        ]
+    else:
+        schedules = make_week_schedule(logs)
 
+    for tmp in schedules:
         df = pd.concat([df, tmp], ignore_index=True)
 
     return df.loc[:, ["dayofweek", "start", "end", "duration", "status"]]
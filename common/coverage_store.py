@@ -0,0 +1,314 @@
+"""디바이스별 데이터 적재현황 색인
+
+분단위 로그(AH_USE_LOG_BYMINUTE)를 디바이스, 일자별 건수(로그, 라벨링)로 합산하여
+로컬 SQLite에 저장하고, 디바이스별 최초/최종 적재일자, 로그 건수, 라벨링된 일수,
+마지막 라벨링 일자, 적재기간(주수)과 모델 저장소의 마지막 학습일시를 lookup으로
+한번에 조회한다. check_weeks, 학습(training_runner), 일괄작업(schedule_batch,
+relabel_batch)은 로그 테이블 대신 이 색인을 사용한다.
+
+최초 refresh는 전체 기간을 합산하고 이후에는 마지막으로 반영한 일자의
+REFRESH_DAYS일 전부터 오늘까지 다시 합산하므로(늦게 적재된 로그, 라벨링 포함)
+주기적으로 실행한다. 색인은 FIRST_DATE ~ COMPLETE_DATE 구간을 연속으로 반영한 것으로
+보며, 색인이 없거나 반영 기간 밖의 데이터가 필요하면 호출하는 쪽에서 로그 테이블을 조회한다.
+
+    usage example:
+        root> python -m common.coverage_store
+        root> python -m common.coverage_store --start 20201101 --end 20201130
+"""
+import argparse
+import math
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import common.model_store as model_store
+import routes.settings as settings
+
+STORE_PATH = "./datas/coverage.sqlite"
+# refresh시 다시 합산할 일수 (늦게 적재된 로그, 라벨링)
+REFRESH_DAYS = 3
+# 최초 refresh 시작일자 (전체 기간)
+HISTORY_START = "00000000"
+# 한번에 조회할 디바이스 수 (SQLite 파라미터 수 제한)
+QUERY_CHUNK = 500
+
+COLUMNS = [
+    "device_id",
+    "gateway_id",
+    "first_date",
+    "last_date",
+    "log_count",
+    "labeled_days",
+    "last_labeled_date",
+]
+
+
+@contextmanager
+def open_store(path=STORE_PATH):
+    """색인 연결. 테이블이 없으면 생성
+
+    Yields:
+        Object: sqlite3 Connection Object
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS DEVICE_DAY (
+                DEVICE_ID      TEXT    NOT NULL,
+                GATEWAY_ID     TEXT    NOT NULL,
+                COLLECT_DATE   TEXT    NOT NULL,
+                LOG_COUNT      INTEGER NOT NULL,
+                LABELED_COUNT  INTEGER NOT NULL,
+                PRIMARY KEY (DEVICE_ID, GATEWAY_ID, COLLECT_DATE)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS IX_DEVICE_DAY_DATE
+                ON DEVICE_DAY (COLLECT_DATE);
+            CREATE TABLE IF NOT EXISTS COVERAGE_STATE (
+                NAME           TEXT    PRIMARY KEY,
+                FIRST_DATE     TEXT    NOT NULL,
+                COMPLETE_DATE  TEXT    NOT NULL,
+                UPDATED_AT     TEXT    NOT NULL
+            );
+            """
+        )
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def coverage(path=STORE_PATH):
+    """색인에 반영된 기간
+
+    Returns:
+        tuple: (시작일자, 전체 로그가 반영된 마지막 일자), 없으면 None
+    """
+    if not os.path.exists(path):
+        return None
+
+    with open_store(path) as conn:
+        row = conn.execute(
+            "SELECT FIRST_DATE, COMPLETE_DATE FROM COVERAGE_STATE WHERE NAME = ?",
+            ("device",),
+        ).fetchone()
+
+    return tuple(row) if row else None
+
+
+def aggregate(start_date, end_date, path=STORE_PATH):
+    """기간의 분단위 로그를 디바이스, 일자별 건수로 합산하여 저장
+
+    Args:
+        start_date (str): 시작일자 (yyyymmdd)
+        end_date (str): 종료일자 (yyyymmdd)
+        path (str, optional): 색인 경로. Defaults to STORE_PATH.
+
+    Returns:
+        int: 저장한 (디바이스, 일자) 수
+    """
+    df = settings.load_datas(
+        query_file="cv_select_device_days.sql",
+        params={"start_date": start_date, "end_date": end_date},
+    )
+
+    # 오늘 로그는 아직 적재중이므로 어제까지를 반영 완료로 본다
+    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
+    complete_date = min(end_date, yesterday)
+
+    with open_store(path) as conn:
+        # 기간 안에서 로그가 없어진 일자가 남지 않도록 삭제 후 저장
+        conn.execute(
+            "DELETE FROM DEVICE_DAY WHERE COLLECT_DATE BETWEEN ? AND ?",
+            (start_date, end_date),
+        )
+        conn.executemany(
+            "INSERT INTO DEVICE_DAY (DEVICE_ID, GATEWAY_ID, COLLECT_DATE, "
+            "LOG_COUNT, LABELED_COUNT) VALUES (?, ?, ?, ?, ?)",
+            [
+                (str(d), str(g), str(c), int(n), int(m))
+                for d, g, c, n, m in df.loc[
+                    :,
+                    [
+                        "device_id",
+                        "gateway_id",
+                        "collect_date",
+                        "log_count",
+                        "labeled_count",
+                    ],
+                ].itertuples(index=False)
+            ],
+        )
+
+        state = conn.execute(
+            "SELECT FIRST_DATE, COMPLETE_DATE FROM COVERAGE_STATE WHERE NAME = ?",
+            ("device",),
+        ).fetchone()
+
+        if start_date > complete_date:
+            return len(df)
+
+        first_date = start_date
+        if state:
+            # 반영 기간과 겹치거나 이어지는 경우만 반영 기간을 넓힌다
+            if complete_date < _shift(state[0], -1) or _shift(state[1], 1) < start_date:
+                print(
+                    f"[coverage] {start_date}~{complete_date} is not contiguous "
+                    f"with {state[0]}~{state[1]}, coverage unchanged"
+                )
+                return len(df)
+
+            first_date = min(state[0], start_date)
+            complete_date = max(state[1], complete_date)
+
+        conn.execute(
+            "INSERT OR REPLACE INTO COVERAGE_STATE "
+            "(NAME, FIRST_DATE, COMPLETE_DATE, UPDATED_AT) VALUES (?, ?, ?, ?)",
+            (
+                "device",
+                first_date,
+                complete_date,
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            ),
+        )
+
+    return len(df)
+
+
+def _shift(collect_date, days):
+    if collect_date == HISTORY_START:
+        return collect_date
+
+    return (datetime.strptime(collect_date, "%Y%m%d") + timedelta(days=days)).strftime(
+        "%Y%m%d"
+    )
+
+
+def refresh(path=STORE_PATH):
+    """마지막 반영일자 REFRESH_DAYS일 전부터 오늘까지 다시 합산 (최초는 전체 기간)
+
+    Returns:
+        int: 저장한 (디바이스, 일자) 수
+    """
+    state = coverage(path)
+    today = datetime.now().strftime("%Y%m%d")
+
+    start_date = HISTORY_START if state is None else _shift(state[1], 1 - REFRESH_DAYS)
+
+    return aggregate(start_date, today, path=path)
+
+
+def lookup(device_ids=None, models=True, path=STORE_PATH):
+    """디바이스별 데이터 적재현황
+
+    Args:
+        device_ids (list, optional): 디바이스ID 리스트. Defaults to None(전체).
+        models (bool, optional): 모델 저장소의 학습정보 포함여부. Defaults to True.
+        path (str, optional): 색인 경로. Defaults to STORE_PATH.
+
+    Returns:
+        dataframe: (디바이스ID, 게이트웨이ID)별 최초 적재일자(first_date),
+            최종 적재일자(last_date), 로그 건수(log_count), 라벨링된 일수(labeled_days),
+            마지막 라벨링 일자(last_labeled_date, 없으면 None),
+            적재기간 주수(weeks, 색인 시작일자 이전 로그가 있을 수 있으면 None),
+            마지막 학습일시(trained_at), 학습 데이터 마지막 일자(trained_date,
+            없으면 학습일자. 모델이 없으면 None).
+            색인이 없으면 None. 색인에 로그가 없는 디바이스는 제외
+    """
+    if not os.path.exists(path):
+        return None
+
+    query = (
+        "SELECT DEVICE_ID, GATEWAY_ID, MIN(COLLECT_DATE), MAX(COLLECT_DATE), "
+        "       SUM(LOG_COUNT), SUM(LABELED_COUNT > 0), "
+        "       MAX(CASE WHEN LABELED_COUNT > 0 THEN COLLECT_DATE END) "
+        "  FROM DEVICE_DAY "
+    )
+    group_by = " GROUP BY DEVICE_ID, GATEWAY_ID"
+
+    if device_ids is None:
+        chunks = [None]
+    else:
+        device_ids = [str(device_id) for device_id in device_ids]
+        chunks = [
+            device_ids[i : i + QUERY_CHUNK]
+            for i in range(0, len(device_ids), QUERY_CHUNK)
+        ]
+
+    rows = []
+    with open_store(path) as conn:
+        state = conn.execute(
+            "SELECT FIRST_DATE, COMPLETE_DATE FROM COVERAGE_STATE WHERE NAME = ?",
+            ("device",),
+        ).fetchone()
+        if state is None:
+            return None
+
+        for chunk in chunks:
+            if chunk is None:
+                rows += conn.execute(query + group_by).fetchall()
+            else:
+                rows += conn.execute(
+                    query
+                    + f"WHERE DEVICE_ID IN ({', '.join('?' * len(chunk))})"
+                    + group_by,
+                    chunk,
+                ).fetchall()
+
+    # dl_select_weeks.sql과 같이 오늘까지의 일수를 7로 나누어 올림.
+    # 최초 적재일자가 색인 시작일자와 같으면 그 이전 로그가 있을 수 있으므로 None
+    today = datetime.now().date()
+    rows = [
+        row
+        + (
+            math.ceil((today - datetime.strptime(row[2], "%Y%m%d").date()).days / 7)
+            if row[2] > state[0]
+            else None,
+        )
+        for row in rows
+    ]
+    columns = COLUMNS + ["weeks"]
+
+    if models:
+        current = model_store.current_models("devices", [row[0] for row in rows])
+        # 학습 데이터의 마지막 일자가 없으면 학습일자
+        rows = [
+            row
+            + (
+                (
+                    current[row[0]]["trained_at"],
+                    current[row[0]]["last_collect_date"]
+                    or current[row[0]]["trained_at"][:10].replace("-", ""),
+                )
+                if row[0] in current
+                else (None, None)
+            )
+            for row in rows
+        ]
+        columns += ["trained_at", "trained_date"]
+
+    return pd.DataFrame(rows, columns=columns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="디바이스별 데이터 적재현황 색인")
+    parser.add_argument("--start", help="다시 합산할 시작일자 (yyyymmdd)")
+    parser.add_argument("--end", help="다시 합산할 종료일자 (yyyymmdd). 기본값: 오늘")
+    parser.add_argument("--path", default=STORE_PATH, help="색인 경로")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.start:
+        end = args.end or datetime.now().strftime("%Y%m%d")
+        saved = aggregate(args.start, end, path=args.path)
+    else:
+        saved = refresh(path=args.path)
+
+    print(
+        f"[coverage] {saved} device days saved, coverage {coverage(args.path)} "
+        f"({time.perf_counter() - started:.1f}s)"
+    )
@@ -9,7 +9,9 @@
 import pandas as pd
 import numpy as np
 import routes.settings as settings
-import joblib
+from routes import metrics
+import common.model_store as model_store
+import common.coverage_store as coverage_store
 from datetime import datetime, timedelta
 
 
@@ -34,9 +36,16 @@ def split_x_y(df, x_col="", y_col=""):
     return x, y
 
 
-def sliding_window_transform(x, y, step_size=10, lag=2, is_training=1):
+@metrics.timed("sliding_window")
+def sliding_window_transform(
+    x, y, step_size=10, lag=2, is_training=1, as_view=False, dtype=None
+):
     """데이터의 형식 변환
 
+    x를 (행수, step_size * 컬럼수) 형태의 sliding window로 변환한다.
+    C-contiguous 배열에서 연속된 step_size개의 행은 메모리상에서도 연속되어
+    있으므로 as_strided로 복사없이 window를 만든다.
+
     Args:
         x (array): source datas
         y (array): target datas
@@ -45,28 +54,57 @@ def sliding_window_transform(x, y, step_size=10, lag=2, is_training=1):
         is_training (int, optional): 초기 데이터 생성 여부. Defaults to 1.
                 0: x의 기본값 미생성
                 1: x의 기본값을 step_size만큼 생성
+        as_view (bool, optional): 읽기전용 view 반환 여부. Defaults to False.
+                True: 복사없이 원본(또는 padding된 버퍼)을 참조하는 view
+                False: C-contiguous 배열로 한번만 복사
+        dtype (dtype, optional): 반환할 데이터 타입(ex. np.float32).
+                Defaults to None(기존 변환 결과와 같은 타입)
 
     Returns:
-        list: 변환된 source datas
-        list: 변환된 target datas
+        array: 변환된 source datas
+        array: 변환된 target datas
     """
-    # 학습데이터의 형태를 확인한 후 데이터를 생성
-    n_shape = np.shape(x)
+    x = np.asarray(x)
+
+    if x.ndim < 2:
+        x = x.reshape(-1, 1)
+
+    cols = x.shape[1]
+
+    # 기존 list 변환 방식과 같은 결과 타입을 사용
+    # (실수/padding 포함 -> float64, 정수/bool -> 그대로)
+    out_dtype = dtype
 
-    cols = n_shape[1] if len(n_shape) > 1 else 1
+    if dtype is None:
+        # lag가 padding 구간보다 크면 padding 값은 결과에 포함되지 않음
+        if (is_training and lag < step_size - 1) or x.dtype.kind not in "biu":
+            dtype = np.float64
+        else:
+            dtype = x.dtype
+
+    # view는 반환 타입 그대로, 복사본은 마지막에 한번만 타입 변환
+    x = np.ascontiguousarray(x, dtype=dtype if as_view else None)
 
     if is_training:
-        x = [[0.0 for i in range(cols)]] * (step_size - 1) + x.tolist()
-    else:
-        x = x.tolist()
+        x = np.concatenate([np.zeros((step_size - 1, cols), dtype=x.dtype), x], axis=0)
 
-    x_transformed = [
-        x[i - step_size + lag : i + lag]
-        for i in range(len(x) + 1 - lag)
-        if i > step_size - 1
-    ]
+    n_rows = max(len(x) - lag - step_size + 1, 0)
 
-    x_transformed = np.reshape(x_transformed, (-1, (step_size * cols)))
+    if n_rows == 0:
+        # 빈 결과는 기존 구현과 같이 float64로 반환 (dtype 지정시 제외)
+        x_transformed = np.empty((0, step_size * cols), dtype=out_dtype or np.float64)
+        x_transformed.flags.writeable = not as_view
+    else:
+        flat = x.reshape(-1)[lag * cols :]
+        x_transformed = np.lib.stride_tricks.as_strided(
+            flat,
+            shape=(n_rows, step_size * cols),
+            strides=(cols * flat.itemsize, flat.itemsize),
+            writeable=False,
+        )
+
+        if not as_view:
+            x_transformed = np.array(x_transformed, dtype=dtype, order="C")
 
     return x_transformed, y[:-lag] if lag > 0 else y
 
@@ -91,12 +129,13 @@ def labeling(device_id, gateway_id, collect_date, is_csv=False):
         end_dd = (collect_dd + timedelta(days=1, minutes=9)).strftime(
             "%Y-%m-%d %H:%M:%S"
         )
-        condition = (
-            f"(device_id == '{device_id}') "
-            f"and ('{start_dd}' <= collect_dd <= '{end_dd}')"
-        )
-        df = settings.load_datas_from_csv(
-            csv_file="predict/devices.csv", condition=condition
+        df = settings.load_indexed_datas_from_csv(
+            csv_file="predict/devices.csv",
+            key_col="device_id",
+            key=device_id,
+            range_col="collect_dd",
+            start=start_dd,
+            end=end_dd,
         )
     else:
         df = settings.load_datas(
@@ -111,14 +150,174 @@ def labeling(device_id, gateway_id, collect_date, is_csv=False):
     x, y = split_x_y(df, x_col=["energy_diff", "power"], y_col="energy_diff")
     x, y = sliding_window_transform(x, y, step_size=30, lag=10, is_training=0)
 
-    path = f"./pickles/devices/{device_id}.pkl"
-    model = joblib.load(path)
+    model = model_store.load_model("devices", device_id)
 
-    y = model.predict(x).astype(np.int).tolist()
+    with metrics.span("predict", "devices"):
+        y = model.predict(x).astype(np.int).tolist()
 
     return y
 
 
+def labeling_batch(targets, is_csv=False):
+    """여러 디바이스/일자의 전력 사용상태를 분단위로 라벨링
+
+    게이트웨이별로 한번에 로그를 조회한 후 디바이스별로 모든 일자의
+    sliding window를 만들어 모델당 한번만 예측한다.
+    결과는 디바이스 단위로 순차 반환한다.
+
+    Args:
+        targets (list): (디바이스ID, 게이트웨이ID, 일자) 리스트
+        is_csv (bool, optional): 데이터를 csv 파일에서 조회여부. Defaults to False.
+
+    Yields:
+        str: 디바이스ID
+        str: 게이트웨이ID
+        dictionary: 일자별 분단위 전력 사용상태 리스트
+        str: 오류 메시지 (정상 처리시 None)
+    """
+    # 게이트웨이 -> 디바이스 -> 일자 순으로 그룹핑
+    gateways = {}
+    for device_id, gateway_id, collect_date in targets:
+        devices = gateways.setdefault(gateway_id, {})
+        devices.setdefault(device_id, set()).add(collect_date)
+
+    # 학습모델이 없는 디바이스는 로그를 조회하지 않는다
+    trained = model_store.existing(
+        "devices", {device_id for devices in gateways.values() for device_id in devices}
+    )
+
+    for gateway_id, devices in gateways.items():
+        missing = [device_id for device_id in devices if device_id not in trained]
+        for device_id in missing:
+            del devices[device_id]
+            yield device_id, gateway_id, None, f"model not found: devices/{device_id}"
+
+        if not devices:
+            continue
+
+        try:
+            df = _load_labeling_datas(gateway_id, devices, is_csv=is_csv)
+        except Exception as ex:
+            for device_id in devices:
+                yield device_id, gateway_id, None, str(ex)
+            continue
+
+        groups = df.groupby("device_id", sort=False).indices
+
+        for device_id, dates in devices.items():
+            try:
+                rows = groups.get(device_id, np.array([], dtype=np.int64))
+                pred_y = _label_device(df.iloc[rows], sorted(dates))
+            except Exception as ex:
+                yield device_id, gateway_id, None, str(ex)
+                continue
+
+            yield device_id, gateway_id, pred_y, None
+
+
+def _load_labeling_datas(gateway_id, devices, is_csv=False):
+    """게이트웨이의 라벨링 대상 디바이스 로그를 한번에 조회
+
+    각 일자의 20분 전 ~ 10분 후 데이터가 필요하므로 전/후 일자를 함께 조회한다.
+
+    Args:
+        gateway_id (str): 게이트웨이ID
+        devices (dictionary): 디바이스ID별 일자 목록
+        is_csv (bool, optional): 데이터를 csv 파일에서 조회여부. Defaults to False.
+
+    Returns:
+        dataframe: 디바이스, 수집일시 순으로 정렬된 로그 데이터
+    """
+    collect_dates = set()
+    for dates in devices.values():
+        for collect_date in dates:
+            collect_dd = datetime.strptime(collect_date, "%Y%m%d")
+            for days in (-1, 0, 1):
+                collect_dates.add(
+                    (collect_dd + timedelta(days=days)).strftime("%Y%m%d")
+                )
+
+    if is_csv:
+        # 디바이스별로 전체 일자를 포함하는 구간만 조회
+        start_dd = datetime.strptime(min(collect_dates), "%Y%m%d")
+        end_dd = datetime.strptime(max(collect_dates), "%Y%m%d") + timedelta(days=1)
+        df = pd.concat(
+            [
+                settings.load_indexed_datas_from_csv(
+                    csv_file="predict/devices.csv",
+                    key_col="device_id",
+                    key=device_id,
+                    range_col="collect_dd",
+                    start=start_dd.strftime("%Y-%m-%d %H:%M:%S"),
+                    end=end_dd.strftime("%Y-%m-%d %H:%M:%S"),
+                    include_end=False,
+                )
+                for device_id in sorted(devices)
+            ],
+            ignore_index=True,
+        )
+    else:
+        df = settings.load_datas(
+            query_file="dl_select_labeling_batch.sql",
+            params={
+                "gateway_id": gateway_id,
+                "device_ids": tuple(sorted(devices)),
+                "collect_dates": tuple(sorted(collect_dates)),
+            },
+        )
+
+    df["collect_dd"] = pd.to_datetime(df["collect_dd"])
+
+    return df.sort_values(["device_id", "collect_dd"], kind="mergesort")
+
+
+def _label_device(df, dates):
+    """한 디바이스의 여러 일자를 한번의 예측으로 라벨링
+
+    Args:
+        df (dataframe): 수집일시 순으로 정렬된 디바이스 로그 데이터
+        dates (list): 일자 리스트
+
+    Returns:
+        dictionary: 일자별 분단위 전력 사용상태 리스트
+    """
+    x = np.ascontiguousarray(df.loc[:, ["energy_diff", "power"]].values)
+    collect_dd = df["collect_dd"].values
+
+    windows = []
+    for collect_date in dates:
+        # 20분 전 ~ 10분 후의 데이터
+        day = np.datetime64(datetime.strptime(collect_date, "%Y%m%d"), "m")
+        start = np.searchsorted(collect_dd, day - np.timedelta64(20, "m"), "left")
+        end = np.searchsorted(collect_dd, day + np.timedelta64(1449, "m"), "right")
+
+        x_day, _ = sliding_window_transform(
+            x[start:end],
+            collect_dd[start:end],
+            step_size=30,
+            lag=10,
+            is_training=0,
+            as_view=True,
+        )
+        windows.append(x_day)
+
+    sizes = [len(x_day) for x_day in windows]
+
+    if sum(sizes) == 0:
+        return {collect_date: [] for collect_date in dates}
+
+    model = model_store.load_model("devices", df["device_id"].iloc[0])
+
+    # 모든 일자의 window를 모아서 한번에 예측
+    with metrics.span("predict", "devices"):
+        pred_y = model.predict(np.concatenate(windows)).astype(int)
+
+    return {
+        collect_date: y.tolist()
+        for collect_date, y in zip(dates, np.split(pred_y, np.cumsum(sizes)[:-1]))
+    }
+
+
 def predict_elec(house_no, date, is_csv=False):
     """한 가구의 한달 사용전력량을 일별로 예측
 
@@ -138,13 +337,14 @@ def predict_elec(house_no, date, is_csv=False):
             + timedelta(days=-7)
         ).strftime("%Y%m%d")
 
-        condition = (
-            f"(house_no == '{house_no}') "
-            f"and ({int(start_dd)} <= use_date < {int(date)})"
-        )
-
-        df = settings.load_datas_from_csv(
-            csv_file="predict/houses.csv", condition=condition
+        df = settings.load_indexed_datas_from_csv(
+            csv_file="predict/houses.csv",
+            key_col="house_no",
+            key=house_no,
+            range_col="use_date",
+            start=int(start_dd),
+            end=int(date),
+            include_end=False,
         )
     else:
         df = settings.load_datas(
@@ -176,11 +376,11 @@ def predict_elec(house_no, date, is_csv=False):
         encoding="utf-8",
     )
 
-    path = f"./pickles/houses/{house_no}.pkl"
-    model = joblib.load(path)
+    model = model_store.load_model("houses", house_no)
 
     # 7일치의 전력사용량을 기반으로 8일째 전력사용량을 예측
-    pred_y = model.predict(x).tolist()
+    with metrics.span("predict", "houses"):
+        pred_y = model.predict(x).tolist()
 
     return pred_y
 
@@ -188,6 +388,8 @@ def predict_elec(house_no, date, is_csv=False):
 def check_weeks(device_id, gateway_id):
     """전력사용 로그 테이블의 적재된 기간 확인
 
+    데이터 적재현황 색인(common.coverage_store)에 있으면 색인을 사용한다.
+
     Args:
         device_id (str): 디바이스ID
         gateway_id (str): 게이트웨이ID
@@ -195,17 +397,17 @@ def check_weeks(device_id, gateway_id):
     Returns:
         int: 데이터 적재기간(주수)
     """
-    sql = f"""
-        SELECT
-               CEIL(DATEDIFF(NOW(),
-                    DATE_FORMAT(min(T.COLLECT_DATE), '%Y%m%d'))/7) AS weeks
-          FROM AH_USE_LOG_BYMINUTE T
-         WHERE 1 = 1
-           AND T.GATEWAY_ID = '{gateway_id}'
-           AND T.DEVICE_ID = '{device_id}'
-    """
-    with settings.open_db_connection() as conn:
-        weeks = pd.read_sql(sql, con=conn).loc[0, "weeks"]
+    # 데이터 적재현황 색인으로 알 수 있으면 로그 테이블을 조회하지 않는다
+    index = coverage_store.lookup([device_id], models=False)
+    if index is not None:
+        for gateway, weeks in zip(index["gateway_id"], index["weeks"]):
+            if gateway == str(gateway_id) and pd.notna(weeks):
+                return int(weeks)
+
+    weeks = settings.load_datas(
+        query_file="dl_select_weeks.sql",
+        params={"device_id": device_id, "gateway_id": gateway_id},
+    ).loc[0, "weeks"]
 
     return weeks
 
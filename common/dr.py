@@ -3,9 +3,416 @@
 Returns:
     [type]: [description]
 """
+import threading
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
 import pandas as pd
+
+import common.energy_store as energy_store
+import routes.metrics as metrics
 import routes.settings as settings
 
+# 종료된 DR 요청의 결과 캐시 유지시간(초)
+CACHE_SECONDS = 300
+# DR 요청 일시(AH_DR_REQUEST)의 UTC offset(시간). 추천 디바이스 조회와 같이
+# 데이터베이스 시각을 UTC로 보고 한국시간(KST)으로 비교한다
+DR_UTC_OFFSET_HOURS = 9
+# 추천 디바이스 선택 방식
+#   greedy: 추천 순서대로 누적 사용량이 (CBL - 전력절감량)보다 작은 디바이스까지
+#   knapsack: 사용량 합계가 (CBL - 전력절감량)보다 작으면서 가장 큰 디바이스 조합
+SOLVER = "greedy"
+# knapsack 사용량 이산화 단위
+KNAPSACK_UNIT = 1.0
+# 가구당 knapsack 계산 크기(디바이스 수 x 이산화한 사용량) 상한.
+# 넘으면 이산화 단위를 키워서 근사한다 (가구당 처리시간 상한)
+KNAPSACK_MAX_CELLS = 500000
+
+# (요청DR번호, 가구식별번호) -> (만료일시, 결과)
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def reduction_energy_of(cbl):
+    """CBL에 따른 전력절감량
+
+    Args:
+        cbl (float): CBL
+
+    Returns:
+        float: 전력절감량 (CBL이 없으면(nan) 300)
+    """
+    if cbl <= 500:
+        reduction_energy = cbl * 0.3
+    elif cbl <= 1500:
+        reduction_energy = cbl * 0.15 + 75
+    else:
+        reduction_energy = 300
+
+    return reduction_energy
+
+
+def cbl_event(request_dr_no, house_nos):
+    """DR 요청에 참여하는 가구들의 CBL 산출
+
+    가구별로 DR 요청 전 7일 중 평일의 DR 시간대 사용량 상위 4일의 평균을
+    CBL로 한다. 15분 단위 사용량 저장소(common.energy_store)가 해당 기간을
+    반영했고 DR 시간대가 15분 단위이면 저장소를 사용하고, 아니면 분단위 로그를
+    한번에 조회한다.
+
+    Args:
+        request_dr_no (str): 요청DR식별번호
+        house_nos (list): 가구식별번호 리스트
+
+    Returns:
+        dataframe: 가구별 CBL(cbl), 전력절감량(reduction_energy).
+            사용량이 없는 가구의 CBL은 nan
+    """
+    cbl = _cbl_from_store(request_dr_no, house_nos)
+
+    if cbl is None:
+        df = settings.load_datas(
+            query_file="dr_select_cbl_batch.sql",
+            params={
+                "request_dr_no": request_dr_no,
+                "house_nos": tuple(house_nos),
+            },
+        )
+
+        cbl = (
+            df.sort_values(["house_no", "energy"], ascending=[True, False])
+            .groupby("house_no")
+            .head(4)
+            .groupby("house_no")["energy"]
+            .mean()
+            .reindex(house_nos)
+            .to_numpy(dtype=float)
+        )
+
+    return pd.DataFrame(
+        {
+            "cbl": cbl,
+            "reduction_energy": pd.Series(
+                [reduction_energy_of(value) for value in cbl],
+                dtype=object,
+            ).values,
+        },
+        index=pd.Index(house_nos, name="house_no"),
+    )
+
+
+def _cbl_from_store(request_dr_no, house_nos):
+    """15분 단위 사용량 저장소로 CBL 산출
+
+    Returns:
+        array: 가구별 CBL (사용량이 없으면 nan).
+            저장소를 사용할 수 없으면 None
+    """
+    if energy_store.coverage(path=energy_store.STORE_PATH) is None:
+        return None
+
+    df = settings.load_datas(
+        query_file="dr_select_request.sql",
+        params={"request_dr_no": request_dr_no},
+    )
+    if len(df) == 0:
+        return None
+
+    start = pd.Timestamp(df["start_date"].iloc[0])
+    end = pd.Timestamp(df["end_date"].iloc[0])
+    start_minute = start.hour * 60 + start.minute
+    end_minute = end.hour * 60 + end.minute
+
+    # 같은 날 15분 단위로 시작, 종료하는 DR 시간대만 사용 (14:00 ~ 14:59, 15:00)
+    if (
+        start.normalize() != end.normalize()
+        or not energy_store.supports_window(start_minute, end_minute)
+    ):
+        return None
+
+    days = [start - timedelta(days=i) for i in range(7, 0, -1)]
+    if not energy_store.covers(
+        days[0].strftime("%Y%m%d"),
+        days[-1].strftime("%Y%m%d"),
+        path=energy_store.STORE_PATH,
+    ):
+        return None
+
+    with metrics.span("energy_store", "cbl"):
+        energy = energy_store.window_energy(
+            list(house_nos),
+            [d.strftime("%Y%m%d") for d in days if d.weekday() < 5],
+            start_minute,
+            end_minute,
+            path=energy_store.STORE_PATH,
+        )
+
+    # 사용량 상위 4일 평균 (사용량이 없는 일자는 제외)
+    top = -np.sort(np.where(np.isnan(energy), np.inf, -energy), axis=1)[:, :4]
+    valid = np.isfinite(top)
+    count = valid.sum(axis=1)
+
+    return np.divide(
+        np.where(valid, top, 0).sum(axis=1),
+        count,
+        out=np.full(len(count), np.nan),
+        where=count > 0,
+    )
+
+
+def recommend(df, cbl, solver=None):
+    """가구별 참여 디바이스 선택
+
+    디바이스 사용량은 max(사용, 대기) 에너지이며 추천 순서는 조회 순서
+    (상태, on/off, 사용빈도, 에너지)이다.
+
+        - greedy: 가구별 누적 사용량이 (CBL - 전력절감량)보다 작은
+          디바이스까지 참여를 허용한다.
+        - knapsack: 사용량 합계가 (CBL - 전력절감량)보다 작으면서 가장 큰
+          디바이스 조합을 선택하고 (select_devices), 같으면 추천 순서가
+          앞선 디바이스를 선택한다. 선택한 디바이스를 앞에 둔다.
+
+    Args:
+        df (dataframe): dr_select_recommendation_batch.sql 조회 결과
+        cbl (dataframe): cbl_event 반환값
+        solver (str, optional): 선택 방식 (greedy, knapsack).
+            Defaults to None(SOLVER).
+
+    Returns:
+        dictionary: 가구식별번호별 디바이스 dataframe
+            (device_id, energy_sum, permission, 추천 순서)
+    """
+    solver = solver or SOLVER
+    if solver not in ("greedy", "knapsack"):
+        raise ValueError(f"unknown solver: {solver}")
+
+    use = df["energy_use"].to_numpy(dtype=float)
+    wait = df["energy_wait"].to_numpy(dtype=float)
+    # max(사용, 대기)와 같이 nan이 있으면 사용 에너지를 그대로 사용
+    energy = np.where(wait > use, wait, use)
+    df = df.assign(energy_sum=energy)
+
+    limit = (cbl["cbl"] - cbl["reduction_energy"].astype(float)).reindex(
+        df["house_no"]
+    )
+    limit = limit.to_numpy(dtype=float)
+
+    if solver == "greedy":
+        cusum = df.groupby("house_no")["energy_sum"].cumsum().to_numpy()
+        df["permission"] = cusum < limit
+    else:
+        permission = np.zeros(len(df), dtype=bool)
+        for index in df.groupby("house_no", sort=False).indices.values():
+            permission[index] = select_devices(energy[index], limit[index[0]])
+        df["permission"] = permission
+
+    df["energy_sum"] = df["energy_sum"].map(str)
+
+    results = {}
+    for house_no, group in df.groupby("house_no", sort=False):
+        if solver == "knapsack":
+            group = group.sort_values(
+                "permission", ascending=False, kind="stable"
+            )
+        results[house_no] = group.loc[
+            :, ["device_id", "energy_sum", "permission"]
+        ].reset_index(drop=True)
+
+    return results
+
+
+def select_devices(
+    energy, limit, unit=KNAPSACK_UNIT, max_cells=KNAPSACK_MAX_CELLS
+):
+    """사용량 합계가 limit보다 작으면서 가장 큰 디바이스 조합 (0/1 knapsack)
+
+    사용량을 unit 단위로 올림하여 이산화하고 추천 순서의 뒤에서부터
+    DP 표를 만든 후, 앞에서부터 최적값을 유지하는 디바이스를 선택하므로
+    합계가 같으면 추천 순서가 앞선 디바이스를 선택한다.
+    올림한 사용량으로 계산하므로 선택한 조합의 실제 합계는 항상 limit보다
+    작다. DP 표가 max_cells보다 크면 unit을 키운다 (근사). 올림으로 남은
+    용량은 추천 순서대로 채우고, greedy 선택의 합계가 더 크면 greedy를
+    사용한다.
+
+    Args:
+        energy (array): 추천 순서대로의 디바이스별 사용량 (nan이면 선택 안함)
+        limit (float): 사용량 상한 (CBL - 전력절감량)
+        unit (float, optional): 이산화 단위. Defaults to KNAPSACK_UNIT.
+        max_cells (int, optional): DP 표 크기 상한.
+            Defaults to KNAPSACK_MAX_CELLS.
+
+    Returns:
+        array: 디바이스별 선택여부
+    """
+    n = len(energy)
+    selected = np.zeros(n, dtype=bool)
+    valid = ~np.isnan(energy)
+    if not limit > 0 or not valid.any():
+        return selected
+
+    unit = max(unit, limit * (n + 1) / max_cells)
+    capacity = int(np.ceil(limit / unit)) - 1
+    if capacity < 0:
+        return selected
+
+    weights = np.where(valid, np.ceil(energy / unit), capacity + 1)
+    weights = weights.astype(np.int64)
+
+    # best[i, c]: i번째 이후 디바이스로 용량 c 안에서 만들 수 있는 최대 합계
+    best = np.zeros((n + 1, capacity + 1), dtype=np.int64)
+    for i in range(n - 1, -1, -1):
+        best[i] = best[i + 1]
+        w = weights[i]
+        if w <= capacity:
+            np.maximum(
+                best[i + 1, w:],
+                best[i + 1, : capacity + 1 - w] + w,
+                out=best[i, w:],
+            )
+
+    c = capacity
+    for i in range(n):
+        w = weights[i]
+        if w <= c and best[i + 1, c - w] + w == best[i, c]:
+            selected[i] = True
+            c -= w
+
+    # 올림으로 남은 용량에 들어가는 디바이스를 추천 순서대로 추가
+    total = energy[selected].sum()
+    for i in np.flatnonzero(valid & ~selected):
+        if total + energy[i] < limit:
+            selected[i] = True
+            total += energy[i]
+
+    # 근사한 경우 greedy 결과가 더 클 수 있다
+    greedy = valid & (np.cumsum(np.where(valid, energy, 0)) < limit)
+    if energy[greedy].sum() > total:
+        return greedy
+
+    return selected
+
+
+def dr_event(request_dr_no, house_nos=None):
+    """DR 요청에 참여하는 가구들의 CBL, 전력절감량, 추천 디바이스
+
+    가구별 결과는 DR 종료일시까지 캐시하며(종료된 요청은 CACHE_SECONDS)
+    캐시에 없는 가구만 조회한다. 서로 독립적인 조회는 동시에 실행한다.
+
+    Args:
+        request_dr_no (str): 요청DR식별번호
+        house_nos (list, optional): 가구식별번호 리스트.
+            Defaults to None(전체 가구).
+
+    Returns:
+        dictionary: 가구식별번호별 결과
+            dr_success (boolean): DR참여여부
+            cbl (float): CBL
+            reduction_energy (float): 전력절감량
+            recommendation (dictionary): DR참여 추천 디바이스
+                (참여할 수 없으면 "0", 디바이스가 없으면 None)
+    """
+    if house_nos is None:
+        house_nos = settings.load_datas(
+            query_file="dr_select_houses.sql", params={}
+        )["house_no"].tolist()
+
+    now = _now()
+    results = _cached(request_dr_no, house_nos, now)
+
+    missing = [h for h in dict.fromkeys(house_nos) if h not in results]
+    if not missing:
+        return results
+
+    # CBL, 디바이스 목록, DR 종료일시를 동시에 조회
+    cbl, df, expires_at = settings.gather(
+        lambda: cbl_event(request_dr_no, missing),
+        lambda: settings.load_datas(
+            query_file="dr_select_recommendation_batch.sql",
+            params={
+                "request_dr_no": request_dr_no,
+                "house_nos": tuple(missing),
+            },
+        ),
+        lambda: _cache_expiry(request_dr_no, now),
+    )
+    devices = recommend(df, cbl)
+
+    for house_no, value, reduction_energy in zip(
+        cbl.index, cbl["cbl"], cbl["reduction_energy"]
+    ):
+        df = devices.get(house_no)
+        if df is None or df.empty:
+            dr_success, recommendation = False, None
+        else:
+            dr_success = bool(df.loc[0, "permission"])
+            recommendation = df.to_dict("index") if dr_success else "0"
+
+        results[house_no] = {
+            "dr_success": dr_success,
+            "cbl": value,
+            "reduction_energy": reduction_energy,
+            "recommendation": recommendation,
+        }
+
+    with _cache_lock:
+        for key in [k for k, v in _cache.items() if v[0] <= now]:
+            del _cache[key]
+        for house_no in missing:
+            _cache[(request_dr_no, house_no)] = (expires_at, results[house_no])
+
+    return results
+
+
+def _cached(request_dr_no, house_nos, now):
+    """캐시된 가구별 결과"""
+    results = {}
+    with _cache_lock:
+        for house_no in house_nos:
+            cached = _cache.get((request_dr_no, house_no))
+            if cached is not None and cached[0] > now:
+                results[house_no] = cached[1]
+
+    return results
+
+
+def _now():
+    """DR 요청 일시와 같은 시간대(DR_UTC_OFFSET_HOURS)의 현재일시
+
+    서버의 시간대와 관계없이 DR 종료일시와 비교할 수 있도록 UTC에 offset을 더한다.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(
+        hours=DR_UTC_OFFSET_HOURS
+    )
+
+
+def _cache_expiry(request_dr_no, now):
+    """DR 결과 캐시 만료일시 (DR 종료일시, 종료되었으면 CACHE_SECONDS 후)
+
+    now와 반환값은 DR 요청 일시와 같은 시간대 (_now 참고)
+    """
+    df = settings.load_datas(
+        query_file="dr_select_request.sql",
+        params={"request_dr_no": request_dr_no},
+    )
+    end_date = pd.to_datetime(df["end_date"]).max() if len(df) else None
+
+    if end_date is None or pd.isna(end_date) or end_date <= now:
+        return now + timedelta(seconds=CACHE_SECONDS)
+
+    return end_date.to_pydatetime()
+
+
+def clear_cache():
+    """DR 결과 캐시 삭제"""
+    with _cache_lock:
+        _cache.clear()
+
+
+def _check_cbl(house_no, cbl):
+    """가구 단위 조회는 CBL을 산출할 수 없으면 오류"""
+    if pd.isna(cbl):
+        raise ValueError(f"no usage logs for CBL: {house_no}")
+
 
 def cbl_info(house_no, request_dr_no):
     """CBL 산출
@@ -18,61 +425,15 @@ def cbl_info(house_no, request_dr_no):
         float: CBL
         float: 전력절감량
     """
-    sql = f"""
-        SELECT
-             AVG(T.SUM_ENERGY) AS energy_avg
-        FROM (
-            SELECT
-                  T.COLLECT_DATE
-                , SUM(T.ENERGY_DIFF)  AS SUM_ENERGY
-            FROM (
-                    SELECT
-                          T.COLLECT_DATE
-                        , T.COLLECT_TIME
-                        , DAYOFWEEK(T.COLLECT_DATE) AS DAY_NM
-                        , T.ENERGY_DIFF
-                    FROM AH_USE_LOG_BYMINUTE T
-                    INNER JOIN AH_GATEWAY_INSTALL S
-                        ON (S.GATEWAY_ID = T.GATEWAY_ID)
-                    WHERE 1 = 1
-                    AND S.HOUSE_NO  = '{house_no}'
-                    ) T
-            INNER JOIN (
-                    SELECT
-                          DATE_FORMAT(DATE_ADD(START_DATE, INTERVAL -7 DAY)
-                                    , '%Y%m%d')             AS START_DATE
-                        , DATE_FORMAT(DATE_ADD(START_DATE, INTERVAL -1 DAY)
-                                    , '%Y%m%d')             AS END_DATE
-                        , DATE_FORMAT(START_DATE, '%H%i')   AS START_TIME
-                        , DATE_FORMAT(END_DATE, '%H%i')     AS END_TIME
-                    FROM AH_DR_REQUEST R
-                    WHERE 1 = 1
-                    AND R.REQUEST_DR_NO = '{request_dr_no}'
-                ) R
-                ON ( T.COLLECT_DATE BETWEEN R.START_DATE AND R.END_DATE
-                AND T.COLLECT_TIME BETWEEN R.START_TIME AND R.END_TIME )
-            WHERE 1 = 1
-            AND T.DAY_NM BETWEEN 2 AND 6
-            GROUP BY
-                  T.COLLECT_DATE
-                , T.DAY_NM
-            ORDER BY
-                  SUM_ENERGY DESC
-            LIMIT 4
-        ) T
-    """
+    result = _cached(request_dr_no, [house_no], _now()).get(house_no)
 
-    with settings.open_db_connection() as conn:
-        cbl = pd.read_sql(sql, con=conn).iloc[0]["energy_avg"]
+    # 캐시에 없으면 추천 디바이스는 조회하지 않고 CBL만 산출
+    if result is None:
+        result = cbl_event(request_dr_no, [house_no]).iloc[0]
 
-    if cbl <= 500:
-        reduction_energy = cbl * 0.3
-    elif cbl <= 1500:
-        reduction_energy = cbl * 0.15 + 75
-    else:
-        reduction_energy = 300
+    _check_cbl(house_no, result["cbl"])
 
-    return cbl, reduction_energy
+    return result["cbl"], result["reduction_energy"]
 
 
 def get_dr_recommandation(house_no, request_dr_no):
@@ -89,114 +450,21 @@ def get_dr_recommandation(house_no, request_dr_no):
         dictionary: DR참여 추천 디바이스
 
     """
-    cbl, reduction_energy = cbl_info(
-        house_no=house_no, request_dr_no=request_dr_no
-    )
     # 소켓이 항상 켜져있고, 사용 빈도가 작은데 소비량이 많은 경우
-    sql = f"""
-        SELECT
-              T.GATEWAY_ID                                     AS gateway_id
-            , T.DEVICE_ID                                      AS device_id
-            , T.FREQUENCY                                      AS frequency
-            , (SUM(H.WAIT_ENERGY) / SUM(H.WAIT_TIME)) * T.DIFF AS energy_wait
-            , (SUM(H.USE_ENERGY) / SUM(H.USE_TIME))   * T.DIFF AS energy_use
-            , IF(SUM(S.ONOFF) > 2.5, 1, 0)                     AS onoff
-            , IF(AVG(S.POWER) > 0.5, 1, 0)                     AS status
-            , IFNULL(IF(AVG(S.POWER) > 0.5
-                       , SUM(H.USE_ENERGY) / SUM(H.USE_TIME)
-                       , SUM(H.WAIT_ENERGY) / SUM(H.WAIT_TIME))
-                    , 0)                                       AS energy
-        FROM (
-                SELECT
-                      T.GATEWAY_ID
-                    , T.DEVICE_ID
-                    , T.DIFF
-                    , SUM(T.APPLIANCE_STATUS)  AS FREQUENCY
-                FROM (
-                        SELECT
-                              L.GATEWAY_ID
-                            , L.DEVICE_ID
-                            , L.COLLECT_DATE
-                            , R.DIFF
-                            , MAX(IFNULL(L.APPLIANCE_STATUS, 0))
-                                                    AS APPLIANCE_STATUS
-                          FROM AH_GATEWAY_INSTALL G
-                         INNER JOIN AH_USE_LOG_BYMINUTE L
-                            ON (L.GATEWAY_ID = G.GATEWAY_ID)
-                         INNER JOIN AH_DEVICE D
-                            ON (D.DEVICE_ID = L.DEVICE_ID)
-                         INNER JOIN (
-                                SELECT
-                                      DAYOFWEEK(R.START_DATE)           AS DAY_NM
-                                    , DATE_FORMAT(R.START_DATE, '%H%i') AS START_TIME
-                                    , DATE_FORMAT(R.END_DATE, '%H%i')   AS END_TIME
-                                    , TIMESTAMPDIFF(MINUTE
-                                                  , R.START_DATE
-                                                  , R.END_DATE)         AS DIFF
-                                 FROM AH_DR_REQUEST R
-                                WHERE 1 = 1
-                                  AND R.REQUEST_DR_NO = '{request_dr_no}'
-                            ) R
-                            ON ( R.DAY_NM = DAYOFWEEK(L.COLLECT_DATE)
-                             AND L.COLLECT_TIME BETWEEN R.START_TIME
-                                                    AND R.END_TIME )
-                        WHERE 1 = 1
-                          AND G.HOUSE_NO = '{house_no}'
-                          AND D.FLAG_USE_AI = 'Y'
-                        GROUP BY
-                              L.GATEWAY_ID
-                            , L.DEVICE_ID
-                            , L.COLLECT_DATE
-                            , R.DIFF
-                    ) T
-                WHERE 1 = 1
-                GROUP BY
-                      T.GATEWAY_ID
-                    , T.DEVICE_ID
-                    , T.DIFF
-            ) T
-        INNER JOIN AH_DEVICE_ENERGY_HISTORY H
-           ON ( H.GATEWAY_ID = T.GATEWAY_ID
-            AND H.DEVICE_ID = T.DEVICE_ID )
-        INNER JOIN aihems_service_db.AH_LOG_SOCKET S
-          ON ( S.GATEWAY_ID = T.GATEWAY_ID
-            AND S.DEVICE_ID  = T.DEVICE_ID
-            AND S.COLLECT_DATE = DATE_FORMAT(NOW(), '%Y%m%d'))
-            AND S.COLLECT_TIME >= DATE_FORMAT(
-                                    DATE_ADD(
-                                        DATE_ADD(NOW(), INTERVAL 9 HOUR)
-                                      , INTERVAL -5 MINUTE)
-                                  , '%H%i'))
-        WHERE 1 = 1
-        GROUP BY
-              T.GATEWAY_ID
-            , T.DEVICE_ID
-            , T.FREQUENCY
-        ORDER BY
-              STATUS DESC
-            , ONOFF DESC
-            , FREQUENCY ASC
-            , ENERGY DESC
-    """
+    result = dr_event(request_dr_no, [house_no])[house_no]
 
-    with settings.open_db_connection() as conn:
-        df = pd.read_sql(sql, con=conn)
+    _check_cbl(house_no, result["cbl"])
 
-    df["energy_sum"] = df.apply(
-        lambda x: max(x["energy_use"], x["energy_wait"]), axis=1
-    )
-    df["energy_cusum"] = df["energy_sum"].cumsum()
-    df["permission"] = df.apply(
-        lambda x: x["energy_cusum"] < (cbl - reduction_energy), axis=1
-    )
-    df["energy_sum"] = df.apply(lambda x: str(x.energy_sum), axis=1)
+    # 기존과 같이 추천할 디바이스가 없으면 오류
+    if result["recommendation"] is None:
+        raise KeyError(0)
 
-    df = df.loc[:, ["device_id", "energy_sum", "permission"]]
-
-    dr_success = bool(df.loc[0, "permission"])
-    recommendation = df.to_dict("index") if dr_success else "0"
-
-    return dr_success, cbl, reduction_energy, recommendation
+    return (
+        result["dr_success"],
+        result["cbl"],
+        result["reduction_energy"],
+        result["recommendation"],
+    )
 
 
 # if __name__ == '__main__':
@@ -0,0 +1,373 @@
+"""가구별 15분 단위 전력 사용량 저장소
+
+분단위 로그(AH_USE_LOG_BYMINUTE)를 가구, 일자, 15분 구간(하루 SLOTS개)별로 합산하여
+로컬 SQLite에 (가구, 일자) 단위 배열로 저장한다. 로그가 없는 구간은 nan이다.
+DR 시간대는 종료 분을 포함하므로(14:00 ~ 15:00) 구간별 첫 분의 사용량(BOUNDARY)도
+같이 저장한다. CBL 산출시 분단위 로그 대신 가구당 최대 7일 x SLOTS개의 값만 읽는다
+(common.dr 참고).
+
+refresh는 마지막으로 반영한 일자의 REFRESH_DAYS일 전부터 오늘까지 다시 합산하므로
+(늦게 적재된 로그 포함) 주기적으로 실행한다. 과거 기간은 backfill로 채운다.
+저장소는 FIRST_DATE ~ COMPLETE_DATE(전체 로그가 반영된 마지막 일자) 구간을 연속으로
+반영한 것으로 본다.
+
+    usage example:
+        root> python -m common.energy_store --backfill --start 20201001 --end 20201130
+        root> python -m common.energy_store
+"""
+import argparse
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import routes.settings as settings
+
+STORE_PATH = "./datas/energy.sqlite"
+# 구간 크기(분)
+SLOT_MINUTES = 15
+SLOTS = 24 * 60 // SLOT_MINUTES
+# refresh시 다시 합산할 일수 (늦게 적재된 로그)
+REFRESH_DAYS = 2
+# 저장소가 비어있을 때 refresh할 일수 (CBL은 최근 7일 사용)
+INITIAL_DAYS = 14
+# backfill시 한번에 조회할 일수
+BACKFILL_CHUNK_DAYS = 7
+
+
+@contextmanager
+def open_store(path=STORE_PATH):
+    """저장소 연결. 테이블이 없으면 생성
+
+    Yields:
+        Object: sqlite3 Connection Object
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(HOUSE_ENERGY)")]
+        if columns and "BOUNDARY" not in columns:
+            # 구간 첫 분 사용량이 없는 이전 형식은 삭제하고 다시 합산한다
+            print(f"[energy] {path}: old format dropped, run refresh/backfill")
+            conn.executescript(
+                "DROP TABLE HOUSE_ENERGY; DROP TABLE IF EXISTS HOUSE_ENERGY_STATE;"
+            )
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS HOUSE_ENERGY (
+                HOUSE_NO      TEXT    NOT NULL,
+                COLLECT_DATE  TEXT    NOT NULL,
+                ENERGY        BLOB    NOT NULL,
+                BOUNDARY      BLOB    NOT NULL,
+                UPDATED_AT    TEXT    NOT NULL,
+                PRIMARY KEY (HOUSE_NO, COLLECT_DATE)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS HOUSE_ENERGY_STATE (
+                SLOT_MINUTES   INTEGER PRIMARY KEY,
+                FIRST_DATE     TEXT    NOT NULL,
+                COMPLETE_DATE  TEXT    NOT NULL,
+                UPDATED_AT     TEXT    NOT NULL
+            );
+            """
+        )
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def coverage(path=STORE_PATH):
+    """저장소에 반영된 기간
+
+    Returns:
+        tuple: (시작일자, 전체 로그가 반영된 마지막 일자), 없으면 None
+    """
+    if not os.path.exists(path):
+        return None
+
+    with open_store(path) as conn:
+        row = conn.execute(
+            "SELECT FIRST_DATE, COMPLETE_DATE FROM HOUSE_ENERGY_STATE "
+            "WHERE SLOT_MINUTES = ?",
+            (SLOT_MINUTES,),
+        ).fetchone()
+
+    return tuple(row) if row else None
+
+
+def aggregate(start_date, end_date, path=STORE_PATH):
+    """기간의 분단위 로그를 가구, 일자, 구간별로 합산하여 저장
+
+    Args:
+        start_date (str): 시작일자 (yyyymmdd)
+        end_date (str): 종료일자 (yyyymmdd)
+        path (str, optional): 저장소 경로. Defaults to STORE_PATH.
+
+    Returns:
+        int: 저장한 (가구, 일자) 수
+    """
+    df = settings.load_datas(
+        query_file="es_select_house_energy.sql",
+        params={
+            "start_date": start_date,
+            "end_date": end_date,
+            "slot_minutes": SLOT_MINUTES,
+        },
+    )
+
+    rows = []
+    if len(df):
+        days, day_index = np.unique(
+            df["house_no"].astype(str) + "|" + df["collect_date"].astype(str),
+            return_inverse=True,
+        )
+        slots = df["slot"].to_numpy(dtype=int)
+        energy = np.full((len(days), SLOTS), np.nan)
+        energy[day_index, slots] = df["energy"].astype(float).to_numpy()
+        # 구간 첫 분의 로그가 없으면 nan
+        boundary = np.full((len(days), SLOTS), np.nan)
+        boundary[day_index, slots] = df["boundary"].astype(float).to_numpy()
+
+        updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [
+            (*day.split("|"), values.tobytes(), first.tobytes(), updated_at)
+            for day, values, first in zip(days, energy, boundary)
+        ]
+
+    # 오늘 로그는 아직 적재중이므로 어제까지를 반영 완료로 본다
+    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
+    complete_date = min(end_date, yesterday)
+
+    with open_store(path) as conn:
+        # 기간 안에서 로그가 없어진 일자가 남지 않도록 삭제 후 저장
+        conn.execute(
+            "DELETE FROM HOUSE_ENERGY WHERE COLLECT_DATE BETWEEN ? AND ?",
+            (start_date, end_date),
+        )
+        conn.executemany(
+            "INSERT INTO HOUSE_ENERGY "
+            "(HOUSE_NO, COLLECT_DATE, ENERGY, BOUNDARY, UPDATED_AT) "
+            "VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+
+        state = conn.execute(
+            "SELECT FIRST_DATE, COMPLETE_DATE FROM HOUSE_ENERGY_STATE "
+            "WHERE SLOT_MINUTES = ?",
+            (SLOT_MINUTES,),
+        ).fetchone()
+
+        if start_date > complete_date:
+            return len(rows)
+
+        first_date = start_date
+        if state:
+            # 반영 기간과 겹치거나 이어지는 경우만 반영 기간을 넓힌다
+            before = _shift(state[0], -1)
+            after = _shift(state[1], 1)
+            if complete_date < before or after < start_date:
+                print(
+                    f"[energy] {start_date}~{complete_date} is not contiguous "
+                    f"with {state[0]}~{state[1]}, coverage unchanged"
+                )
+                return len(rows)
+
+            first_date = min(state[0], start_date)
+            complete_date = max(state[1], complete_date)
+
+        conn.execute(
+            "INSERT OR REPLACE INTO HOUSE_ENERGY_STATE "
+            "(SLOT_MINUTES, FIRST_DATE, COMPLETE_DATE, UPDATED_AT) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                SLOT_MINUTES,
+                first_date,
+                complete_date,
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            ),
+        )
+
+    return len(rows)
+
+
+def _shift(collect_date, days):
+    return (datetime.strptime(collect_date, "%Y%m%d") + timedelta(days=days)).strftime(
+        "%Y%m%d"
+    )
+
+
+def refresh(path=STORE_PATH):
+    """마지막 반영일자 REFRESH_DAYS일 전부터 오늘까지 다시 합산
+
+    Returns:
+        int: 저장한 (가구, 일자) 수
+    """
+    state = coverage(path)
+    today = datetime.now()
+
+    if state is None:
+        start = today - timedelta(days=INITIAL_DAYS)
+    else:
+        start = datetime.strptime(state[1], "%Y%m%d") - timedelta(days=REFRESH_DAYS - 1)
+
+    return aggregate(start.strftime("%Y%m%d"), today.strftime("%Y%m%d"), path=path)
+
+
+def backfill(start_date, end_date, chunk_days=BACKFILL_CHUNK_DAYS, path=STORE_PATH):
+    """과거 기간을 chunk_days일씩 합산
+
+    반영 기간(coverage)은 이어지는 기간만 넓히므로 기존 반영 기간과
+    겹치거나 바로 앞까지의 기간을 지정한다.
+
+    Args:
+        start_date (str): 시작일자 (yyyymmdd)
+        end_date (str): 종료일자 (yyyymmdd)
+        chunk_days (int, optional): 한번에 조회할 일수. Defaults to BACKFILL_CHUNK_DAYS.
+        path (str, optional): 저장소 경로. Defaults to STORE_PATH.
+
+    Returns:
+        int: 저장한 (가구, 일자) 수
+    """
+    start = datetime.strptime(start_date, "%Y%m%d")
+    end = datetime.strptime(end_date, "%Y%m%d")
+    chunks = (end - start).days // chunk_days + 1
+    started = time.perf_counter()
+    saved = 0
+
+    # 반영 기간이 이어지도록 최근 일자부터 과거로 합산
+    for i in range(chunks):
+        chunk_end = end - timedelta(days=i * chunk_days)
+        chunk_start = max(chunk_end - timedelta(days=chunk_days - 1), start)
+        saved += aggregate(
+            chunk_start.strftime("%Y%m%d"), chunk_end.strftime("%Y%m%d"), path=path
+        )
+
+        elapsed = time.perf_counter() - started
+        eta = elapsed / (i + 1) * (chunks - i - 1)
+        print(
+            f"[energy] {chunk_start:%Y%m%d}~{chunk_end:%Y%m%d} "
+            f"({i + 1}/{chunks}) {saved} days saved, eta {eta:.0f}s"
+        )
+
+    return saved
+
+
+def covers(start_date, end_date, path=STORE_PATH):
+    """저장소가 기간 전체를 반영했는지 여부
+
+    Args:
+        start_date (str): 시작일자 (yyyymmdd)
+        end_date (str): 종료일자 (yyyymmdd)
+        path (str, optional): 저장소 경로. Defaults to STORE_PATH.
+
+    Returns:
+        boolean: 반영여부
+    """
+    state = coverage(path)
+
+    return state is not None and state[0] <= start_date and end_date <= state[1]
+
+
+def supports_window(start_minute, end_minute):
+    """저장소로 사용량을 구할 수 있는 시간대인지 여부
+
+    시작 분이 구간 첫 분이고 종료 분이 구간 마지막 분(14:59) 또는 첫 분(15:00)이어야 한다.
+
+    Args:
+        start_minute (int): 시작 분 (0시부터의 분)
+        end_minute (int): 종료 분 (포함)
+
+    Returns:
+        boolean: 사용 가능여부
+    """
+    return (
+        start_minute <= end_minute
+        and start_minute % SLOT_MINUTES == 0
+        and end_minute % SLOT_MINUTES in (0, SLOT_MINUTES - 1)
+    )
+
+
+def window_energy(house_nos, dates, start_minute, end_minute, path=STORE_PATH):
+    """가구, 일자별 시간대(start_minute ~ end_minute) 사용량 합계
+
+    분단위 로그의 COLLECT_TIME BETWEEN 조회와 같이 종료 분을 포함한다.
+    종료 분이 구간 첫 분이면 그 앞 구간까지의 합계에 종료 분의 사용량을 더한다.
+
+    Args:
+        house_nos (list): 가구식별번호 리스트
+        dates (list): 일자 리스트 (yyyymmdd)
+        start_minute (int): 시작 분 (0시부터의 분)
+        end_minute (int): 종료 분 (포함)
+        path (str, optional): 저장소 경로. Defaults to STORE_PATH.
+
+    Raises:
+        ValueError: 저장소로 구할 수 없는 시간대 (supports_window 참고)
+
+    Returns:
+        array: (가구 수, 일자 수) 배열. 시간대에 로그가 없는 일자는 nan
+    """
+    if not supports_window(start_minute, end_minute):
+        raise ValueError(f"unsupported window: {start_minute} ~ {end_minute}")
+
+    energy = np.full((len(house_nos), len(dates), SLOTS), np.nan)
+    boundary = np.full((len(house_nos), len(dates), SLOTS), np.nan)
+    house_index = {house_no: i for i, house_no in enumerate(house_nos)}
+    date_index = {collect_date: i for i, collect_date in enumerate(dates)}
+
+    with open_store(path) as conn:
+        rows = conn.execute(
+            "SELECT HOUSE_NO, COLLECT_DATE, ENERGY, BOUNDARY FROM HOUSE_ENERGY "
+            f"WHERE HOUSE_NO IN ({', '.join('?' * len(house_nos))}) "
+            f"AND COLLECT_DATE IN ({', '.join('?' * len(dates))})",
+            (*house_nos, *dates),
+        ).fetchall()
+
+    for house_no, collect_date, values, first in rows:
+        index = house_index[house_no], date_index[collect_date]
+        energy[index] = np.frombuffer(values, dtype=np.float64)
+        boundary[index] = np.frombuffer(first, dtype=np.float64)
+
+    start_slot = start_minute // SLOT_MINUTES
+    end_slot = end_minute // SLOT_MINUTES
+    if end_minute % SLOT_MINUTES == SLOT_MINUTES - 1:
+        window = energy[:, :, start_slot : end_slot + 1]
+    else:
+        window = np.concatenate(
+            [
+                energy[:, :, start_slot:end_slot],
+                boundary[:, :, end_slot : end_slot + 1],
+            ],
+            axis=2,
+        )
+
+    # 분단위 로그 조회와 같이 구간에 로그가 하나도 없으면 해당 일자는 제외(nan)
+    return np.where(np.isnan(window).all(axis=2), np.nan, np.nansum(window, axis=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="가구별 15분 단위 사용량 저장")
+    parser.add_argument("--backfill", action="store_true", help="과거 기간 합산")
+    parser.add_argument("--start", help="backfill 시작일자 (yyyymmdd)")
+    parser.add_argument("--end", help="backfill 종료일자 (yyyymmdd). 기본값: 어제")
+    parser.add_argument(
+        "--chunk-days", type=int, default=BACKFILL_CHUNK_DAYS, help="한번에 조회할 일수"
+    )
+    parser.add_argument("--path", default=STORE_PATH, help="저장소 경로")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.backfill and not args.start:
+        parser.error("--backfill requires --start")
+
+    if args.backfill:
+        end = args.end or (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
+        saved = backfill(args.start, end, chunk_days=args.chunk_days, path=args.path)
+    else:
+        saved = refresh(path=args.path)
+
+    print(
+        f"[energy] {saved} days saved, coverage {coverage(args.path)} "
+        f"({time.perf_counter() - started:.1f}s)"
+    )
@@ -0,0 +1,342 @@
+"""비동기 학습 작업
+
+모델 학습 요청을 작업ID로 바로 반환하고, 학습은 작업 pool에서 실행한다.
+작업 상태는 로컬 SQLite에 저장하므로 프로세스가 재시작되어도 유지되며,
+재시작시 완료되지 않은 작업은 다시 실행한다.
+같은 대상(디바이스, 가구)과 파라미터의 작업이 대기/실행 중이면 새로 만들지 않고
+기존 작업ID를 반환한다.
+
+    작업 상태: queued -> running -> succeeded / failed
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+import common.model_training as mt
+import common.model_store as model_store
+from routes import metrics
+
+STORE_PATH = "./datas/jobs.sqlite"
+# 동시에 실행할 학습 작업 수
+MAX_WORKERS = 2
+
+KINDS = ("status", "elec")
+ACTIVE_STATES = ("queued", "running")
+# 프로세스 실행마다 다른 값. 컨테이너 재시작시 호스트명과 pid(1 등)가 같아도
+# 재시작 전 프로세스의 작업을 구분한다
+BOOT_ID = uuid.uuid4().hex[:12]
+
+
+@contextmanager
+def open_store(path=STORE_PATH):
+    """작업 저장소 연결. 테이블이 없으면 생성
+
+    Yields:
+        Object: sqlite3 Connection Object
+    """
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS TRAINING_JOB (
+                JOB_ID        TEXT PRIMARY KEY,
+                KIND          TEXT NOT NULL,
+                TARGET        TEXT NOT NULL,
+                PARAMS        TEXT NOT NULL,
+                STATE         TEXT NOT NULL,
+                PROGRESS      REAL NOT NULL DEFAULT 0,
+                MESSAGE       TEXT,
+                RESULT        TEXT,
+                ERROR         TEXT,
+                OWNER         TEXT,
+                SUBMITTED_AT  REAL NOT NULL,
+                STARTED_AT    REAL,
+                FINISHED_AT   REAL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS TRAINING_JOB_IX01 "
+            "ON TRAINING_JOB (KIND, TARGET, STATE)"
+        )
+        yield conn
+    finally:
+        conn.close()
+
+
+def _owner():
+    return f"{socket.gethostname()}:{os.getpid()}:{BOOT_ID}"
+
+
+def _owner_alive(owner):
+    """작업을 실행하던 프로세스가 살아있는지 확인 (같은 서버만 확인 가능)"""
+    host, pid, boot_id = ((owner or "").split(":") + ["", ""])[:3]
+    if host != socket.gethostname():
+        return True
+    if pid == str(os.getpid()):
+        # pid가 같으면 이 프로세스이거나 재시작 전 프로세스
+        return boot_id == BOOT_ID
+    try:
+        os.kill(int(pid), 0)
+        return True
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+
+
+def _run_training(kind, target, params, progress):
+    """학습 실행
+
+    Returns:
+        dictionary: 학습결과 (best_score, dump_path)
+    """
+    if kind == "status":
+        path, score = mt.make_model_status(
+            device_id=target,
+            model_type=params.get("model_type", "xgboost classifier"),
+            is_csv=params.get("is_csv", False),
+            progress=progress,
+        )
+    else:
+        score = mt.make_model_elec(
+            house_no=target, is_csv=params.get("is_csv", False), progress=progress
+        )
+        path = model_store.artifact_path("houses", target)
+
+    return {"best_score": float(score), "dump_path": str(path)}
+
+
+class JobManager:
+    """학습 작업 관리
+
+    Args:
+        path (str, optional): 작업 저장소 경로. Defaults to STORE_PATH.
+        max_workers (int, optional): 동시 실행 작업 수. Defaults to MAX_WORKERS.
+        runner (function, optional): 학습 실행 함수. Defaults to _run_training.
+    """
+
+    def __init__(self, path=STORE_PATH, max_workers=MAX_WORKERS, runner=_run_training):
+        self.path = path
+        self.runner = runner
+        self.owner = _owner()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="training-job"
+        )
+        self._recover()
+
+    def _recover(self):
+        """재시작 전에 완료되지 않은 작업을 다시 실행"""
+        with open_store(self.path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT JOB_ID, OWNER FROM TRAINING_JOB WHERE STATE IN (?, ?)",
+                ACTIVE_STATES,
+            ).fetchall()
+            job_ids = [
+                row["JOB_ID"]
+                for row in rows
+                if row["OWNER"] != self.owner and not _owner_alive(row["OWNER"])
+            ]
+            conn.executemany(
+                "UPDATE TRAINING_JOB SET STATE = 'queued', OWNER = ?, "
+                "MESSAGE = 'resumed after restart' WHERE JOB_ID = ?",
+                [(self.owner, job_id) for job_id in job_ids],
+            )
+            conn.execute("COMMIT")
+
+        for job_id in job_ids:
+            self._executor.submit(self._execute, job_id)
+
+    def submit(self, kind, target, params=None):
+        """학습 작업 등록
+
+        같은 대상, 같은 파라미터의 작업이 대기/실행 중이면 기존 작업ID를 반환한다.
+
+        Args:
+            kind (str): 작업 종류 (status: 디바이스 분류모델, elec: 가구 예측모델)
+            target (str): 디바이스ID 또는 가구식별번호
+            params (dictionary, optional): 학습 파라미터 (is_csv 등). Defaults to None.
+
+        Returns:
+            str: 작업ID
+            bool: 기존 작업과 병합 여부
+        """
+        if kind not in KINDS:
+            raise ValueError(f"unknown job kind: {kind}")
+
+        # 파라미터가 다르면(is_csv 등) 다른 작업
+        params = json.dumps(params or {}, sort_keys=True)
+
+        with open_store(self.path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT JOB_ID FROM TRAINING_JOB "
+                "WHERE KIND = ? AND TARGET = ? AND PARAMS = ? AND STATE IN (?, ?) "
+                "ORDER BY SUBMITTED_AT LIMIT 1",
+                (kind, target, params) + ACTIVE_STATES,
+            ).fetchone()
+
+            if row is not None:
+                conn.execute("COMMIT")
+                return row["JOB_ID"], True
+
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO TRAINING_JOB "
+                "(JOB_ID, KIND, TARGET, PARAMS, STATE, OWNER, SUBMITTED_AT) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (
+                    job_id,
+                    kind,
+                    target,
+                    params,
+                    self.owner,
+                    time.time(),
+                ),
+            )
+            conn.execute("COMMIT")
+
+        self._executor.submit(self._execute, job_id)
+
+        return job_id, False
+
+    def _update(self, job_id, **columns):
+        names = ", ".join(f"{name} = ?" for name in columns)
+        with open_store(self.path) as conn:
+            conn.execute(
+                f"UPDATE TRAINING_JOB SET {names} WHERE JOB_ID = ?",
+                tuple(columns.values()) + (job_id,),
+            )
+
+    def _execute(self, job_id):
+        """작업 실행 (작업 pool 스레드)"""
+        with open_store(self.path) as conn:
+            row = conn.execute(
+                "SELECT KIND, TARGET, PARAMS FROM TRAINING_JOB WHERE JOB_ID = ?",
+                (job_id,),
+            ).fetchone()
+
+        self._update(
+            job_id,
+            STATE="running",
+            STARTED_AT=time.time(),
+            PROGRESS=0.0,
+            MESSAGE="started",
+        )
+
+        def progress(value, message):
+            self._update(job_id, PROGRESS=float(value), MESSAGE=message)
+
+        try:
+            with metrics.scope(f"job/{row['KIND']}"):
+                result = self.runner(
+                    row["KIND"], row["TARGET"], json.loads(row["PARAMS"]), progress
+                )
+            self._update(
+                job_id,
+                STATE="succeeded",
+                PROGRESS=1.0,
+                RESULT=json.dumps(result),
+                FINISHED_AT=time.time(),
+            )
+        except Exception as ex:
+            self._update(
+                job_id,
+                STATE="failed",
+                ERROR=f"{type(ex).__name__}: {ex}",
+                FINISHED_AT=time.time(),
+            )
+
+    def status(self, job_id):
+        """작업 상태 조회
+
+        Args:
+            job_id (str): 작업ID
+
+        Raises:
+            KeyError: 작업ID가 없는 경우
+
+        Returns:
+            dictionary: 작업 종류, 대상, 상태, 진행률, 경과시간 등
+        """
+        with open_store(self.path) as conn:
+            row = conn.execute(
+                "SELECT * FROM TRAINING_JOB WHERE JOB_ID = ?", (job_id,)
+            ).fetchone()
+
+        if row is None:
+            raise KeyError(f"job not found: {job_id}")
+
+        started_at, finished_at = row["STARTED_AT"], row["FINISHED_AT"]
+        elapsed = (finished_at or time.time()) - started_at if started_at else 0.0
+
+        return {
+            "job_id": row["JOB_ID"],
+            "kind": row["KIND"],
+            "target": row["TARGET"],
+            "state": row["STATE"],
+            "progress": row["PROGRESS"],
+            "message": row["MESSAGE"],
+            "elapsed": elapsed,
+            "submitted_at": _format_time(row["SUBMITTED_AT"]),
+            "started_at": _format_time(started_at),
+            "finished_at": _format_time(finished_at),
+            "result": json.loads(row["RESULT"]) if row["RESULT"] else None,
+            "error": row["ERROR"],
+        }
+
+
+def _format_time(timestamp):
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_manager():
+    """프로세스 공용 작업 관리자 (최초 호출시 미완료 작업 복구)
+
+    Returns:
+        JobManager: 작업 관리자
+    """
+    global _manager
+
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+
+    return _manager
+
+
+def set_manager(manager):
+    """프로세스 공용 작업 관리자 변경 (벤치마크 등에서 사용)
+
+    Args:
+        manager (JobManager): 작업 관리자
+    """
+    global _manager
+
+    with _manager_lock:
+        _manager = manager
+
+
+def submit(kind, target, params=None):
+    """학습 작업 등록. JobManager.submit 참고"""
+    return get_manager().submit(kind, target, params)
+
+
+def status(job_id):
+    """작업 상태 조회. JobManager.status 참고"""
+    return get_manager().status(job_id)
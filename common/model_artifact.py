@@ -0,0 +1,303 @@
+"""학습모델 파일 형식
+
+GridSearchCV 전체를 pickle로 저장하지 않고 최적 모델(best_estimator_)만
+모델별 기본 형식으로 저장한다. 모델 정보는 같은 이름의 메타정보 파일에 저장한다.
+모델 파일의 위치와 버전은 model_store에서 관리한다.
+
+    파일 구성 ({경로}: 확장자를 제외한 모델 경로):
+        {경로}.ubj        : XGBoost 모델 (UBJSON, xgboost 1.6 이상)
+        {경로}.json       : XGBoost 모델 (JSON, xgboost 1.6 미만)
+        {경로}.npz        : 선형회귀 계수 (coef, intercept)
+        {경로}.joblib     : 그 외 모델 (best_estimator_만 저장)
+        {경로}.meta.json  : 형식, 학습 파라미터(params), 입력 데이터 구성
+                            (features, step_size, lag), 점수, 학습 데이터 기간,
+                            라이브러리 버전 등
+        {경로}.pkl        : 이전 형식 (GridSearchCV pickle). model_migration으로 변환
+"""
+import json
+import os
+import platform
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+import common.model_cache as model_cache
+
+# 형식별 파일 확장자
+EXTENSIONS = {
+    "xgboost-ubj": ".ubj",
+    "xgboost-json": ".json",
+    "linear-npz": ".npz",
+    "joblib": ".joblib",
+}
+LEGACY_EXTENSION = ".pkl"
+
+
+def meta_path(base_path):
+    return f"{base_path}.meta.json"
+
+
+def load_meta(base_path):
+    """학습모델 메타정보 조회
+
+    Args:
+        base_path (str): 학습모델 경로(확장자 제외)
+
+    Returns:
+        dictionary: 메타정보 (없으면 None)
+    """
+    try:
+        with open(meta_path(base_path), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def dump_meta(base_path, meta):
+    """학습모델 메타정보 저장
+
+    Args:
+        base_path (str): 학습모델 경로(확장자 제외)
+        meta (dictionary): 메타정보
+    """
+    _atomic_write(
+        meta_path(base_path),
+        lambda tmp_path: _write_json(tmp_path, meta),
+    )
+
+
+def artifact_path(base_path):
+    """저장된 학습모델 파일 경로 (메타정보에 형식이 없으면 이전 형식의 .pkl)
+
+    Args:
+        base_path (str): 학습모델 경로(확장자 제외)
+
+    Returns:
+        str: 학습모델 파일 경로
+    """
+    meta = load_meta(base_path)
+
+    if meta is not None and meta.get("format") in EXTENSIONS:
+        return base_path + EXTENSIONS[meta["format"]]
+
+    return base_path + LEGACY_EXTENSION
+
+
+def save_model(model, base_path, meta=None):
+    """학습모델 저장
+
+    GridSearchCV는 best_estimator_만 저장한다. 모델 파일을 먼저 저장한 후
+    메타정보를 저장하며, 다른 형식의 이전 모델 파일은 삭제한다.
+    XGBoost 기본 형식에는 sklearn 파라미터가 저장되지 않으므로 학습 파라미터를
+    메타정보(params)에 저장한다. meta에 params가 있으면 그대로 저장한다.
+
+    Args:
+        model (Object): 학습모델 (GridSearchCV 또는 estimator)
+        base_path (str): 학습모델 경로(확장자 제외)
+        meta (dictionary, optional): 메타정보 (features, step_size, lag, score 등).
+            Defaults to None.
+
+    Returns:
+        str: 학습모델 파일 경로
+    """
+    estimator = getattr(model, "best_estimator_", model)
+    fmt = _format_of(estimator)
+    path = base_path + EXTENSIONS[fmt]
+
+    if fmt.startswith("xgboost"):
+        # xgboost는 확장자로 저장 형식을 정한다
+        _atomic_write(path, estimator.save_model, suffix=EXTENSIONS[fmt])
+    elif fmt == "linear-npz":
+        _atomic_write(
+            path,
+            lambda tmp_path: np.savez(
+                tmp_path,
+                coef=np.asarray(estimator.coef_),
+                intercept=np.asarray(estimator.intercept_),
+            ),
+            suffix=".npz",
+        )
+    else:
+        _atomic_write(path, lambda tmp_path: joblib.dump(estimator, tmp_path))
+
+    dump_meta(
+        base_path,
+        dict(
+            meta or {},
+            format=fmt,
+            estimator=f"{type(estimator).__module__}.{type(estimator).__name__}",
+            params=(meta or {}).get("params") or params_of(estimator),
+            saved_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            versions=library_versions(),
+        ),
+    )
+
+    for stale in list(EXTENSIONS.values()) + [LEGACY_EXTENSION]:
+        if base_path + stale != path and os.path.exists(base_path + stale):
+            os.remove(base_path + stale)
+
+    model_cache.invalidate(meta_path(base_path))
+    model_cache.invalidate(base_path + LEGACY_EXTENSION)
+
+    return path
+
+
+def load_model(base_path):
+    """예측용 학습모델 조회 (프로세스 공용 캐시 사용)
+
+    캐시에서 꺼낸 모델은 다른 요청과 공유되므로 변경하지 않는다.
+    변경이 필요하면 load_estimator를 사용한다.
+
+    Args:
+        base_path (str): 학습모델 경로(확장자 제외)
+
+    Returns:
+        Object: 학습모델 (predict 지원)
+    """
+    # 메타정보 파일은 모델 저장 후 마지막에 바뀌므로 캐시 버전 확인에 사용하고
+    # 캐시 크기는 모델 파일과 메타정보 파일 크기의 합
+    if os.path.exists(meta_path(base_path)):
+        return model_cache.load_model(
+            meta_path(base_path), loader=_load_from_meta, size=_size_from_meta
+        )
+
+    return model_cache.load_model(base_path + LEGACY_EXTENSION, loader=_load_legacy)
+
+
+def load_estimator(base_path):
+    """학습모델을 파일에서 직접 조회 (캐시 미사용)
+
+    Args:
+        base_path (str): 학습모델 경로(확장자 제외)
+
+    Returns:
+        Object: 학습모델 (estimator)
+    """
+    if os.path.exists(meta_path(base_path)):
+        return _load_from_meta(meta_path(base_path))
+
+    return _load_legacy(base_path + LEGACY_EXTENSION)
+
+
+def params_of(estimator):
+    """메타정보에 저장할 학습 파라미터 (값이 없거나 JSON으로 저장할 수 없는 값은 제외)
+
+    Args:
+        estimator (Object): 학습모델 (estimator)
+
+    Returns:
+        dictionary: 파라미터명별 값
+    """
+    return {
+        name: value
+        for name, value in estimator.get_params().items()
+        if isinstance(value, (bool, int, float, str, np.generic))
+    }
+
+
+def library_versions():
+    """모델 파일과 관련된 라이브러리 버전"""
+    import sklearn
+
+    versions = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+    }
+    try:
+        import xgboost
+
+        versions["xgboost"] = xgboost.__version__
+    except ImportError:
+        pass
+
+    return versions
+
+
+def _format_of(estimator):
+    """모델 저장 형식"""
+    module = type(estimator).__module__
+
+    if module.startswith("xgboost") and hasattr(estimator, "save_model"):
+        import xgboost
+
+        version = tuple(int(v) for v in xgboost.__version__.split(".")[:2])
+        return "xgboost-ubj" if version >= (1, 6) else "xgboost-json"
+    if type(estimator).__name__ == "LinearRegression":
+        return "linear-npz"
+
+    return "joblib"
+
+
+def _load_from_meta(path):
+    """메타정보 파일의 형식에 맞게 학습모델 조회"""
+    with open(path, encoding="utf-8") as f:
+        meta = json.load(f)
+
+    base_path = path[: -len(".meta.json")]
+    fmt = meta.get("format")
+
+    if fmt in ("xgboost-ubj", "xgboost-json"):
+        import xgboost as xgb
+
+        # 저장된 학습 파라미터로 생성 (없으면 get_params가 모두 None)
+        estimator = getattr(xgb, meta["estimator"].rpartition(".")[2])(
+            **meta.get("params", {})
+        )
+        estimator.load_model(base_path + EXTENSIONS[fmt])
+        return estimator
+
+    if fmt == "linear-npz":
+        from sklearn import linear_model
+
+        with np.load(base_path + EXTENSIONS[fmt]) as arrays:
+            estimator = linear_model.LinearRegression()
+            estimator.coef_ = arrays["coef"]
+            estimator.intercept_ = arrays["intercept"]
+            estimator.n_features_in_ = estimator.coef_.shape[-1]
+        return estimator
+
+    if fmt == "joblib":
+        return joblib.load(base_path + EXTENSIONS[fmt])
+
+    # 메타정보만 있고 형식이 없으면 이전 형식
+    return _load_legacy(base_path + LEGACY_EXTENSION)
+
+
+def _size_from_meta(path):
+    """메타정보 파일과 모델 파일 크기의 합(byte)"""
+    base_path = path[: -len(".meta.json")]
+
+    return os.path.getsize(path) + os.path.getsize(artifact_path(base_path))
+
+
+def _load_legacy(path):
+    """이전 형식(GridSearchCV pickle)의 학습모델 조회"""
+    model = joblib.load(path)
+
+    return getattr(model, "best_estimator_", model)
+
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=lambda x: x.item())
+
+
+def _atomic_write(path, write, suffix=""):
+    """임시파일에 저장한 후 이름을 바꾸어 저장 도중의 파일이 읽히지 않도록 한다
+
+    Args:
+        path (str): 저장경로
+        write (function): 임시파일 경로를 받아서 저장하는 함수
+        suffix (str, optional): 임시파일 확장자 (형식을 확장자로 판단하는 경우).
+            Defaults to "".
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp{suffix}"
+
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,197 @@
+"""학습모델 캐시
+
+학습모델 메모리 캐시
+==================
+
+라벨링/전력량 예측시 매번 pickle 파일을 읽어오지 않도록
+프로세스 단위로 학습모델을 LRU 방식으로 캐싱한다.
+모델 파일이 재학습으로 변경되면(수정시각, 크기 또는 파일 해시) 자동으로 다시 읽는다.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import joblib
+
+# 캐시 최대 모델 수
+MAX_ENTRIES = 4096
+# 캐시 최대 크기(모델 파일 크기 기준, byte)
+MAX_BYTES = 2 * 1024**3
+# 모델 변경 확인 방식: mtime(수정시각+크기) / hash(파일 내용 sha1)
+VALIDATE = "mtime"
+
+
+class ModelCache:
+    """모델 파일 경로별 LRU 캐시
+
+    Args:
+        max_entries (int, optional): 최대 모델 수. Defaults to MAX_ENTRIES.
+        max_bytes (int, optional): 최대 크기(byte). Defaults to MAX_BYTES.
+        validate (str, optional): 모델 변경 확인 방식. Defaults to VALIDATE.
+            mtime: 파일 수정시각과 크기 비교
+            hash: 파일 내용의 sha1 비교
+        loader (function, optional): 모델 로드 함수. Defaults to joblib.load.
+    """
+
+    def __init__(
+        self,
+        max_entries=MAX_ENTRIES,
+        max_bytes=MAX_BYTES,
+        validate=VALIDATE,
+        loader=joblib.load,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.validate = validate
+        self.loader = loader
+
+        self._lock = threading.Lock()
+        # path -> (version, size, model)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def _version(self, path):
+        """모델 파일의 버전 정보
+
+        Returns:
+            tuple: 버전 정보
+            int: 파일 크기
+        """
+        stat = os.stat(path)
+
+        if self.validate == "hash":
+            sha1 = hashlib.sha1()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha1.update(chunk)
+            return (sha1.hexdigest(),), stat.st_size
+
+        return (stat.st_mtime_ns, stat.st_size), stat.st_size
+
+    def get(self, path, loader=None, size=None):
+        """모델 조회. 캐시에 없거나 파일이 변경된 경우 다시 읽는다.
+
+        Args:
+            path (str): 모델 파일 경로 (버전 확인에 사용)
+            loader (function, optional): 모델 로드 함수. Defaults to None(self.loader).
+            size (function, optional): 다시 읽을 때 캐시 크기(byte)를 구하는 함수.
+                path가 메타정보 파일처럼 모델 파일과 다른 경우 사용.
+                Defaults to None(path의 파일 크기).
+
+        Returns:
+            Object: 학습모델
+        """
+        version, file_size = self._version(path)
+
+        with self._lock:
+            entry = self._entries.get(path)
+
+            if entry is not None:
+                if entry[0] == version:
+                    self._entries.move_to_end(path)
+                    self._hits += 1
+                    return entry[2]
+
+                # 재학습 등으로 모델 파일이 변경됨
+                self._remove(path)
+                self._invalidations += 1
+
+            self._misses += 1
+
+        model = (loader or self.loader)(path)
+        size = file_size if size is None else size(path)
+
+        with self._lock:
+            if path in self._entries:
+                self._remove(path)
+
+            self._entries[path] = (version, size, model)
+            self._bytes += size
+            self._evict()
+
+        return model
+
+    def _remove(self, path):
+        _, size, _ = self._entries.pop(path)
+        self._bytes -= size
+
+    def _evict(self):
+        """최대 모델 수/크기를 넘으면 오래 사용하지 않은 모델부터 제거"""
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            path = next(iter(self._entries))
+            self._remove(path)
+            self._evictions += 1
+
+    def invalidate(self, path=None):
+        """캐시 삭제
+
+        Args:
+            path (str, optional): 모델 파일 경로. Defaults to None(전체 삭제).
+        """
+        with self._lock:
+            if path is None:
+                self._invalidations += len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+            elif path in self._entries:
+                self._remove(path)
+                self._invalidations += 1
+
+    def stats(self):
+        """캐시 현황
+
+        Returns:
+            dictionary: 모델 수, 크기, hit/miss/eviction 건수
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+_cache = ModelCache()
+
+
+def load_model(path, loader=None, size=None):
+    """프로세스 공용 캐시에서 모델 조회
+
+    Args:
+        path (str): 모델 파일 경로
+        loader (function, optional): 모델 로드 함수. Defaults to None(joblib.load).
+        size (function, optional): 캐시 크기(byte)를 구하는 함수.
+            Defaults to None(path의 파일 크기).
+
+    Returns:
+        Object: 학습모델
+    """
+    return _cache.get(path, loader=loader, size=size)
+
+
+def invalidate(path=None):
+    """프로세스 공용 캐시 삭제
+
+    Args:
+        path (str, optional): 모델 파일 경로. Defaults to None(전체 삭제).
+    """
+    _cache.invalidate(path)
+
+
+def cache_stats():
+    """프로세스 공용 캐시 현황
+
+    Returns:
+        dictionary: 모델 수, 크기, hit/miss/eviction 건수
+    """
+    return _cache.stats()
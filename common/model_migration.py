@@ -0,0 +1,155 @@
+"""학습모델 저장 구조 변환
+
+./pickles/{종류}/{키}.* 구조의 이전 모델 파일을 model_store(해시 디렉터리 + 색인)로 옮긴다.
+이전 형식(GridSearchCV pickle, .pkl)은 model_artifact 형식(최적 모델 + 메타정보)으로 변환하며
+기존 메타정보(증분학습 정보 등)가 있으면 유지한다. 옮긴 후 이전 파일은 삭제한다.
+
+    usage example:
+        root> python -m common.model_migration
+        root> python -m common.model_migration --root ./pickles --dry-run
+"""
+import argparse
+import os
+import time
+
+import joblib
+
+import common.model_artifact as model_artifact
+import common.model_store as model_store
+
+# 모델 종류별 입력 데이터 구성 (model_training 참고)
+LAYOUTS = {
+    "devices": {"features": ["energy_diff", "power"], "step_size": 30, "lag": 10},
+    "houses": {
+        "features": [
+            "use_energy_daily",
+            "dayname_Sunday",
+            "dayname_Monday",
+            "dayname_Tuesday",
+            "dayname_Wednesday",
+            "dayname_Thursday",
+            "dayname_Friday",
+            "dayname_Saturday",
+        ],
+        "step_size": 7,
+        "lag": 0,
+    },
+}
+
+
+def legacy_models(root, kind):
+    """이전 구조의 모델 목록
+
+    Returns:
+        list: 모델 경로(확장자 제외) 리스트
+    """
+    kind_dir = os.path.join(root, kind)
+    suffixes = (".meta.json", model_artifact.LEGACY_EXTENSION)
+
+    with os.scandir(kind_dir) as entries:
+        names = {
+            entry.name[: -len(suffix)]
+            for entry in entries
+            if entry.is_file()
+            for suffix in suffixes
+            if entry.name.endswith(suffix)
+        }
+
+    return [os.path.join(kind_dir, name) for name in sorted(names)]
+
+
+def migrate_model(store, kind, base_path, layout, keep=False):
+    """이전 구조의 모델 하나를 저장소로 옮긴다
+
+    Args:
+        store (ModelStore): 모델 저장소
+        kind (str): 모델 종류 (devices, houses)
+        base_path (str): 이전 구조의 모델 경로(확장자 제외)
+        layout (dictionary): 입력 데이터 구성 (features, step_size, lag)
+        keep (bool, optional): 이전 파일 유지여부. Defaults to False.
+
+    Returns:
+        str: 저장소의 모델 파일 경로
+        int: 이전 파일 크기(byte)
+    """
+    old_path = model_artifact.artifact_path(base_path)
+    size = os.path.getsize(old_path)
+    old_meta = model_artifact.load_meta(base_path) or {}
+
+    meta = dict(layout)
+    if old_path.endswith(model_artifact.LEGACY_EXTENSION):
+        model = joblib.load(old_path)
+        if hasattr(model, "best_score_"):
+            meta["score"] = float(model.best_score_)
+    else:
+        model = model_artifact.load_estimator(base_path)
+    meta.update(old_meta)
+    meta["trained_at"] = meta.get("trained_at") or time.strftime(
+        "%Y-%m-%d %H:%M:%S", time.localtime(os.path.getmtime(old_path))
+    )
+    meta["migrated_from"] = os.path.basename(old_path)
+
+    path = store.publish(model, kind, os.path.basename(base_path), meta)
+
+    if not keep:
+        for old in (old_path, model_artifact.meta_path(base_path)):
+            if os.path.exists(old):
+                os.remove(old)
+
+    return path, size
+
+
+def run(root="./pickles", keep=False, dry_run=False):
+    """이전 구조의 모델 전체를 저장소로 옮긴다
+
+    Args:
+        root (str, optional): 모델 저장 경로. Defaults to "./pickles".
+        keep (bool, optional): 이전 파일 유지여부. Defaults to False.
+        dry_run (bool, optional): 대상만 출력. Defaults to False.
+
+    Returns:
+        dictionary: 변환건수, 오류건수, 변환 전/후 크기(byte)
+    """
+    store = model_store.ModelStore(
+        root=root, index_path=os.path.join(root, "models.sqlite")
+    )
+    stats = {"migrated": 0, "errors": 0, "bytes_before": 0, "bytes_after": 0}
+
+    for kind, layout in LAYOUTS.items():
+        if not os.path.isdir(os.path.join(root, kind)):
+            continue
+
+        base_paths = legacy_models(root, kind)
+        print(f"[migration] {kind}: {len(base_paths)} models")
+
+        for base_path in base_paths:
+            if dry_run:
+                print(f"[migration] {model_artifact.artifact_path(base_path)}")
+                continue
+
+            try:
+                path, size = migrate_model(store, kind, base_path, layout, keep=keep)
+            except Exception as ex:
+                stats["errors"] += 1
+                print(f"[migration] {base_path} failed: {ex}")
+                continue
+
+            new_size = os.path.getsize(path)
+            stats["migrated"] += 1
+            stats["bytes_before"] += size
+            stats["bytes_after"] += new_size
+            print(f"[migration] {base_path} -> {path} ({size} -> {new_size} bytes)")
+
+    print(f"[migration] done: {stats}")
+
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="학습모델 저장 구조 변환")
+    parser.add_argument("--root", default="./pickles", help="모델 저장 경로")
+    parser.add_argument("--keep", action="store_true", help="이전 파일 유지")
+    parser.add_argument("--dry-run", action="store_true", help="변환 대상만 출력")
+    args = parser.parse_args()
+
+    run(root=args.root, keep=args.keep, dry_run=args.dry_run)
@@ -0,0 +1,493 @@
+"""학습모델 저장소
+
+디바이스/가구별 학습모델을 해시로 나눈 디렉터리에 버전별로 저장하고,
+모델 목록(버전, 경로, 크기, 학습일시, 점수)은 SQLite 색인에서 관리한다.
+모델 파일을 모두 저장한 후 색인에 등록(publish)하므로 저장 도중의 모델은 조회되지 않으며,
+모델별로 최근 KEEP_VERSIONS개의 버전만 유지한다.
+
+    저장 구조:
+        ./pickles/models.sqlite                           : 색인
+        ./pickles/{종류}/{해시[0:2]}/{해시[2:4]}/{키}/{버전}.* : 모델 파일 (model_artifact)
+        ./pickles/{종류}/{키}.*                           : 이전 구조 (model_migration으로 변환)
+
+    종류: devices(디바이스 분류모델), houses(가구 예측모델)
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import common.model_artifact as model_artifact
+from routes import metrics
+
+ROOT = "./pickles"
+INDEX_PATH = "./pickles/models.sqlite"
+# 모델별 유지 버전 수
+KEEP_VERSIONS = 3
+# 등록되지 않은 버전(저장 중 중단)을 정리하는 기준 시간(초)
+PENDING_TIMEOUT = 24 * 60 * 60
+# 여러 키를 한번에 조회할 때 IN 조건의 최대 개수
+QUERY_CHUNK = 500
+
+
+class ModelStore:
+    """해시 디렉터리 + SQLite 색인 기반 학습모델 저장소
+
+    Args:
+        root (str, optional): 모델 저장 경로. Defaults to ROOT.
+        index_path (str, optional): 색인 경로. Defaults to INDEX_PATH.
+        keep_versions (int, optional): 모델별 유지 버전 수. Defaults to KEEP_VERSIONS.
+    """
+
+    def __init__(self, root=ROOT, index_path=INDEX_PATH, keep_versions=KEEP_VERSIONS):
+        self.root = root
+        self.index_path = index_path
+        self.keep_versions = keep_versions
+
+        self._lock = threading.Lock()
+        self._initialized = False
+        # (종류, 키)별 현재 버전의 모델 경로. 색인 파일이 바뀌면 비운다
+        self._paths = {}
+        self._paths_version = None
+        # 종류별 이전 구조 디렉터리의 (수정시각, 이전 모델 존재여부)
+        self._legacy = {}
+
+    @contextmanager
+    def open_index(self):
+        """색인 연결. 색인이 없으면 먼저 생성
+
+        Yields:
+            Object: sqlite3 Connection Object
+        """
+        if not self._initialized or not os.path.exists(self.index_path):
+            self._init_index()
+
+        conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_index(self):
+        """색인 파일과 테이블 생성 (WAL 모드는 파일에 유지되므로 한번만 설정)"""
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS MODEL_VERSION (
+                    KIND               TEXT    NOT NULL,
+                    MODEL_KEY          TEXT    NOT NULL,
+                    VERSION            INTEGER NOT NULL,
+                    PATH               TEXT    NOT NULL,
+                    FORMAT             TEXT,
+                    SIZE               INTEGER,
+                    SCORE              REAL,
+                    TRAINED_AT         TEXT,
+                    LAST_COLLECT_DATE  TEXT,
+                    PUBLISHED          INTEGER NOT NULL DEFAULT 0,
+                    CREATED_AT         REAL    NOT NULL,
+                    PRIMARY KEY (KIND, MODEL_KEY, VERSION)
+                )
+                """
+            )
+        finally:
+            conn.close()
+
+        self._initialized = True
+
+    def _index_version(self):
+        """색인 파일(WAL 파일 포함)의 (수정시각, 크기). 다른 프로세스의 변경 확인에 사용"""
+        version = []
+        for path in (self.index_path, self.index_path + "-wal"):
+            try:
+                stat = os.stat(path)
+                version.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                version.append(None)
+
+        return tuple(version)
+
+    def model_dir(self, kind, key):
+        """모델의 버전별 파일을 저장하는 디렉터리
+
+        Args:
+            kind (str): 모델 종류 (devices, houses)
+            key (str): 디바이스ID 또는 가구식별번호
+
+        Returns:
+            str: 디렉터리 경로
+        """
+        digest = hashlib.sha1(str(key).encode("utf-8")).hexdigest()
+
+        return os.path.join(self.root, kind, digest[0:2], digest[2:4], str(key))
+
+    def publish(self, model, kind, key, meta=None):
+        """학습모델을 새 버전으로 저장하고 색인에 등록
+
+        Args:
+            model (Object): 학습모델 (GridSearchCV 또는 estimator)
+            kind (str): 모델 종류 (devices, houses)
+            key (str): 디바이스ID 또는 가구식별번호
+            meta (dictionary, optional): 메타정보. Defaults to None.
+
+        Returns:
+            str: 학습모델 파일 경로
+        """
+        key = str(key)
+        meta = dict(meta or {})
+
+        # 버전 번호를 먼저 예약한다(PUBLISHED=0)
+        with self.open_index() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            (version,) = conn.execute(
+                "SELECT IFNULL(MAX(VERSION), 0) + 1 FROM MODEL_VERSION "
+                "WHERE KIND = ? AND MODEL_KEY = ?",
+                (kind, key),
+            ).fetchone()
+            base_path = os.path.join(self.model_dir(kind, key), f"{version:06d}")
+            conn.execute(
+                "INSERT INTO MODEL_VERSION "
+                "(KIND, MODEL_KEY, VERSION, PATH, CREATED_AT) VALUES (?, ?, ?, ?, ?)",
+                (kind, key, version, base_path, time.time()),
+            )
+            conn.execute("COMMIT")
+
+        os.makedirs(os.path.dirname(base_path), exist_ok=True)
+        meta["version"] = version
+        path = model_artifact.save_model(model, base_path, meta)
+        saved = model_artifact.load_meta(base_path)
+
+        with self.open_index() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE MODEL_VERSION SET FORMAT = ?, SIZE = ?, SCORE = ?, "
+                "TRAINED_AT = ?, LAST_COLLECT_DATE = ?, PUBLISHED = 1 "
+                "WHERE KIND = ? AND MODEL_KEY = ? AND VERSION = ?",
+                (
+                    saved["format"],
+                    os.path.getsize(path),
+                    saved.get("score"),
+                    saved.get("trained_at") or saved["saved_at"],
+                    saved.get("last_collect_date"),
+                    kind,
+                    key,
+                    version,
+                ),
+            )
+            removed = self._prune(conn, kind, key)
+            conn.execute("COMMIT")
+
+        with self._lock:
+            self._paths.pop((kind, key), None)
+
+        for old_base_path in removed:
+            _remove_artifact(old_base_path)
+
+        return path
+
+    def _prune(self, conn, kind, key):
+        """유지 버전 수를 넘는 이전 버전과 오래된 미등록 버전을 색인에서 삭제
+
+        Returns:
+            list: 삭제할 모델 경로(확장자 제외) 리스트
+        """
+        rows = conn.execute(
+            "SELECT VERSION, PATH FROM MODEL_VERSION "
+            "WHERE KIND = ? AND MODEL_KEY = ? AND PUBLISHED = 1 "
+            "ORDER BY VERSION DESC LIMIT -1 OFFSET ?",
+            (kind, key, self.keep_versions),
+        ).fetchall()
+        rows += conn.execute(
+            "SELECT VERSION, PATH FROM MODEL_VERSION "
+            "WHERE KIND = ? AND MODEL_KEY = ? AND PUBLISHED = 0 AND CREATED_AT < ?",
+            (kind, key, time.time() - PENDING_TIMEOUT),
+        ).fetchall()
+
+        conn.executemany(
+            "DELETE FROM MODEL_VERSION WHERE KIND = ? AND MODEL_KEY = ? AND VERSION = ?",
+            [(kind, key, version) for version, _ in rows],
+        )
+
+        return [path for _, path in rows]
+
+    def current(self, kind, key):
+        """모델의 현재(최신 등록) 버전 정보
+
+        Args:
+            kind (str): 모델 종류 (devices, houses)
+            key (str): 디바이스ID 또는 가구식별번호
+
+        Returns:
+            dictionary: 버전, 경로, 크기, 학습일시, 점수 등 (없으면 None)
+        """
+        return self.current_models(kind, [key]).get(str(key))
+
+    def current_models(self, kind, keys=None):
+        """여러 모델의 현재 버전 정보를 한번에 조회
+
+        Args:
+            kind (str): 모델 종류 (devices, houses)
+            keys (list, optional): 키 리스트. Defaults to None(전체).
+
+        Returns:
+            dictionary: 키별 현재 버전 정보
+        """
+        query = (
+            "SELECT T.MODEL_KEY, T.VERSION, T.PATH, T.FORMAT, T.SIZE, T.SCORE, "
+            "       T.TRAINED_AT, T.LAST_COLLECT_DATE "
+            "  FROM MODEL_VERSION T "
+            " WHERE T.KIND = ? AND T.PUBLISHED = 1 "
+            "   AND T.VERSION = (SELECT MAX(S.VERSION) FROM MODEL_VERSION S "
+            "                     WHERE S.KIND = T.KIND AND S.MODEL_KEY = T.MODEL_KEY "
+            "                       AND S.PUBLISHED = 1)"
+        )
+
+        if keys is None:
+            chunks = [None]
+        else:
+            keys = [str(key) for key in keys]
+            chunks = [
+                keys[i : i + QUERY_CHUNK] for i in range(0, len(keys), QUERY_CHUNK)
+            ]
+
+        models = {}
+        with self.open_index() as conn:
+            for chunk in chunks:
+                if chunk is None:
+                    rows = conn.execute(query, (kind,))
+                else:
+                    rows = conn.execute(
+                        query + f" AND T.MODEL_KEY IN ({', '.join('?' * len(chunk))})",
+                        [kind] + chunk,
+                    )
+                for row in rows:
+                    models[row[0]] = dict(
+                        zip(
+                            [
+                                "version",
+                                "path",
+                                "format",
+                                "size",
+                                "score",
+                                "trained_at",
+                                "last_collect_date",
+                            ],
+                            row[1:],
+                        )
+                    )
+
+        return models
+
+    def existing(self, kind, keys):
+        """학습모델이 있는 키 목록 (파일을 하나씩 확인하지 않고 색인에서 조회)
+
+        이전 구조의 모델 파일이 남아있는 경우에만 색인에 없는 키의 파일을 확인한다.
+
+        Args:
+            kind (str): 모델 종류 (devices, houses)
+            keys (list): 키 리스트
+
+        Returns:
+            set: 학습모델이 있는 키 집합
+        """
+        keys = [str(key) for key in keys]
+        found = set(self.current_models(kind, keys))
+
+        if self._has_legacy(kind):
+            found.update(
+                key
+                for key in keys
+                if key not in found and self._legacy_base(kind, key) is not None
+            )
+
+        return found
+
+    def versions(self, kind, key):
+        """모델의 등록된 전체 버전 정보 (최신순)
+
+        Returns:
+            list: 버전 정보 리스트
+        """
+        with self.open_index() as conn:
+            rows = conn.execute(
+                "SELECT VERSION, PATH, SIZE, SCORE, TRAINED_AT FROM MODEL_VERSION "
+                "WHERE KIND = ? AND MODEL_KEY = ? AND PUBLISHED = 1 "
+                "ORDER BY VERSION DESC",
+                (kind, str(key)),
+            ).fetchall()
+
+        return [
+            dict(zip(["version", "path", "size", "score", "trained_at"], row))
+            for row in rows
+        ]
+
+    def base_path(self, kind, key):
+        """현재 버전의 모델 경로(확장자 제외)
+
+        색인 조회 결과를 저장해두고, 색인 파일이 바뀐 경우에만 다시 조회한다.
+
+        Raises:
+            FileNotFoundError: 학습모델이 없는 경우
+
+        Returns:
+            str: 모델 경로
+        """
+        key = str(key)
+        version = self._index_version()
+
+        with self._lock:
+            if self._paths_version != version:
+                self._paths = {}
+                self._paths_version = version
+            base_path = self._paths.get((kind, key))
+
+        if base_path is not None:
+            return base_path
+
+        # 색인에 없는 경우(이전 구조)는 파일 확인이 필요하므로 저장하지 않는다
+        model = self.current(kind, key)
+        if model is not None:
+            with self._lock:
+                if self._paths_version == version:
+                    self._paths[(kind, key)] = model["path"]
+            return model["path"]
+
+        base_path = self._legacy_base(kind, key)
+        if base_path is None:
+            raise FileNotFoundError(f"model not found: {kind}/{key}")
+
+        return base_path
+
+    def _legacy_base(self, kind, key):
+        """이전 구조(./pickles/{종류}/{키}.*)의 모델 경로 (없으면 None)"""
+        base_path = os.path.join(self.root, kind, key)
+
+        if os.path.exists(model_artifact.meta_path(base_path)) or os.path.exists(
+            base_path + model_artifact.LEGACY_EXTENSION
+        ):
+            return base_path
+
+        return None
+
+    def _has_legacy(self, kind):
+        """이전 구조의 모델 파일이 남아있는지 여부 (디렉터리 수정시각 기준으로 캐싱)"""
+        kind_dir = os.path.join(self.root, kind)
+
+        try:
+            mtime = os.stat(kind_dir).st_mtime_ns
+        except FileNotFoundError:
+            return False
+
+        with self._lock:
+            cached = self._legacy.get(kind)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+        with os.scandir(kind_dir) as entries:
+            has_legacy = any(entry.is_file() for entry in entries)
+
+        with self._lock:
+            self._legacy[kind] = (mtime, has_legacy)
+
+        return has_legacy
+
+
+def _remove_artifact(base_path):
+    """모델 파일 삭제. 빈 디렉터리는 남겨둔다"""
+    directory, name = os.path.split(base_path)
+
+    try:
+        entries = os.listdir(directory)
+    except FileNotFoundError:
+        return
+
+    for entry in entries:
+        if entry.startswith(name + "."):
+            os.remove(os.path.join(directory, entry))
+
+
+_store = ModelStore()
+
+
+def get_store():
+    """프로세스 공용 모델 저장소"""
+    return _store
+
+
+def set_store(store):
+    """프로세스 공용 모델 저장소 변경 (벤치마크 등에서 사용)
+
+    Args:
+        store (ModelStore): 모델 저장소
+    """
+    global _store
+
+    _store = store
+
+
+def publish(model, kind, key, meta=None):
+    """학습모델 저장. ModelStore.publish 참고"""
+    return _store.publish(model, kind, key, meta)
+
+
+def existing(kind, keys):
+    """학습모델이 있는 키 목록. ModelStore.existing 참고"""
+    return _store.existing(kind, keys)
+
+
+def current_models(kind, keys=None):
+    """여러 모델의 현재 버전 정보. ModelStore.current_models 참고"""
+    return _store.current_models(kind, keys)
+
+
+def artifact_path(kind, key):
+    """현재 버전의 학습모델 파일 경로
+
+    Args:
+        kind (str): 모델 종류 (devices, houses)
+        key (str): 디바이스ID 또는 가구식별번호
+
+    Returns:
+        str: 학습모델 파일 경로
+    """
+    return model_artifact.artifact_path(_store.base_path(kind, key))
+
+
+def load_meta(kind, key):
+    """현재 버전의 학습모델 메타정보 (모델이 없으면 None)"""
+    try:
+        return model_artifact.load_meta(_store.base_path(kind, key))
+    except FileNotFoundError:
+        return None
+
+
+def load_model(kind, key):
+    """예측용 학습모델 조회 (프로세스 공용 캐시 사용, 변경하지 않는다)
+
+    Args:
+        kind (str): 모델 종류 (devices, houses)
+        key (str): 디바이스ID 또는 가구식별번호
+
+    Returns:
+        Object: 학습모델 (predict 지원)
+    """
+    with metrics.span("model_load", kind):
+        return model_artifact.load_model(_store.base_path(kind, key))
+
+
+def load_estimator(kind, key):
+    """학습모델을 파일에서 직접 조회 (캐시 미사용, 증분학습 등에서 변경 가능)
+
+    Args:
+        kind (str): 모델 종류 (devices, houses)
+        key (str): 디바이스ID 또는 가구식별번호
+
+    Returns:
+        Object: 학습모델 (estimator)
+    """
+    with metrics.span("model_load", kind):
+        return model_artifact.load_estimator(_store.base_path(kind, key))
@@ -6,16 +6,132 @@
 이를 바탕으로 가구별 전력사용량 예측모델을 학습한다.
 
 """
-from sklearn import model_selection
+from datetime import datetime
+
 import pandas as pd
-import joblib
 
 from routes import settings, classifications
 import common.data_load as dl
+import common.model_store as model_store
 import numpy as np
 
+# 증분학습시 추가할 트리 수
+INCREMENTAL_ESTIMATORS = 10
+# 증분학습 허용 횟수. 넘으면 전체 재학습 (트리가 계속 늘어나지 않도록)
+MAX_INCREMENTAL_ROUNDS = 10
+# 새 데이터에 대한 기존 모델 정확도가 전체 학습시 점수보다 이만큼 떨어지면 전체 재학습
+SCORE_DROP_TOLERANCE = 0.03
+# 증분학습시 학습하지 않고 평가에만 사용하는 새 데이터의 마지막(시간순) 비율
+HOLDOUT_RATIO = 0.2
+# 스트리밍 조회시 분류모델 학습데이터 컬럼별 타입
+STATUS_DTYPES = {
+    "energy_diff": np.float64,
+    "power": np.float64,
+    "appliance_status": np.int64,
+    "collect_date": "U8",
+}
+
+
+def load_status_datas(device_id, is_csv=False, last_collect_date=None):
+    """디바이스의 분류모델 학습데이터 조회
+
+    Args:
+      device_id (str): 디바이스ID
+      is_csv (bool, optional): 데이터를 csv 파일에서 조회여부. Defaults to False.
+      last_collect_date (str, optional): 이 일자 이후의 데이터만 조회.
+              Defaults to None(전체).
+
+    Returns:
+      dataframe: 학습데이터
+    """
+    if is_csv:
+        df = settings.load_indexed_datas_from_csv(
+            csv_file="training/devices.csv", key_col="device_id", key=device_id
+        )
+        if last_collect_date is not None and "collect_date" in df.columns:
+            df = df.loc[df["collect_date"].astype(str) > str(last_collect_date)]
+        return df.reset_index(drop=True)
+
+    if last_collect_date is not None:
+        return settings.load_datas(
+            query_file="mt_select_device_since.sql",
+            params={"device_id": device_id, "last_collect_date": last_collect_date},
+        )
+
+    return settings.load_datas(
+        query_file="mt_select_device.sql", params={"device_id": device_id}
+    )
+
+
+def load_status_arrays(device_id, last_collect_date=None):
+    """디바이스의 분류모델 학습데이터를 컬럼별 배열로 조회 (스트리밍)
+
+    settings.load_arrays로 서버측 cursor에서 chunk 단위로 읽어 STATUS_DTYPES 타입의
+    배열에 바로 채운다. 조회 중 메모리는 학습에 쓰는 컬럼의 배열과 chunk 하나로 제한된다.
+
+    Args:
+      device_id (str): 디바이스ID
+      last_collect_date (str, optional): 이 일자 이후의 데이터만 조회.
+              Defaults to None(전체).
+
+    Returns:
+      dictionary: 컬럼명별 배열
+    """
+    if last_collect_date is not None:
+        return settings.load_arrays(
+            query_file="mt_select_device_since.sql",
+            params={"device_id": device_id, "last_collect_date": last_collect_date},
+            dtypes=STATUS_DTYPES,
+        )
+
+    return settings.load_arrays(
+        query_file="mt_select_device.sql",
+        params={"device_id": device_id},
+        dtypes=STATUS_DTYPES,
+    )
+
+
+def load_status_history(device_id, collect_date, is_csv=False, stream=True):
+    """증분학습 데이터 앞의 window 구간에 사용할 마지막 학습일자의 학습데이터 조회
 
-def make_model_status(device_id, model_type="random forest", lag=10, is_csv=False):
+    Args:
+      device_id (str): 디바이스ID
+      collect_date (str): 마지막 학습일자
+      is_csv (bool, optional): 데이터를 csv 파일에서 조회여부. Defaults to False.
+      stream (bool, optional): 컬럼별 배열로 조회 여부. Defaults to True.
+
+    Returns:
+      dataframe: 학습데이터 (stream이면 컬럼별 배열)
+    """
+    if is_csv:
+        df = settings.load_indexed_datas_from_csv(
+            csv_file="training/devices.csv", key_col="device_id", key=device_id
+        )
+        if "collect_date" not in df.columns:
+            return df.iloc[:0]
+        return df.loc[df["collect_date"].astype(str) == str(collect_date)]
+
+    params = {"device_id": device_id, "collect_date": collect_date}
+    if stream:
+        return settings.load_arrays(
+            query_file="mt_select_device_day.sql", params=params, dtypes=STATUS_DTYPES
+        )
+
+    return settings.load_datas(query_file="mt_select_device_day.sql", params=params)
+
+
+def make_model_status(
+    device_id,
+    model_type="random forest",
+    lag=10,
+    is_csv=False,
+    df=None,
+    n_jobs=-1,
+    nthread=None,
+    progress=None,
+    incremental=False,
+    stream=True,
+):
     """디바이스의 대기/사용 라벨링에 대한 예측모델학습
 
     모델은 Random forast 방식을 사용한다.
@@ -23,31 +139,62 @@ def make_model_status(device_id, model_type="random forest", lag=10, is_csv=Fals
     x: 전력사용차(energy_diff), 순시전력(power), on/off(onoff) 등
     y: 사용/대기 상태
 
+    incremental이면 마지막 학습 이후 라벨링된 데이터만 조회하여 기존 XGBoost 모델에
+    트리를 추가로 학습한다(make_model_status_incremental 참고).
+
+    stream이면 데이터베이스의 학습데이터를 DataFrame 없이 컬럼별 배열로 조회하고
+    (load_status_arrays) sliding window를 float32로 한번만 만든다.
+    트리 모델은 학습시 입력을 float32로 변환하므로 학습 결과는 같다.
+
     Args:
       device_id (str): 디바이스ID
       model_type (str, optional): 모델 타입. Defaults to 'random forest'
               random forest / xgboost classifier
       lag (int, optional): 데이터 시작점 이동범위. Defaults to 10.
       is_csv (bool, optional): 데이터를 csv 파일에서 조회여부. Defaults to False.
+      df (dataframe, optional): 미리 조회한 학습데이터. Defaults to None.
+      n_jobs (int, optional): GridSearchCV 병렬 작업 수. Defaults to -1.
+      nthread (int, optional): XGBoost 스레드 수. Defaults to None(모델 기본값).
+      progress (function, optional): 진행상황 콜백(진행률, 메시지). Defaults to None.
+      incremental (bool, optional): 증분학습 여부. Defaults to False.
+      stream (bool, optional): 스트리밍 조회 여부 (df가 없고 데이터베이스 사용시).
+              Defaults to True.
 
     Returns:
       str: 학습모델 저장경로
-      float: 교차검증점수
+      float: 교차검증점수 (증분학습은 새 데이터에 대한 정확도)
     """
-
-    if is_csv:
-        condition = f"device_id == '{device_id}'"
-        df = settings.load_datas_from_csv(
-            csv_file="training/devices.csv", condition=condition
+    if incremental:
+        result = make_model_status_incremental(
+            device_id,
+            model_type=model_type,
+            lag=lag,
+            is_csv=is_csv,
+            df=df,
+            nthread=nthread,
+            progress=progress,
+            stream=stream,
         )
+        if result is not None:
+            return result
+
+    if df is None and stream and not is_csv:
+        df = load_status_arrays(device_id)
+        x, y = _status_x_y(df)
+        dtype = np.float32
     else:
-        df = settings.load_datas(
-            query_file="mt_select_device.sql", params={"device_id": device_id}
+        if df is None:
+            df = load_status_datas(device_id, is_csv=is_csv)
+        x, y = dl.split_x_y(
+            df, x_col=["energy_diff", "power"], y_col="appliance_status"
         )
+        dtype = None
+    rows = len(y)
+    _report(progress, 0.2, f"loaded {rows} rows")
 
-    x, y = dl.split_x_y(df, x_col=["energy_diff", "power"], y_col="appliance_status")
     # 30분 단위로 sliding
-    x, y = dl.sliding_window_transform(x, y, step_size=30, lag=lag)
+    x, y = dl.sliding_window_transform(x, y, step_size=30, lag=lag, dtype=dtype)
+    _report(progress, 0.3, "fitting")
 
     # 확인 #####################################################################
     # x_train, x_test, y_train, y_test = model_selection.train_test_split(
@@ -68,25 +215,227 @@ def make_model_status(device_id, model_type="random forest", lag=10, is_csv=Fals
     # print(metrics.accuracy_score(y_test, pred))
     # ##########################################################################
 
+    # sklearn은 학습시에만 import (API 시작시간 단축)
+    from sklearn import model_selection
+
     model, params = classifications.select_classification_model(model_type)
 
-    gs = model_selection.GridSearchCV( 
+    if nthread is not None and "nthread" in params:
+        params["nthread"] = [nthread]
+
+    gs = model_selection.GridSearchCV(
         estimator=model,
         param_grid=params,
         cv=5,
         scoring="accuracy",
-        n_jobs=-1,
+        n_jobs=n_jobs,
     )
 
     gs.fit(x, y)
-
-    path = f"./pickles/devices/{device_id}.pkl"
-    joblib.dump(gs, path)
+    _report(progress, 0.9, "saving")
+
+    training_range = _training_range(df, "collect_date")
+    path = model_store.publish(
+        gs,
+        "devices",
+        device_id,
+        {
+            "device_id": device_id,
+            "model_type": model_type,
+            "features": ["energy_diff", "power"],
+            "step_size": 30,
+            "lag": lag,
+            "mode": "full",
+            "training_range": training_range,
+            "last_collect_date": training_range[1],
+            "rows": rows,
+            "base_score": float(gs.best_score_),
+            "score": float(gs.best_score_),
+            "incremental_rounds": 0,
+            "trained_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        },
+    )
+    _report(progress, 1.0, "done")
 
     return path, gs.best_score_
 
 
-def make_model_elec(house_no, model_type="linear regression", is_csv=False):
+def make_model_status_incremental(
+    device_id,
+    model_type="xgboost classifier",
+    lag=10,
+    is_csv=False,
+    df=None,
+    nthread=None,
+    progress=None,
+    stream=True,
+):
+    """디바이스 분류모델 증분학습
+
+    모델 메타정보(model_store.load_meta)의 마지막 학습일자 이후 라벨링된 데이터만 조회하여
+    기존 모델에 INCREMENTAL_ESTIMATORS개의 트리를 이어서 학습한다(xgb_model).
+    새 데이터의 마지막 HOLDOUT_RATIO(시간순)는 학습하지 않고 평가에만 사용한다.
+    새 데이터의 앞부분 window는 마지막 학습일자의 데이터(load_status_history)로 채우고
+    그 구간의 라벨은 학습/평가에서 제외한다.
+    학습 전에 평가 데이터로 기존 모델의 정확도를 측정하여 전체 학습시 점수보다
+    SCORE_DROP_TOLERANCE 이상 떨어졌으면(데이터 변화) 전체 재학습이 필요한 것으로 본다.
+    전체 재학습이 필요한 사유는 진행상황 메시지(progress)로 전달한다.
+    메타정보의 score는 학습 후 모델의 평가 데이터에 대한 정확도,
+    base_model_score는 학습 전 기존 모델의 평가 데이터에 대한 정확도이다.
+
+    Args:
+      device_id (str): 디바이스ID
+      model_type (str, optional): 모델 타입. Defaults to 'xgboost classifier'.
+      lag (int, optional): 데이터 시작점 이동범위. Defaults to 10.
+      is_csv (bool, optional): 데이터를 csv 파일에서 조회여부. Defaults to False.
+      df (dataframe, optional): 미리 조회한 학습데이터(collect_date 포함).
+              Defaults to None.
+      nthread (int, optional): XGBoost 스레드 수. Defaults to None(모델 기본값).
+      progress (function, optional): 진행상황 콜백(진행률, 메시지). Defaults to None.
+      stream (bool, optional): 스트리밍 조회 여부 (df가 없고 데이터베이스 사용시).
+              Defaults to True.
+
+    Returns:
+      str: 학습모델 저장경로
+      float: 평가 데이터에 대한 학습 후 모델의 정확도
+      (전체 재학습이 필요하면 None)
+    """
+    meta = model_store.load_meta("devices", device_id)
+
+    if (
+        meta is None
+        or model_type != "xgboost classifier"
+        or meta.get("model_type") != model_type
+        or meta.get("last_collect_date") is None
+    ):
+        return _full_retrain(progress, "no incremental base")
+
+    if meta.get("incremental_rounds", 0) >= MAX_INCREMENTAL_ROUNDS:
+        return _full_retrain(progress, f"{MAX_INCREMENTAL_ROUNDS} incremental rounds")
+
+    # 이전 메타정보에는 학습 파라미터가 없어 XGBoost 기본값으로 이어서 학습하게 된다
+    if not meta.get("params"):
+        return _full_retrain(progress, "no saved params")
+
+    last_collect_date = meta["last_collect_date"]
+    step_size = 30
+    history = None
+    if df is None and stream and not is_csv:
+        df = load_status_arrays(device_id, last_collect_date=last_collect_date)
+        x, y = _status_x_y(df)
+        dtype = np.float32
+    else:
+        if df is None:
+            df = load_status_datas(
+                device_id, is_csv=is_csv, last_collect_date=last_collect_date
+            )
+        elif "collect_date" in df.columns:
+            dates = df["collect_date"].astype(str)
+            history = df.loc[dates <= last_collect_date]
+            df = df.loc[dates > last_collect_date]
+        else:
+            history = df.iloc[:0]
+        x, y = dl.split_x_y(
+            df, x_col=["energy_diff", "power"], y_col="appliance_status"
+        )
+        dtype = None
+    rows = len(y)
+    _report(progress, 0.2, f"loaded {rows} new rows")
+
+    if rows == 0:
+        _report(progress, 1.0, "no new labels")
+        return model_store.artifact_path("devices", device_id), meta["score"]
+
+    # 새 데이터 앞에 이전 데이터(step_size - 1행)를 붙여 window가 0으로 채워지지 않도록 하고
+    # 변환 후 이전 데이터의 라벨은 제외한다
+    if history is None:
+        history = load_status_history(
+            device_id, last_collect_date, is_csv=is_csv, stream=stream
+        )
+    history_x, history_y = _status_x_y(history)
+    start = max(len(history_y) - (step_size - 1), 0)
+    n_history = len(history_y) - start
+    x = np.concatenate([np.asarray(history_x)[start:], x])
+    y = np.concatenate([np.asarray(history_y)[start:], y])
+
+    x, y = dl.sliding_window_transform(x, y, step_size=step_size, lag=lag, dtype=dtype)
+    x, y = x[n_history:], y[n_history:]
+
+    # 시간순으로 앞부분은 학습, 마지막 HOLDOUT_RATIO는 평가에 사용
+    split = len(y) - max(int(len(y) * HOLDOUT_RATIO), 1)
+    if split < 1:
+        _report(progress, 1.0, "not enough new labels")
+        return model_store.artifact_path("devices", device_id), meta["score"]
+    x_test, y_test = x[split:], y[split:]
+
+    # 캐시된 모델을 바꾸지 않도록 파일에서 직접 읽는다
+    base = model_store.load_estimator("devices", device_id)
+
+    from sklearn import metrics
+
+    base_model_score = metrics.accuracy_score(y_test, base.predict(x_test))
+    if base_model_score < meta["base_score"] - SCORE_DROP_TOLERANCE:
+        return _full_retrain(
+            progress,
+            f"score dropped {meta['base_score']:.4f} -> {base_model_score:.4f}",
+        )
+    _report(progress, 0.3, "fitting")
+
+    model = fit_incremental(base, meta["params"], x[:split], y[:split], nthread=nthread)
+    score = metrics.accuracy_score(y_test, model.predict(x_test))
+    _report(progress, 0.9, "saving")
+
+    last_collect_date = _training_range(df, "collect_date")[1] or last_collect_date
+    path = model_store.publish(
+        model,
+        "devices",
+        device_id,
+        dict(
+            meta,
+            mode="incremental",
+            training_range=[meta.get("training_range", [None])[0], last_collect_date],
+            last_collect_date=last_collect_date,
+            rows=rows,
+            score=float(score),
+            base_model_score=float(base_model_score),
+            incremental_rounds=meta.get("incremental_rounds", 0) + 1,
+            trained_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        ),
+    )
+    _report(progress, 1.0, "done")
+
+    return path, score
+
+
+def fit_incremental(base, params, x, y, nthread=None):
+    """기존 XGBoost 모델에 INCREMENTAL_ESTIMATORS개의 트리를 이어서 학습
+
+    XGBoost 기본 형식에서 읽은 모델은 sklearn 파라미터가 없으므로(get_params가 None)
+    메타정보에 저장된 학습 파라미터로 모델을 만들어 max_depth 등을 유지한다.
+
+    Args:
+      base (Object): 기존 모델 (XGBClassifier)
+      params (dictionary): 기존 모델의 학습 파라미터 (메타정보의 params)
+      x (array): 학습데이터
+      y (array): 라벨
+      nthread (int, optional): XGBoost 스레드 수. Defaults to None(파라미터 값).
+
+    Returns:
+      Object: 트리를 추가한 모델
+    """
+    params = dict(params, n_estimators=INCREMENTAL_ESTIMATORS)
+    if nthread is not None:
+        params["nthread"] = nthread
+
+    model = type(base)(**params)
+    model.fit(x, y, xgb_model=base.get_booster())
+
+    return model
+
+
+def make_model_elec(
+    house_no, model_type="linear regression", is_csv=False, progress=None
+):
     """가구의 전력사용량 예측모델 학습
 
     가구의 한달 사용전력량으로 다음달의 전력 사용량 예측 모델 학습
@@ -97,6 +446,7 @@ def make_model_elec(house_no, model_type="linear regression", is_csv=False):
       house_no (str): 가구식별번호
       model_type (str, optional): 모델 타입. Defaults to 'linear regression'.
       is_csv (bool, optional): 데이터를 csv 파일에서 조회여부. Defaults to False.
+      progress (function, optional): 진행상황 콜백(진행률, 메시지). Defaults to None.
 
     Returns:
       float: 교차검증점수
@@ -104,14 +454,14 @@ def make_model_elec(house_no, model_type="linear regression", is_csv=False):
     # 로그데이터를 조회하여 사용하도록 수정
     # 에너지 사용량, 요일을 같이 변수로 사용
     if is_csv:
-        condition = f"house_no == '{house_no}'"
-        df = settings.load_datas_from_csv(
-            csv_file="training/houses.csv", condition=condition
+        df = settings.load_indexed_datas_from_csv(
+            csv_file="training/houses.csv", key_col="house_no", key=house_no
         )
     else:
         df = settings.load_datas(
             query_file="mt_select_house.sql", params={"house_no": house_no}
         )
+    _report(progress, 0.2, f"loaded {len(df)} rows")
 
     # 예측할 일자의 앞 일자를 설정
     # 7일치를 기반으로 예측
@@ -126,11 +476,13 @@ def make_model_elec(house_no, model_type="linear regression", is_csv=False):
         "dayname_Friday",
         "dayname_Saturday",
     ]
+    training_range = _training_range(df, "use_date")
     df = pd.get_dummies(df)
     df = df.loc[:, columns]
 
     x, y = dl.split_x_y(df, x_col=columns, y_col="use_energy_daily")
     x, y = dl.sliding_window_transform(x, y, step_size=step_size, lag=0)
+    _report(progress, 0.3, "fitting")
 
     c = pd.merge(
         pd.DataFrame(x[(step_size - 1) : -1]),
@@ -161,6 +513,8 @@ def make_model_elec(house_no, model_type="linear regression", is_csv=False):
     # print('Coefficient of determination: %.2f' % metrics.r2_score(y, y_pred))
     ###########################################################################
 
+    from sklearn import model_selection
+
     model, params = classifications.select_classification_model(model_type)
 
     gs = model_selection.GridSearchCV(
@@ -170,13 +524,70 @@ def make_model_elec(house_no, model_type="linear regression", is_csv=False):
         n_jobs=-1,
     )
     gs.fit(x[(step_size - 1) : -1], y[step_size:])
-
-    path = f"./pickles/houses/{house_no}.pkl"
-    joblib.dump(gs, path)
+    _report(progress, 0.9, "saving")
+
+    model_store.publish(
+        gs,
+        "houses",
+        house_no,
+        {
+            "house_no": house_no,
+            "model_type": model_type,
+            "features": columns,
+            "step_size": step_size,
+            "lag": 0,
+            "training_range": training_range,
+            "rows": len(df),
+            "score": float(gs.best_score_),
+            "trained_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        },
+    )
+    _report(progress, 1.0, "done")
 
     return gs.best_score_
 
 
+def _status_x_y(datas):
+    """컬럼별 배열(load_status_arrays)에서 분류모델 x, y 분리"""
+    x = np.column_stack([datas["energy_diff"], datas["power"]])
+
+    return x, datas["appliance_status"]
+
+
+def _training_range(df, date_col):
+    """학습데이터의 수집기간 (일자 컬럼이 없으면 None)
+
+    Args:
+      df (dataframe): 학습데이터 (또는 load_status_arrays의 컬럼별 배열)
+      date_col (str): 일자 컬럼명
+
+    Returns:
+      list: [시작일자, 종료일자]
+    """
+    if date_col not in df or len(df[date_col]) == 0:
+        return [None, None]
+
+    dates = df[date_col]
+    return [str(min(dates)), str(max(dates))]
+
+
+def _full_retrain(progress, reason):
+    """증분학습 대신 전체 재학습 (사유는 진행상황 메시지로 전달)
+
+    Returns:
+      None: 전체 재학습 필요
+    """
+    _report(progress, 0.1, f"full retrain: {reason}")
+
+    return None
+
+
+def _report(progress, value, message):
+    """진행상황 콜백 호출"""
+    if progress is not None:
+        progress(value, message)
+
+
 if __name__ == "__main__":
     # make_model_status(
     #     device_id="00158D000151B1FB1", model_type="xgboost classifier", is_csv=True
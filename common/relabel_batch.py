@@ -0,0 +1,367 @@
+"""전력 사용상태 일괄 라벨링
+
+기간을 지정하여 학습모델이 있는 디바이스의 분단위 로그를 라벨링하고
+AH_USE_LOG_BYMINUTE.APPLIANCE_STATUS에 저장한다.
+게이트웨이별로 디바이스를 CHUNK_SIZE개씩 묶어서 로그를 조회하고, 디바이스별로
+전체 기간의 sliding window를 한번에 예측한다.
+결과는 임시 테이블에 여러 건씩 INSERT한 후 한번의 UPDATE로 반영한다(method="stage").
+완료된 디바이스는 진행상황 저장소에 기록하므로 중단된 작업을 이어서 실행할 수 있다.
+
+    usage example:
+        root> python -m common.relabel_batch --start 20201101 --end 20201130
+        root> python -m common.relabel_batch --start 20201101 --end 20201130 \\
+                  --devices 000D6F000F745CBD1 --processes 4
+"""
+import argparse
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import routes.settings as settings
+from routes import metrics
+import common.data_load as dl
+import common.model_store as model_store
+import common.coverage_store as coverage_store
+
+CHECKPOINT_PATH = "./datas/relabel_checkpoint.sqlite"
+# 한번에 로그를 조회할 디바이스 수
+CHUNK_SIZE = 20
+# executemany 한번에 저장할 건수
+WRITE_BATCH_SIZE = 5000
+# 분류모델 입력 구간: 라벨링할 시각 기준 19분 전 ~ 10분 후 (model_training 참고)
+STEP_SIZE = 30
+LABEL_OFFSET = 19
+
+
+@contextmanager
+def open_checkpoint(path=CHECKPOINT_PATH):
+    """진행상황 저장소 연결. 테이블이 없으면 생성
+
+    Yields:
+        Object: sqlite3 Connection Object
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS RELABEL_PROGRESS (
+                START_DATE   TEXT    NOT NULL,
+                END_DATE     TEXT    NOT NULL,
+                DEVICE_ID    TEXT    NOT NULL,
+                GATEWAY_ID   TEXT    NOT NULL,
+                ROWS         INTEGER NOT NULL,
+                FINISHED_AT  TEXT    NOT NULL,
+                PRIMARY KEY (START_DATE, END_DATE, DEVICE_ID)
+            );
+            """
+        )
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def finished_devices(start_date, end_date, path=CHECKPOINT_PATH):
+    """기간에 대해 라벨링이 완료된 디바이스 목록
+
+    Returns:
+        set: 디바이스ID 집합
+    """
+    with open_checkpoint(path) as conn:
+        rows = conn.execute(
+            "SELECT DEVICE_ID FROM RELABEL_PROGRESS "
+            "WHERE START_DATE = ? AND END_DATE = ?",
+            (start_date, end_date),
+        ).fetchall()
+
+    return {row[0] for row in rows}
+
+
+def label_device(df, start_date, end_date):
+    """한 디바이스의 기간 로그를 한번의 예측으로 라벨링
+
+    분당 라벨은 학습시와 같이 19분 전 ~ 10분 후의 30분 구간으로 예측하므로
+    구간이 모두 있는 분만 라벨링한다.
+
+    Args:
+        df (dataframe): 수집일시 순으로 정렬된 디바이스 로그 (기간 전후 1일 포함)
+        start_date (str): 시작일자
+        end_date (str): 종료일자
+
+    Returns:
+        dataframe: 라벨링한 분의 collect_date, collect_time, appliance_status
+    """
+    x = np.ascontiguousarray(df.loc[:, ["energy_diff", "power"]].values)
+
+    if len(x) < STEP_SIZE:
+        return df.iloc[0:0].assign(appliance_status=np.array([], dtype=int))
+
+    windows, _ = dl.sliding_window_transform(
+        x, x, step_size=STEP_SIZE, lag=0, is_training=0, as_view=True
+    )
+    model = model_store.load_model("devices", df["device_id"].iloc[0])
+    with metrics.span("predict", "devices"):
+        status = model.predict(windows).astype(int)
+
+    labeled = df.iloc[LABEL_OFFSET : LABEL_OFFSET + len(status)]
+    labeled = labeled.loc[
+        :, ["gateway_id", "device_id", "collect_date", "collect_time"]
+    ]
+    labeled["appliance_status"] = status
+
+    collect_date = labeled["collect_date"].astype(str)
+    return labeled.loc[(collect_date >= start_date) & (collect_date <= end_date)]
+
+
+def write_statuses(labeled, method="stage"):
+    """라벨링 결과를 AH_USE_LOG_BYMINUTE에 저장
+
+    Args:
+        labeled (dataframe): gateway_id, device_id, collect_date, collect_time,
+            appliance_status
+        method (str, optional): 저장 방식. Defaults to "stage".
+            stage: 임시 테이블에 INSERT 후 한번의 UPDATE로 반영
+            update: 건별 UPDATE를 executemany로 실행
+
+    Returns:
+        int: 저장 건수
+    """
+    columns = ["gateway_id", "device_id", "collect_date", "collect_time"]
+    values = [labeled[col].astype(str).tolist() for col in columns]
+    values.append(labeled["appliance_status"].astype(int).tolist())
+    columns.append("appliance_status")
+
+    def batches():
+        for i in range(0, len(labeled), WRITE_BATCH_SIZE):
+            yield [
+                dict(zip(columns, row))
+                for row in zip(*(col[i : i + WRITE_BATCH_SIZE] for col in values))
+            ]
+
+    with settings.open_db_transaction() as tx:
+        if method == "update":
+            for batch in batches():
+                tx.executemany("rl_update_status.sql", batch)
+            return len(labeled)
+
+        tx.execute("rl_drop_status_stage.sql")
+        tx.execute("rl_create_status_stage.sql")
+        for batch in batches():
+            tx.executemany("rl_insert_status_stage.sql", batch)
+        tx.execute("rl_update_status_from_stage.sql")
+        tx.execute("rl_drop_status_stage.sql")
+
+    return len(labeled)
+
+
+def relabel_chunk(gateway_id, device_ids, start_date, end_date, method, dry_run):
+    """게이트웨이의 디바이스 묶음 라벨링 및 저장 (작업 프로세스에서 실행)
+
+    Returns:
+        list: (디바이스ID, 라벨링 건수, 오류메시지) 리스트
+    """
+    margin = timedelta(days=1)
+    try:
+        df = settings.load_datas(
+            query_file="rl_select_logs.sql",
+            params={
+                "gateway_id": gateway_id,
+                "device_ids": tuple(device_ids),
+                "start_date": (
+                    datetime.strptime(start_date, "%Y%m%d") - margin
+                ).strftime("%Y%m%d"),
+                "end_date": (datetime.strptime(end_date, "%Y%m%d") + margin).strftime(
+                    "%Y%m%d"
+                ),
+            },
+        )
+    except Exception as ex:
+        return [(device_id, 0, str(ex)) for device_id in device_ids]
+
+    groups = df.groupby("device_id", sort=False).indices
+    results = []
+
+    for device_id in device_ids:
+        try:
+            rows = groups.get(device_id, np.array([], dtype=np.int64))
+            labeled = label_device(df.iloc[rows], start_date, end_date)
+            if not dry_run and len(labeled):
+                write_statuses(labeled, method=method)
+            results.append((device_id, len(labeled), None))
+        except Exception as ex:
+            results.append((device_id, 0, str(ex)))
+
+    return results
+
+
+def run(
+    start_date,
+    end_date,
+    device_ids=None,
+    processes=None,
+    chunk_size=CHUNK_SIZE,
+    method="stage",
+    resume=True,
+    dry_run=False,
+    checkpoint_path=CHECKPOINT_PATH,
+):
+    """기간의 전력 사용상태 일괄 라벨링
+
+    Args:
+        start_date (str): 시작일자
+        end_date (str): 종료일자
+        device_ids (list, optional): 디바이스ID 리스트. Defaults to None(전체).
+        processes (int, optional): 프로세스 수. Defaults to None(CPU 수).
+        chunk_size (int, optional): 한번에 조회할 디바이스 수. Defaults to CHUNK_SIZE.
+        method (str, optional): 저장 방식 (stage, update). Defaults to "stage".
+        resume (bool, optional): 완료된 디바이스 제외여부. Defaults to True.
+        dry_run (bool, optional): 저장하지 않고 라벨링만 실행. Defaults to False.
+        checkpoint_path (str, optional): 진행상황 저장소 경로.
+            Defaults to CHECKPOINT_PATH.
+
+    Returns:
+        dictionary: 처리건수, 오류건수, 라벨링 건수, 초당 처리건수
+    """
+    devices = settings.load_datas(query_file="ai_select_devices.sql", params={})
+    if device_ids is not None:
+        devices = devices.loc[devices["device_id"].isin(device_ids)]
+
+    trained = model_store.existing("devices", devices["device_id"].tolist())
+    done = finished_devices(start_date, end_date, checkpoint_path) if resume else set()
+
+    # 데이터 적재현황 색인이 기간을 반영했으면 기간에 로그가 없는 디바이스 제외
+    no_logs = set()
+    state = coverage_store.coverage()
+    if state is not None and state[0] <= start_date and end_date <= state[1]:
+        index = coverage_store.lookup(devices["device_id"].tolist(), models=False)
+        in_range = index.loc[
+            (index["first_date"] <= end_date) & (index["last_date"] >= start_date)
+        ]
+        no_logs = set(devices["device_id"].astype(str)) - set(in_range["device_id"])
+
+    gateways = {}
+    skipped = 0
+    for row in devices.itertuples(index=False):
+        if (
+            row.device_id not in trained
+            or row.device_id in done
+            or str(row.device_id) in no_logs
+        ):
+            skipped += 1
+            continue
+        gateways.setdefault(row.gateway_id, []).append(row.device_id)
+
+    chunks = [
+        (gateway_id, items[i : i + chunk_size])
+        for gateway_id, items in gateways.items()
+        for i in range(0, len(items), chunk_size)
+    ]
+    total = sum(len(items) for _, items in chunks)
+    print(
+        f"[relabel] {start_date}~{end_date}: {total} devices in {len(chunks)} chunks "
+        f"({skipped} skipped: no model, no logs or already done)"
+    )
+
+    started = time.perf_counter()
+    processed, errors, labeled_rows = 0, 0, 0
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {
+            executor.submit(
+                relabel_chunk,
+                gateway_id,
+                items,
+                start_date,
+                end_date,
+                method,
+                dry_run,
+            ): gateway_id
+            for gateway_id, items in chunks
+        }
+
+        for future in as_completed(futures):
+            gateway_id = futures[future]
+            results = future.result()
+            finished_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            if not dry_run:
+                with open_checkpoint(checkpoint_path) as conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO RELABEL_PROGRESS "
+                        "(START_DATE, END_DATE, DEVICE_ID, GATEWAY_ID, ROWS, "
+                        " FINISHED_AT) VALUES (?, ?, ?, ?, ?, ?)",
+                        [
+                            (
+                                start_date,
+                                end_date,
+                                device_id,
+                                gateway_id,
+                                rows,
+                                finished_at,
+                            )
+                            for device_id, rows, error in results
+                            if error is None
+                        ],
+                    )
+
+            for device_id, rows, error in results:
+                processed += 1
+                labeled_rows += rows
+                if error is not None:
+                    errors += 1
+                    print(f"[relabel] {gateway_id}/{device_id} failed: {error}")
+
+            elapsed = max(time.perf_counter() - started, 1e-9)
+            rate = processed / elapsed
+            print(
+                f"[relabel] {processed}/{total} devices, {labeled_rows} rows "
+                f"({labeled_rows / elapsed:.0f} rows/s, "
+                f"eta {(total - processed) / max(rate, 1e-9):.0f}s)"
+            )
+
+    # 데이터 적재현황 색인의 라벨링 건수 갱신
+    if not dry_run and processed and coverage_store.coverage() is not None:
+        coverage_store.aggregate(start_date, end_date)
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "processed": processed,
+        "errors": errors,
+        "skipped": skipped,
+        "rows": labeled_rows,
+        "elapsed": elapsed,
+        "rows_per_sec": labeled_rows / max(elapsed, 1e-9),
+    }
+    print(f"[relabel] done: {stats}")
+
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="전력 사용상태 일괄 라벨링")
+    parser.add_argument("--start", required=True, help="시작일자(YYYYMMDD)")
+    parser.add_argument("--end", required=True, help="종료일자(YYYYMMDD)")
+    parser.add_argument("--devices", nargs="+", help="디바이스ID. 기본값은 전체")
+    parser.add_argument("--processes", type=int, help="프로세스 수. 기본값은 CPU 수")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--method", choices=["stage", "update"], default="stage")
+    parser.add_argument("--no-resume", action="store_true", help="완료된 디바이스도 다시 라벨링")
+    parser.add_argument("--dry-run", action="store_true", help="저장하지 않음")
+    args = parser.parse_args()
+
+    run(
+        start_date=args.start,
+        end_date=args.end,
+        device_ids=args.devices,
+        processes=args.processes,
+        chunk_size=args.chunk_size,
+        method=args.method,
+        resume=not args.no_resume,
+        dry_run=args.dry_run,
+    )
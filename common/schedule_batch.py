@@ -0,0 +1,185 @@
+"""요일별 전력 차단 스케줄 일괄 생성
+
+AH_DEVICE_INSTALL의 전체 디바이스에 대해 요일별 전력 차단 스케줄을 미리 생성하여
+스케줄 저장소에 저장한다. 게이트웨이 단위로 로그를 한번에 조회하며
+게이트웨이별 작업을 프로세스 pool로 나누어 실행한다.
+이미 같은 기준일자로 생성된 디바이스는 건너뛰므로 중단된 작업을 이어서 실행할 수 있다.
+
+    usage example:
+        root> python -m common.schedule_batch --date 20201201 --processes 8
+"""
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import routes.settings as settings
+import common.ai as ai
+import common.schedule_store as store
+import common.coverage_store as coverage_store
+
+
+def make_gateway_schedules(gateway_id, devices, collect_date):
+    """게이트웨이의 디바이스별 요일 스케줄 생성
+
+    Args:
+        gateway_id (str): 게이트웨이ID
+        devices (list): (디바이스ID, 항상 켜짐 여부) 리스트
+        collect_date (str): 기준일자
+
+    Returns:
+        list: (디바이스ID, 스케줄 dataframe, 소요시간(초), 오류메시지) 리스트
+    """
+    started = time.perf_counter()
+    results = []
+
+    try:
+        logs = ai.get_gateway_schedule_logs(
+            gateway_id,
+            [device_id for device_id, always_on in devices if always_on != 1],
+            collect_date=collect_date,
+        )
+    except Exception as ex:
+        return [(device_id, None, 0.0, str(ex)) for device_id, _ in devices]
+
+    # 조회시간은 디바이스별로 나누어 소요시간에 포함
+    fetch_time = (time.perf_counter() - started) / max(len(devices), 1)
+
+    for device_id, always_on in devices:
+        device_started = time.perf_counter()
+        try:
+            if always_on is None:
+                raise KeyError(f"device model not found: {device_id}")
+
+            df = ai.build_ai_schedule(always_on, logs.get(device_id))
+            error = None
+        except Exception as ex:
+            df, error = None, str(ex)
+
+        elapsed = fetch_time + time.perf_counter() - device_started
+        results.append((device_id, df, elapsed, error))
+
+    return results
+
+
+def run(collect_date=None, processes=None, resume=True, store_path=None):
+    """전체 디바이스의 요일별 스케줄 생성
+
+    Args:
+        collect_date (str, optional): 기준일자. Defaults to None(당일).
+        processes (int, optional): 프로세스 수. Defaults to None(CPU 수).
+        resume (bool, optional): 이미 생성된 디바이스 제외여부. Defaults to True.
+        store_path (str, optional): 저장소 경로. Defaults to None(STORE_PATH).
+
+    Returns:
+        dictionary: 처리건수, 오류건수, 디바이스별 소요시간 통계
+    """
+    collect_date = collect_date or datetime.now().strftime("%Y%m%d")
+    store_path = store_path or store.STORE_PATH
+
+    devices = settings.load_datas(query_file="ai_select_devices.sql", params={})
+    done = store.stored_devices(collect_date, path=store_path) if resume else set()
+
+    # 데이터 적재기간이 4주 미만인 디바이스는 /schedule과 같이 생성하지 않는다
+    index = coverage_store.lookup(devices["device_id"].tolist(), models=False)
+    if index is not None:
+        short = index.loc[pd.to_numeric(index["weeks"]) < 4]
+        short = set(zip(short["gateway_id"], short["device_id"]))
+        if short:
+            print(f"[schedule] {len(short)} devices skipped: not enough log data")
+            devices = devices.loc[
+                [
+                    (str(g), str(d)) not in short
+                    for g, d in zip(devices["gateway_id"], devices["device_id"])
+                ]
+            ]
+
+    gateways = {}
+    for row in devices.itertuples(index=False):
+        if row.device_id in done:
+            continue
+        # 디바이스 모델 정보가 없는 경우(always_on이 null)는 오류로 처리
+        always_on = None if pd.isna(row.always_on) else int(row.always_on)
+        gateways.setdefault(row.gateway_id, []).append((row.device_id, always_on))
+
+    total = sum(len(items) for items in gateways.values())
+    print(
+        f"[schedule] {collect_date}: {total} devices in {len(gateways)} gateways "
+        f"({len(done)} already done)"
+    )
+
+    started = time.perf_counter()
+    processed, errors, elapsed = 0, 0, []
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {
+            executor.submit(
+                make_gateway_schedules, gateway_id, items, collect_date
+            ): gateway_id
+            for gateway_id, items in gateways.items()
+        }
+
+        for future in as_completed(futures):
+            gateway_id = futures[future]
+            results = future.result()
+
+            store.save_schedules(
+                [
+                    (device_id, gateway_id, collect_date, df, seconds)
+                    for device_id, df, seconds, error in results
+                    if error is None
+                ],
+                path=store_path,
+            )
+
+            for device_id, _, seconds, error in results:
+                processed += 1
+                elapsed.append(seconds)
+                if error is not None:
+                    errors += 1
+                    print(f"[schedule] {gateway_id}/{device_id} failed: {error}")
+
+            rate = processed / max(time.perf_counter() - started, 1e-9)
+            print(
+                f"[schedule] {processed}/{total} devices "
+                f"({rate:.1f}/s, eta {(total - processed) / max(rate, 1e-9):.0f}s)"
+            )
+
+    stats = {
+        "collect_date": collect_date,
+        "processed": processed,
+        "errors": errors,
+        "skipped": len(done),
+        "elapsed": time.perf_counter() - started,
+    }
+
+    if elapsed:
+        stats.update(
+            {
+                "device_mean": float(np.mean(elapsed)),
+                "device_p50": float(np.percentile(elapsed, 50)),
+                "device_p95": float(np.percentile(elapsed, 95)),
+                "device_max": float(np.max(elapsed)),
+            }
+        )
+
+    print(f"[schedule] done: {stats}")
+
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="요일별 전력 차단 스케줄 일괄 생성")
+    parser.add_argument("--date", help="기준일자(YYYYMMDD). 기본값은 당일")
+    parser.add_argument("--processes", type=int, help="프로세스 수. 기본값은 CPU 수")
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="이미 생성된 디바이스도 다시 생성",
+    )
+    args = parser.parse_args()
+
+    run(collect_date=args.date, processes=args.processes, resume=not args.no_resume)
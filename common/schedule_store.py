@@ -0,0 +1,138 @@
+"""요일별 전력 차단 스케줄 저장소
+
+미리 생성한 디바이스의 요일별 스케줄을 로컬 SQLite에 (디바이스, 요일) 단위로
+저장하고 조회한다.
+"""
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+STORE_PATH = "./datas/schedules.sqlite"
+
+COLUMNS = ["dayofweek", "start", "end", "duration", "status"]
+
+
+@contextmanager
+def open_store(path=STORE_PATH):
+    """저장소 연결. 테이블이 없으면 생성
+
+    Yields:
+        Object: sqlite3 Connection Object
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS AI_SCHEDULE (
+                DEVICE_ID     TEXT    NOT NULL,
+                DAYOFWEEK     INTEGER NOT NULL,
+                GATEWAY_ID    TEXT    NOT NULL,
+                COLLECT_DATE  TEXT    NOT NULL,
+                SCHEDULE      TEXT    NOT NULL,
+                GENERATED_AT  TEXT    NOT NULL,
+                ELAPSED       REAL,
+                PRIMARY KEY (DEVICE_ID, DAYOFWEEK)
+            );
+            """
+        )
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def save_schedules(results, path=STORE_PATH):
+    """디바이스별 스케줄 저장
+
+    Args:
+        results (list): (디바이스ID, 게이트웨이ID, 기준일자, 스케줄, 소요시간) 리스트
+            스케줄은 ai.build_ai_schedule 결과 dataframe
+        path (str, optional): 저장소 경로. Defaults to STORE_PATH.
+    """
+    generated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = []
+
+    for device_id, gateway_id, collect_date, df, elapsed in results:
+        # 스케줄 행에 요일번호(1~7)를 붙여서 요일별로 나눈다
+        days = {dayofweek: [] for dayofweek in range(1, 8)}
+        for row in df.loc[:, COLUMNS].itertuples(index=False, name=None):
+            days[int(row[0])].append(list(row))
+
+        rows.extend(
+            (
+                device_id,
+                dayofweek,
+                gateway_id,
+                collect_date,
+                json.dumps(schedule, default=lambda x: x.item()),
+                generated_at,
+                elapsed,
+            )
+            for dayofweek, schedule in days.items()
+        )
+
+    with open_store(path) as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO AI_SCHEDULE "
+            "(DEVICE_ID, DAYOFWEEK, GATEWAY_ID, COLLECT_DATE, SCHEDULE, "
+            " GENERATED_AT, ELAPSED) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+
+def load_schedule(device_id, collect_date=None, path=STORE_PATH):
+    """저장된 디바이스의 요일별 스케줄 조회
+
+    Args:
+        device_id (str): 디바이스ID
+        collect_date (str, optional): 기준일자. Defaults to None(당일).
+            기준일자로 생성된 스케줄만 조회
+        path (str, optional): 저장소 경로. Defaults to STORE_PATH.
+
+    Returns:
+        dataframe: 요일별 전력 차단 스케줄 (없으면 None)
+        str: 스케줄 생성일시 (없으면 None)
+    """
+    collect_date = collect_date or datetime.now().strftime("%Y%m%d")
+
+    if not os.path.exists(path):
+        return None, None
+
+    with open_store(path) as conn:
+        rows = conn.execute(
+            "SELECT SCHEDULE, GENERATED_AT FROM AI_SCHEDULE "
+            "WHERE DEVICE_ID = ? AND COLLECT_DATE = ? ORDER BY DAYOFWEEK",
+            (device_id, collect_date),
+        ).fetchall()
+
+    if len(rows) < 7:
+        return None, None
+
+    schedule = [row for day, _ in rows for row in json.loads(day)]
+    df = pd.DataFrame(schedule, columns=COLUMNS, dtype=object)
+
+    return df, min(generated_at for _, generated_at in rows)
+
+
+def stored_devices(collect_date, path=STORE_PATH):
+    """기준일자로 스케줄이 생성된 디바이스 목록
+
+    Args:
+        collect_date (str): 기준일자
+        path (str, optional): 저장소 경로. Defaults to STORE_PATH.
+
+    Returns:
+        set: 디바이스ID 집합
+    """
+    with open_store(path) as conn:
+        rows = conn.execute(
+            "SELECT DEVICE_ID FROM AI_SCHEDULE WHERE COLLECT_DATE = ? "
+            "GROUP BY DEVICE_ID HAVING COUNT(*) = 7",
+            (collect_date,),
+        ).fetchall()
+
+    return {row[0] for row in rows}
@@ -0,0 +1,320 @@
+"""디바이스 분류모델 일괄 학습
+
+여러 디바이스의 전력 사용상태 분류모델을 프로세스 pool로 나누어 학습한다.
+학습데이터는 여러 디바이스를 묶어서 한번에 조회하고,
+전체 CPU 사용량(cpu_budget)을 넘지 않도록 프로세스 수와 모델당 스레드 수를 정한다.
+
+    usage example:
+        * 지정한 디바이스 학습
+            root> python -m common.training_runner --devices 000D6F000F745CBD1 00158D0001A457111
+        * 새로 라벨링된 데이터가 있는 전체 디바이스 학습
+            root> python -m common.training_runner --new-labels --cpu-budget 16
+        * 새로 라벨링된 데이터만 기존 모델에 이어서 학습 (증분학습)
+            root> python -m common.training_runner --new-labels --incremental
+"""
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+import pandas as pd
+from threadpoolctl import threadpool_limits
+
+import routes.settings as settings
+import common.model_training as mt
+import common.model_store as model_store
+import common.coverage_store as coverage_store
+
+# 한번에 학습데이터를 조회할 디바이스 수
+CHUNK_SIZE = 20
+# 모델 하나를 학습할 때 사용하는 스레드 수 (XGBoost nthread)
+THREADS_PER_FIT = 4
+
+
+def find_devices_with_new_labels():
+    """학습된 모델보다 이후에 라벨링된 데이터가 있는 디바이스 조회
+
+    데이터 적재현황 색인(common.coverage_store)이 있으면 최근 기간을 다시 합산한 후
+    색인의 마지막 라벨링 일자와 학습일자를 비교한다.
+
+    Returns:
+        list: 디바이스ID 리스트
+    """
+    if coverage_store.coverage() is not None:
+        coverage_store.refresh()
+        index = coverage_store.lookup()
+        installed = settings.load_datas(query_file="ai_select_devices.sql", params={})
+        index = index.loc[
+            index["last_labeled_date"].notna()
+            & index["device_id"].isin(installed["device_id"].astype(str))
+        ]
+        # 게이트웨이가 바뀐 디바이스는 마지막 라벨링 일자가 가장 늦은 것으로 비교
+        index = index.sort_values("last_labeled_date").drop_duplicates(
+            "device_id", keep="last"
+        )
+
+        return [
+            device_id
+            for device_id, last_labeled_date, trained_date in index.loc[
+                :, ["device_id", "last_labeled_date", "trained_date"]
+            ].itertuples(index=False)
+            if pd.isna(trained_date) or last_labeled_date > trained_date
+        ]
+
+    df = settings.load_datas(query_file="mt_select_labeled_devices.sql", params={})
+    # 모델 저장소 색인에서 현재 모델 정보를 한번에 조회
+    models = model_store.current_models("devices", df["device_id"].tolist())
+
+    devices = []
+    for device_id, last_labeled_date in df.itertuples(index=False):
+        model = models.get(str(device_id))
+
+        if model is not None:
+            # 학습 데이터의 마지막 일자가 없으면 학습일자로 비교
+            trained_date = model["last_collect_date"] or (
+                model["trained_at"][:10].replace("-", "")
+            )
+            if str(last_labeled_date) <= trained_date:
+                continue
+
+        devices.append(device_id)
+
+    return devices
+
+
+def load_chunk(device_ids, is_csv=False):
+    """여러 디바이스의 학습데이터를 한번에 조회
+
+    Args:
+        device_ids (list): 디바이스ID 리스트
+        is_csv (bool, optional): 데이터를 csv 파일에서 조회여부. Defaults to False.
+
+    Returns:
+        dictionary: 디바이스ID별 학습데이터
+    """
+    if is_csv:
+        return {
+            device_id: mt.load_status_datas(device_id, is_csv=True)
+            for device_id in device_ids
+        }
+
+    df = settings.load_datas(
+        query_file="mt_select_devices.sql",
+        params={"device_ids": tuple(device_ids)},
+    )
+    groups = df.groupby("device_id", sort=False).indices
+
+    return {
+        device_id: df.iloc[groups.get(device_id, [])].reset_index(drop=True)
+        for device_id in device_ids
+    }
+
+
+def _limit_threads(threads):
+    """작업 프로세스의 BLAS/OpenMP 스레드 수 제한"""
+    for name in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[name] = str(threads)
+
+    threadpool_limits(threads)
+
+
+def train_device(device_id, df, model_type, threads, incremental=False, is_csv=False):
+    """디바이스 분류모델 학습 (작업 프로세스에서 실행)
+
+    증분학습은 df가 None이면 디바이스별로 새 데이터만 조회한다.
+
+    Returns:
+        dictionary: 학습 결과
+    """
+    report = {
+        "device_id": device_id,
+        "rows": None if df is None else len(df),
+        "fit_time": None,
+        "score": None,
+        "model_size": None,
+        "path": None,
+        "error": None,
+    }
+
+    started = time.perf_counter()
+    try:
+        path, score = mt.make_model_status(
+            device_id=device_id,
+            model_type=model_type,
+            df=df,
+            n_jobs=1,
+            nthread=threads,
+            incremental=incremental,
+            is_csv=is_csv,
+        )
+        report.update(
+            {
+                "score": score,
+                "model_size": os.path.getsize(path),
+                "path": path,
+            }
+        )
+    except Exception as ex:
+        report["error"] = str(ex)
+
+    report["fit_time"] = time.perf_counter() - started
+
+    return report
+
+
+def run(
+    device_ids=None,
+    model_type="xgboost classifier",
+    cpu_budget=None,
+    threads_per_fit=THREADS_PER_FIT,
+    chunk_size=CHUNK_SIZE,
+    is_csv=False,
+    report_path=None,
+    incremental=False,
+):
+    """여러 디바이스의 분류모델 일괄 학습
+
+    Args:
+        device_ids (list, optional): 디바이스ID 리스트.
+            Defaults to None(새로 라벨링된 데이터가 있는 전체 디바이스).
+        model_type (str, optional): 모델 타입. Defaults to 'xgboost classifier'.
+        cpu_budget (int, optional): 전체 사용 CPU 수. Defaults to None(CPU 수).
+        threads_per_fit (int, optional): 모델당 스레드 수. Defaults to THREADS_PER_FIT.
+        chunk_size (int, optional): 한번에 조회할 디바이스 수. Defaults to CHUNK_SIZE.
+        is_csv (bool, optional): 데이터를 csv 파일에서 조회여부. Defaults to False.
+        report_path (str, optional): 결과 저장경로.
+            Defaults to None(./datas/training_report_{실행일시}.csv).
+        incremental (bool, optional): 증분학습 여부. Defaults to False.
+            전체 학습데이터를 묶어서 조회하지 않고 디바이스별로 새 데이터만 조회한다.
+
+    Returns:
+        dataframe: 디바이스별 학습 결과 (rows, fit_time, score, model_size)
+    """
+    if device_ids is None:
+        device_ids = find_devices_with_new_labels()
+
+    cpu_budget = cpu_budget or os.cpu_count() or 1
+    threads = max(1, min(threads_per_fit, cpu_budget))
+    workers = max(1, cpu_budget // threads)
+    report_path = report_path or (
+        f"./datas/training_report_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv"
+    )
+
+    print(
+        f"[training] {len(device_ids)} devices, {workers} processes "
+        f"x {threads} threads (cpu budget {cpu_budget})"
+    )
+
+    started = time.perf_counter()
+    reports = []
+    pending = set()
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_limit_threads, initargs=(threads,)
+    ) as executor:
+        for i in range(0, len(device_ids), chunk_size):
+            # 메모리 사용량을 제한하기 위해 대기중인 작업이 많으면 먼저 처리
+            while len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                reports.extend(_collect(done, len(device_ids), reports, started))
+
+            chunk = device_ids[i : i + chunk_size]
+            try:
+                if incremental:
+                    datas = dict.fromkeys(chunk)
+                else:
+                    datas = load_chunk(chunk, is_csv=is_csv)
+            except Exception as ex:
+                for device_id in chunk:
+                    reports.append({"device_id": device_id, "error": str(ex)})
+                continue
+
+            for device_id in chunk:
+                pending.add(
+                    executor.submit(
+                        train_device,
+                        device_id,
+                        datas[device_id],
+                        model_type,
+                        threads,
+                        incremental,
+                        is_csv,
+                    )
+                )
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            reports.extend(_collect(done, len(device_ids), reports, started))
+
+    df = pd.DataFrame(
+        reports,
+        columns=[
+            "device_id",
+            "rows",
+            "fit_time",
+            "score",
+            "model_size",
+            "path",
+            "error",
+        ],
+    )
+    df.to_csv(report_path, header=True, index=False, encoding="utf-8")
+
+    print(
+        f"[training] done: {df['error'].isna().sum()} trained, "
+        f"{df['error'].notna().sum()} failed in "
+        f"{time.perf_counter() - started:.1f}s, report: {report_path}"
+    )
+
+    return df
+
+
+def _collect(done, total, reports, started):
+    """완료된 작업 결과 수집 및 진행상황 출력"""
+    results = [future.result() for future in done]
+
+    for i, report in enumerate(results):
+        count = len(reports) + i + 1
+        status = (
+            f"score {report['score']:.4f}"
+            if report["error"] is None
+            else f"failed: {report['error']}"
+        )
+        print(
+            f"[training] {count}/{total} {report['device_id']} "
+            f"rows {report['rows']} fit {report['fit_time']:.1f}s {status} "
+            f"({time.perf_counter() - started:.0f}s)"
+        )
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="디바이스 분류모델 일괄 학습")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--devices", nargs="+", help="학습할 디바이스ID")
+    target.add_argument(
+        "--new-labels",
+        action="store_true",
+        help="새로 라벨링된 데이터가 있는 전체 디바이스 학습",
+    )
+    parser.add_argument("--model-type", default="xgboost classifier")
+    parser.add_argument("--cpu-budget", type=int, help="전체 사용 CPU 수")
+    parser.add_argument("--threads-per-fit", type=int, default=THREADS_PER_FIT)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--is-csv", action="store_true")
+    parser.add_argument("--report", help="결과 저장경로(csv)")
+    parser.add_argument("--incremental", action="store_true", help="새 데이터만 이어서 학습")
+    args = parser.parse_args()
+
+    run(
+        device_ids=args.devices,
+        model_type=args.model_type,
+        cpu_budget=args.cpu_budget,
+        threads_per_fit=args.threads_per_fit,
+        chunk_size=args.chunk_size,
+        is_csv=args.is_csv,
+        report_path=args.report,
+        incremental=args.incremental,
+    )
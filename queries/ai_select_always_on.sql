@@ -0,0 +1,5 @@
+SELECT
+       IFNULL(T.ALWAYS_ON, 0)  AS always_on
+  FROM AH_DEVICE_MODEL T
+ WHERE 1 = 1
+   AND T.DEVICE_ID = %(device_id)s
\ No newline at end of file
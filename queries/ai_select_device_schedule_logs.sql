@@ -0,0 +1,25 @@
+SELECT
+       T.DAY_NM            AS day_nm
+     , T.COLLECT_DD        AS curr_dt
+     , T.COLLECT_DATE      AS curr_dd
+     , T.APPLIANCE_STATUS  AS status
+  FROM (
+    SELECT
+           STR_TO_DATE(CONCAT(T.COLLECT_DATE, T.COLLECT_TIME), '%%Y%%m%%d%%H%%i') AS COLLECT_DD
+         , DAYOFWEEK(T.COLLECT_DATE)         AS DAY_NM
+         , T.COLLECT_DATE
+         , T.ENERGY_DIFF
+         , IFNULL(T.APPLIANCE_STATUS, 0)     AS APPLIANCE_STATUS
+      FROM AH_USE_LOG_BYMINUTE T
+     WHERE 1 = 1
+       AND T.GATEWAY_ID    = %(gateway_id)s
+       AND T.DEVICE_ID     = %(device_id)s
+       AND T.COLLECT_DATE >= DATE_FORMAT(DATE_ADD(STR_TO_DATE(%(collect_date)s, '%%Y%%m%%d')
+                                                , INTERVAL -28 DAY)
+                                       , '%%Y%%m%%d')
+       AND T.COLLECT_DATE  < %(collect_date)s
+    ) T
+ WHERE 1 = 1
+   AND (%(dayofweek)s IS NULL OR T.DAY_NM = %(dayofweek)s)
+ ORDER BY
+       T.COLLECT_DD
\ No newline at end of file
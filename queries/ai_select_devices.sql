@@ -0,0 +1,17 @@
+SELECT
+       D.GATEWAY_ID                AS gateway_id
+     , D.DEVICE_ID                 AS device_id
+     , M.ALWAYS_ON_FLAG            AS always_on
+  FROM AH_DEVICE_INSTALL D
+  LEFT OUTER JOIN (
+    SELECT
+           T.DEVICE_ID
+         , MAX(IFNULL(T.ALWAYS_ON, 0)) AS ALWAYS_ON_FLAG
+      FROM AH_DEVICE_MODEL T
+     GROUP BY
+           T.DEVICE_ID
+    ) M
+    ON (M.DEVICE_ID = D.DEVICE_ID)
+ ORDER BY
+       D.GATEWAY_ID
+     , D.DEVICE_ID
\ No newline at end of file
@@ -0,0 +1,18 @@
+SELECT
+       T.DEVICE_ID                                   AS device_id
+     , DAYOFWEEK(T.COLLECT_DATE)                     AS day_nm
+     , STR_TO_DATE(CONCAT(T.COLLECT_DATE, T.COLLECT_TIME), '%%Y%%m%%d%%H%%i') AS curr_dt
+     , T.COLLECT_DATE                                AS curr_dd
+     , IFNULL(T.APPLIANCE_STATUS, 0)                 AS status
+  FROM AH_USE_LOG_BYMINUTE T
+ WHERE 1 = 1
+   AND T.GATEWAY_ID    = %(gateway_id)s
+   AND T.DEVICE_ID    IN %(device_ids)s
+   AND T.COLLECT_DATE >= DATE_FORMAT(DATE_ADD(STR_TO_DATE(%(collect_date)s, '%%Y%%m%%d')
+                                            , INTERVAL -28 DAY)
+                                   , '%%Y%%m%%d')
+   AND T.COLLECT_DATE  < %(collect_date)s
+ ORDER BY
+       T.DEVICE_ID
+     , T.COLLECT_DATE
+     , T.COLLECT_TIME
\ No newline at end of file
@@ -0,0 +1,13 @@
+SELECT
+       T.DEVICE_ID                  AS device_id
+     , T.GATEWAY_ID                 AS gateway_id
+     , T.COLLECT_DATE               AS collect_date
+     , COUNT(*)                     AS log_count
+     , COUNT(T.APPLIANCE_STATUS)    AS labeled_count
+  FROM AH_USE_LOG_BYMINUTE T
+ WHERE 1 = 1
+   AND T.COLLECT_DATE BETWEEN %(start_date)s AND %(end_date)s
+ GROUP BY
+       T.DEVICE_ID
+     , T.GATEWAY_ID
+     , T.COLLECT_DATE
\ No newline at end of file
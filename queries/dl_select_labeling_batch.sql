@@ -0,0 +1,16 @@
+SELECT
+       T.GATEWAY_ID     AS gateway_id
+     , T.DEVICE_ID      AS device_id
+     , T.ENERGY_DIFF    AS energy_diff
+     , STR_TO_DATE(CONCAT(T.COLLECT_DATE, T.COLLECT_TIME), '%%Y%%m%%d%%H%%i') AS collect_dd
+     , T.POWER          AS power
+     , T.ONOFF          AS onoff
+  FROM AH_USE_LOG_BYMINUTE T
+ WHERE 1 = 1
+   AND T.GATEWAY_ID   = %(gateway_id)s
+   AND T.DEVICE_ID    IN %(device_ids)s
+   AND T.COLLECT_DATE IN %(collect_dates)s
+ ORDER BY
+       T.DEVICE_ID
+     , T.COLLECT_DATE
+     , T.COLLECT_TIME
\ No newline at end of file
@@ -0,0 +1,6 @@
+SELECT
+       CEIL(DATEDIFF(NOW(), DATE_FORMAT(MIN(T.COLLECT_DATE), '%%Y%%m%%d')) / 7) AS weeks
+  FROM AH_USE_LOG_BYMINUTE T
+ WHERE 1 = 1
+   AND T.GATEWAY_ID = %(gateway_id)s
+   AND T.DEVICE_ID  = %(device_id)s
\ No newline at end of file
@@ -0,0 +1,25 @@
+SELECT
+       S.HOUSE_NO          AS house_no
+     , T.COLLECT_DATE      AS collect_date
+     , SUM(T.ENERGY_DIFF)  AS energy
+  FROM AH_USE_LOG_BYMINUTE T
+ INNER JOIN AH_GATEWAY_INSTALL S
+    ON (S.GATEWAY_ID = T.GATEWAY_ID)
+ INNER JOIN (
+    SELECT
+           DATE_FORMAT(DATE_ADD(START_DATE, INTERVAL -7 DAY), '%%Y%%m%%d') AS START_DATE
+         , DATE_FORMAT(DATE_ADD(START_DATE, INTERVAL -1 DAY), '%%Y%%m%%d') AS END_DATE
+         , DATE_FORMAT(START_DATE, '%%H%%i')   AS START_TIME
+         , DATE_FORMAT(END_DATE, '%%H%%i')     AS END_TIME
+      FROM AH_DR_REQUEST R
+     WHERE 1 = 1
+       AND R.REQUEST_DR_NO = %(request_dr_no)s
+    ) R
+    ON ( T.COLLECT_DATE BETWEEN R.START_DATE AND R.END_DATE
+     AND T.COLLECT_TIME BETWEEN R.START_TIME AND R.END_TIME )
+ WHERE 1 = 1
+   AND S.HOUSE_NO IN %(house_nos)s
+   AND DAYOFWEEK(T.COLLECT_DATE) BETWEEN 2 AND 6
+ GROUP BY
+       S.HOUSE_NO
+     , T.COLLECT_DATE
\ No newline at end of file
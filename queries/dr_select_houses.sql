@@ -0,0 +1,5 @@
+SELECT DISTINCT
+       G.HOUSE_NO       AS house_no
+  FROM AH_GATEWAY_INSTALL G
+ ORDER BY
+       G.HOUSE_NO
\ No newline at end of file
@@ -0,0 +1,84 @@
+SELECT
+       T.HOUSE_NO                                       AS house_no
+     , T.GATEWAY_ID                                     AS gateway_id
+     , T.DEVICE_ID                                      AS device_id
+     , T.FREQUENCY                                      AS frequency
+     , (SUM(H.WAIT_ENERGY) / SUM(H.WAIT_TIME)) * T.DIFF AS energy_wait
+     , (SUM(H.USE_ENERGY) / SUM(H.USE_TIME))   * T.DIFF AS energy_use
+     , IF(SUM(S.ONOFF) > 2.5, 1, 0)                     AS onoff
+     , IF(AVG(S.POWER) > 0.5, 1, 0)                     AS status
+     , IFNULL(IF(AVG(S.POWER) > 0.5
+                , SUM(H.USE_ENERGY) / SUM(H.USE_TIME)
+                , SUM(H.WAIT_ENERGY) / SUM(H.WAIT_TIME))
+             , 0)                                       AS energy
+  FROM (
+    SELECT
+           T.HOUSE_NO
+         , T.GATEWAY_ID
+         , T.DEVICE_ID
+         , T.DIFF
+         , SUM(T.APPLIANCE_STATUS)  AS FREQUENCY
+      FROM (
+        SELECT
+               G.HOUSE_NO
+             , L.GATEWAY_ID
+             , L.DEVICE_ID
+             , L.COLLECT_DATE
+             , R.DIFF
+             , MAX(IFNULL(L.APPLIANCE_STATUS, 0)) AS APPLIANCE_STATUS
+          FROM AH_GATEWAY_INSTALL G
+         INNER JOIN AH_USE_LOG_BYMINUTE L
+            ON (L.GATEWAY_ID = G.GATEWAY_ID)
+         INNER JOIN AH_DEVICE D
+            ON (D.DEVICE_ID = L.DEVICE_ID)
+         INNER JOIN (
+            SELECT
+                   DAYOFWEEK(R.START_DATE)             AS DAY_NM
+                 , DATE_FORMAT(R.START_DATE, '%%H%%i') AS START_TIME
+                 , DATE_FORMAT(R.END_DATE, '%%H%%i')   AS END_TIME
+                 , TIMESTAMPDIFF(MINUTE, R.START_DATE, R.END_DATE) AS DIFF
+              FROM AH_DR_REQUEST R
+             WHERE 1 = 1
+               AND R.REQUEST_DR_NO = %(request_dr_no)s
+            ) R
+            ON ( R.DAY_NM = DAYOFWEEK(L.COLLECT_DATE)
+             AND L.COLLECT_TIME BETWEEN R.START_TIME AND R.END_TIME )
+         WHERE 1 = 1
+           AND G.HOUSE_NO IN %(house_nos)s
+           AND D.FLAG_USE_AI = 'Y'
+         GROUP BY
+               G.HOUSE_NO
+             , L.GATEWAY_ID
+             , L.DEVICE_ID
+             , L.COLLECT_DATE
+             , R.DIFF
+        ) T
+     WHERE 1 = 1
+     GROUP BY
+           T.HOUSE_NO
+         , T.GATEWAY_ID
+         , T.DEVICE_ID
+         , T.DIFF
+    ) T
+ INNER JOIN AH_DEVICE_ENERGY_HISTORY H
+    ON ( H.GATEWAY_ID = T.GATEWAY_ID
+     AND H.DEVICE_ID  = T.DEVICE_ID )
+ INNER JOIN aihems_service_db.AH_LOG_SOCKET S
+    ON ( S.GATEWAY_ID   = T.GATEWAY_ID
+     AND S.DEVICE_ID    = T.DEVICE_ID
+     AND S.COLLECT_DATE = DATE_FORMAT(NOW(), '%%Y%%m%%d')
+     AND S.COLLECT_TIME >= DATE_FORMAT(DATE_ADD(DATE_ADD(NOW(), INTERVAL 9 HOUR)
+                                              , INTERVAL -5 MINUTE)
+                                     , '%%H%%i') )
+ WHERE 1 = 1
+ GROUP BY
+       T.HOUSE_NO
+     , T.GATEWAY_ID
+     , T.DEVICE_ID
+     , T.FREQUENCY
+ ORDER BY
+       HOUSE_NO
+     , STATUS DESC
+     , ONOFF DESC
+     , FREQUENCY ASC
+     , ENERGY DESC
\ No newline at end of file
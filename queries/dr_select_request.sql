@@ -0,0 +1,7 @@
+SELECT
+       R.REQUEST_DR_NO  AS request_dr_no
+     , R.START_DATE     AS start_date
+     , R.END_DATE       AS end_date
+  FROM AH_DR_REQUEST R
+ WHERE 1 = 1
+   AND R.REQUEST_DR_NO = %(request_dr_no)s
\ No newline at end of file
@@ -6,6 +6,7 @@ SELECT
      , T.POWER       AS power
      , T.ONOFF       AS onoff
      , IFNULL(T.APPLIANCE_STATUS, 0) AS appliance_status
+     , T.COLLECT_DATE AS collect_date
   FROM AH_DEVICE_INSTALL D
  INNER JOIN AH_USE_LOG_BYMINUTE T 
     ON ( T.GATEWAY_ID = D.GATEWAY_ID
@@ -0,0 +1,11 @@
+SELECT
+       T.DEVICE_ID          AS device_id
+     , MAX(T.COLLECT_DATE)  AS last_labeled_date
+  FROM AH_DEVICE_INSTALL D
+ INNER JOIN AH_USE_LOG_BYMINUTE T
+    ON ( T.GATEWAY_ID = D.GATEWAY_ID
+     AND T.DEVICE_ID  = D.DEVICE_ID )
+ WHERE 1 = 1
+   AND T.APPLIANCE_STATUS IS NOT NULL
+ GROUP BY
+       T.DEVICE_ID
\ No newline at end of file
@@ -0,0 +1,9 @@
+CREATE TEMPORARY TABLE TMP_APPLIANCE_STATUS AS
+SELECT
+       T.GATEWAY_ID
+     , T.DEVICE_ID
+     , T.COLLECT_DATE
+     , T.COLLECT_TIME
+     , T.APPLIANCE_STATUS
+  FROM AH_USE_LOG_BYMINUTE T
+ WHERE 1 = 0
\ No newline at end of file
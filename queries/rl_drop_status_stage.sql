@@ -0,0 +1 @@
+DROP TEMPORARY TABLE IF EXISTS TMP_APPLIANCE_STATUS
\ No newline at end of file
@@ -0,0 +1,7 @@
+INSERT INTO TMP_APPLIANCE_STATUS (
+       GATEWAY_ID
+     , DEVICE_ID
+     , COLLECT_DATE
+     , COLLECT_TIME
+     , APPLIANCE_STATUS
+) VALUES (%(gateway_id)s, %(device_id)s, %(collect_date)s, %(collect_time)s, %(appliance_status)s)
\ No newline at end of file
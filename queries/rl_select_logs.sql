@@ -0,0 +1,16 @@
+SELECT
+       T.GATEWAY_ID     AS gateway_id
+     , T.DEVICE_ID      AS device_id
+     , T.COLLECT_DATE   AS collect_date
+     , T.COLLECT_TIME   AS collect_time
+     , T.ENERGY_DIFF    AS energy_diff
+     , T.POWER          AS power
+  FROM AH_USE_LOG_BYMINUTE T
+ WHERE 1 = 1
+   AND T.GATEWAY_ID   = %(gateway_id)s
+   AND T.DEVICE_ID    IN %(device_ids)s
+   AND T.COLLECT_DATE BETWEEN %(start_date)s AND %(end_date)s
+ ORDER BY
+       T.DEVICE_ID
+     , T.COLLECT_DATE
+     , T.COLLECT_TIME
\ No newline at end of file
@@ -0,0 +1,7 @@
+UPDATE AH_USE_LOG_BYMINUTE
+   SET APPLIANCE_STATUS = %(appliance_status)s
+ WHERE 1 = 1
+   AND GATEWAY_ID   = %(gateway_id)s
+   AND DEVICE_ID    = %(device_id)s
+   AND COLLECT_DATE = %(collect_date)s
+   AND COLLECT_TIME = %(collect_time)s
\ No newline at end of file
@@ -0,0 +1,7 @@
+UPDATE AH_USE_LOG_BYMINUTE T
+ INNER JOIN TMP_APPLIANCE_STATUS S
+    ON ( T.GATEWAY_ID   = S.GATEWAY_ID
+     AND T.DEVICE_ID    = S.DEVICE_ID
+     AND T.COLLECT_DATE = S.COLLECT_DATE
+     AND T.COLLECT_TIME = S.COLLECT_TIME )
+   SET T.APPLIANCE_STATUS = S.APPLIANCE_STATUS
\ No newline at end of file
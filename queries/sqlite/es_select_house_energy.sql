@@ -0,0 +1,19 @@
+SELECT
+       S.HOUSE_NO            AS house_no
+     , T.COLLECT_DATE        AS collect_date
+     , (CAST(SUBSTR(T.COLLECT_TIME, 1, 2) AS INTEGER) * 60
+        + CAST(SUBSTR(T.COLLECT_TIME, 3, 2) AS INTEGER)) / %(slot_minutes)s AS slot
+     , SUM(T.ENERGY_DIFF)    AS energy
+     , SUM(CASE WHEN (CAST(SUBSTR(T.COLLECT_TIME, 1, 2) AS INTEGER) * 60
+                      + CAST(SUBSTR(T.COLLECT_TIME, 3, 2) AS INTEGER)) %% %(slot_minutes)s = 0
+                THEN T.ENERGY_DIFF END) AS boundary
+  FROM AH_USE_LOG_BYMINUTE T
+ INNER JOIN AH_GATEWAY_INSTALL S
+    ON (S.GATEWAY_ID = T.GATEWAY_ID)
+ WHERE 1 = 1
+   AND T.COLLECT_DATE BETWEEN %(start_date)s AND %(end_date)s
+ GROUP BY
+       S.HOUSE_NO
+     , T.COLLECT_DATE
+     , (CAST(SUBSTR(T.COLLECT_TIME, 1, 2) AS INTEGER) * 60
+        + CAST(SUBSTR(T.COLLECT_TIME, 3, 2) AS INTEGER)) / %(slot_minutes)s
\ No newline at end of file
@@ -0,0 +1 @@
+DROP TABLE IF EXISTS temp.TMP_APPLIANCE_STATUS
\ No newline at end of file
@@ -0,0 +1,8 @@
+UPDATE AH_USE_LOG_BYMINUTE AS T
+   SET APPLIANCE_STATUS = S.APPLIANCE_STATUS
+  FROM TMP_APPLIANCE_STATUS S
+ WHERE 1 = 1
+   AND T.GATEWAY_ID   = S.GATEWAY_ID
+   AND T.DEVICE_ID    = S.DEVICE_ID
+   AND T.COLLECT_DATE = S.COLLECT_DATE
+   AND T.COLLECT_TIME = S.COLLECT_TIME
\ No newline at end of file
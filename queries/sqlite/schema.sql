@@ -0,0 +1,64 @@
+CREATE TABLE IF NOT EXISTS AH_GATEWAY_INSTALL (
+       GATEWAY_ID        TEXT    NOT NULL PRIMARY KEY
+     , HOUSE_NO          TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS IX_GATEWAY_INSTALL_HOUSE ON AH_GATEWAY_INSTALL (HOUSE_NO);
+
+CREATE TABLE IF NOT EXISTS AH_DEVICE (
+       DEVICE_ID         TEXT    NOT NULL PRIMARY KEY
+     , DEVICE_NAME       TEXT
+     , FLAG_USE_AI       TEXT    NOT NULL DEFAULT 'Y'
+);
+
+CREATE TABLE IF NOT EXISTS AH_DEVICE_INSTALL (
+       GATEWAY_ID        TEXT    NOT NULL
+     , DEVICE_ID         TEXT    NOT NULL
+     , PRIMARY KEY (GATEWAY_ID, DEVICE_ID)
+);
+CREATE INDEX IF NOT EXISTS IX_DEVICE_INSTALL_DEVICE ON AH_DEVICE_INSTALL (DEVICE_ID);
+
+CREATE TABLE IF NOT EXISTS AH_DEVICE_MODEL (
+       DEVICE_ID         TEXT    NOT NULL
+     , ALWAYS_ON         INTEGER
+);
+CREATE INDEX IF NOT EXISTS IX_DEVICE_MODEL_DEVICE ON AH_DEVICE_MODEL (DEVICE_ID);
+
+CREATE TABLE IF NOT EXISTS AH_USE_LOG_BYMINUTE (
+       GATEWAY_ID        TEXT    NOT NULL
+     , DEVICE_ID         TEXT    NOT NULL
+     , COLLECT_DATE      TEXT    NOT NULL
+     , COLLECT_TIME      TEXT    NOT NULL
+     , ENERGY            REAL
+     , ENERGY_DIFF       REAL
+     , POWER             REAL
+     , ONOFF             INTEGER
+     , APPLIANCE_STATUS  INTEGER
+     , PRIMARY KEY (GATEWAY_ID, DEVICE_ID, COLLECT_DATE, COLLECT_TIME)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS IX_USE_LOG_BYMINUTE_DEVICE ON AH_USE_LOG_BYMINUTE (DEVICE_ID, COLLECT_DATE);
+
+CREATE TABLE IF NOT EXISTS AH_LOG_SOCKET (
+       GATEWAY_ID        TEXT    NOT NULL
+     , DEVICE_ID         TEXT    NOT NULL
+     , COLLECT_DATE      TEXT    NOT NULL
+     , COLLECT_TIME      TEXT    NOT NULL
+     , ONOFF             INTEGER
+     , POWER             REAL
+     , PRIMARY KEY (GATEWAY_ID, DEVICE_ID, COLLECT_DATE, COLLECT_TIME)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS AH_DEVICE_ENERGY_HISTORY (
+       GATEWAY_ID        TEXT    NOT NULL
+     , DEVICE_ID         TEXT    NOT NULL
+     , WAIT_ENERGY       REAL
+     , WAIT_TIME         REAL
+     , USE_ENERGY        REAL
+     , USE_TIME          REAL
+);
+CREATE INDEX IF NOT EXISTS IX_DEVICE_ENERGY_HISTORY_DEVICE ON AH_DEVICE_ENERGY_HISTORY (GATEWAY_ID, DEVICE_ID);
+
+CREATE TABLE IF NOT EXISTS AH_DR_REQUEST (
+       REQUEST_DR_NO     TEXT    NOT NULL PRIMARY KEY
+     , START_DATE        TEXT    NOT NULL
+     , END_DATE          TEXT    NOT NULL
+);
\ No newline at end of file
@@ -0,0 +1,177 @@
+"""csv 컬럼 저장소
+
+csv 파일을 조회키(device_id, house_no 등) 순으로 정렬하여 컬럼별 .npy 파일로
+한번만 변환해두고, 조회시 memory-map으로 해당 키의 구간만 읽는다.
+원본 csv가 변경되면(수정시각, 크기) 자동으로 다시 변환한다.
+
+    저장 구조:
+        ./datas/.columnar/{csv 파일}/{정렬키}/{수정시각}_{크기}/
+            meta.json      : 컬럼 목록, 키별 시작/종료 위치
+            {컬럼명}.npy   : 컬럼 데이터
+"""
+import json
+import os
+import shutil
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = "./datas/.columnar"
+
+
+class ColumnarTable:
+    """조회키로 정렬된 csv 컬럼 저장소
+
+    Args:
+        csv_path (str): 원본 csv 파일 경로
+        key_col (str): 조회키 컬럼명
+        sort_col (str, optional): 키 내에서의 정렬 컬럼명. Defaults to None.
+            None이면 키 내에서는 csv 파일의 순서를 유지한다.
+        cache_dir (str, optional): 변환 파일 저장 경로. Defaults to CACHE_DIR.
+    """
+
+    def __init__(self, csv_path, key_col, sort_col=None, cache_dir=CACHE_DIR):
+        self.csv_path = csv_path
+        self.key_col = key_col
+        self.sort_col = sort_col
+        self.base_dir = os.path.join(
+            cache_dir,
+            os.path.normpath(csv_path).lstrip(os.sep).replace(os.sep, "_"),
+            key_col + (f"-{sort_col}" if sort_col else ""),
+        )
+
+        self._lock = threading.Lock()
+        self._signature = None
+        self._columns = None
+        self._index = None
+        self._arrays = None
+
+    def _source_signature(self):
+        stat = os.stat(self.csv_path)
+        return f"{stat.st_mtime_ns}_{stat.st_size}"
+
+    def _build(self, target_dir):
+        """csv를 정렬하여 컬럼별 .npy 파일로 변환"""
+        df = pd.read_csv(self.csv_path)
+        df[self.key_col] = df[self.key_col].astype(str)
+
+        sort_cols = [self.key_col] + ([self.sort_col] if self.sort_col else [])
+        df = df.sort_values(sort_cols, kind="mergesort").reset_index(drop=True)
+
+        tmp_dir = f"{target_dir}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(tmp_dir)
+
+        columns = []
+        for i, col in enumerate(df.columns):
+            values = df[col].to_numpy()
+            # object 타입은 memory-map이 되지 않으므로 고정길이 문자열로 저장
+            if values.dtype == object:
+                values = values.astype(str)
+            np.save(os.path.join(tmp_dir, f"{i}.npy"), values)
+            columns.append(col)
+
+        keys, starts = np.unique(df[self.key_col].to_numpy(), return_index=True)
+        stops = np.append(starts[1:], len(df)) if len(keys) else starts
+        # np.unique 결과는 키 정렬순이며 데이터도 키로 정렬되어 있음
+        index = {
+            key: [int(start), int(stop)]
+            for key, start, stop in zip(keys.tolist(), starts, stops)
+        }
+
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"columns": columns, "index": index}, f)
+
+        try:
+            os.rename(tmp_dir, target_dir)
+        except OSError:
+            # 다른 프로세스가 먼저 변환한 경우
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _cleanup(self, signature):
+        """이전 버전의 변환 파일 삭제"""
+        for name in os.listdir(self.base_dir):
+            if name != signature and not name.endswith(".tmp"):
+                shutil.rmtree(os.path.join(self.base_dir, name), ignore_errors=True)
+
+    def _refresh(self):
+        """원본 csv가 변경되었으면 다시 변환하고 memory-map으로 연결"""
+        signature = self._source_signature()
+
+        if signature == self._signature:
+            return
+
+        target_dir = os.path.join(self.base_dir, signature)
+
+        if not os.path.exists(target_dir):
+            os.makedirs(self.base_dir, exist_ok=True)
+            self._build(target_dir)
+            self._cleanup(signature)
+
+        with open(os.path.join(target_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        self._columns = meta["columns"]
+        self._index = meta["index"]
+        self._arrays = [
+            np.load(os.path.join(target_dir, f"{i}.npy"), mmap_mode="r")
+            for i in range(len(self._columns))
+        ]
+        self._signature = signature
+
+    def select(self, key, start=None, end=None, include_end=True):
+        """키에 해당하는 구간만 조회
+
+        Args:
+            key (str): 조회키
+            start (optional): 정렬 컬럼의 시작값(이상). Defaults to None.
+            end (optional): 정렬 컬럼의 종료값. Defaults to None.
+            include_end (bool, optional): 종료값 포함여부. Defaults to True.
+
+        Returns:
+            dataframe: 추출한 데이터
+        """
+        with self._lock:
+            self._refresh()
+            columns, index, arrays = self._columns, self._index, self._arrays
+
+        lo, hi = index.get(str(key), (0, 0))
+
+        if self.sort_col and (start is not None or end is not None):
+            sort_values = arrays[columns.index(self.sort_col)][lo:hi]
+            offset = lo
+            if start is not None:
+                lo = offset + np.searchsorted(sort_values, start, side="left")
+            if end is not None:
+                side = "right" if include_end else "left"
+                hi = offset + np.searchsorted(sort_values, end, side=side)
+
+        return pd.DataFrame(
+            {col: np.array(values[lo:hi]) for col, values in zip(columns, arrays)},
+            columns=columns,
+        )
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def get_table(csv_path, key_col, sort_col=None):
+    """프로세스 공용 컬럼 저장소
+
+    Args:
+        csv_path (str): 원본 csv 파일 경로
+        key_col (str): 조회키 컬럼명
+        sort_col (str, optional): 키 내에서의 정렬 컬럼명. Defaults to None.
+
+    Returns:
+        ColumnarTable: 컬럼 저장소
+    """
+    with _tables_lock:
+        table = _tables.get((csv_path, key_col, sort_col))
+        if table is None:
+            table = ColumnarTable(csv_path, key_col, sort_col)
+            _tables[(csv_path, key_col, sort_col)] = table
+
+    return table
@@ -0,0 +1,454 @@
+"""데이터 조회 방식(data source)
+
+쿼리 파일(queries/*.sql)을 실행하는 방식을 DB 종류별로 나눈다.
+settings.load_datas 등은 settings.get_data_source()의 data source를 사용한다.
+
+    MySQLDataSource : 운영 DB. settings의 연결 pool을 사용한다.
+    SQLiteDataSource: 로컬 파일 DB. 스키마(queries/sqlite/schema.sql)로 만든 DB에
+                      합성 데이터(benchmarks.synthetic_data)를 적재하여
+                      한 대의 PC에서 벤치마크, 부하 테스트를 할 때 사용한다.
+
+SQLite는 queries/sqlite/{쿼리 파일}이 있으면 그 파일을(INTERVAL 등 MySQL 전용 문법),
+없으면 공통 쿼리 파일의 파라미터 형식만 바꾸어 실행한다.
+쿼리에서 사용하는 MySQL 함수(STR_TO_DATE, DATE_FORMAT, DAYOFWEEK 등)는
+같은 이름의 함수로 등록한다. DATE_ADD, TIMESTAMPDIFF의 단위는 문자열로 쓴다.
+(ex. DATE_ADD(일시, -28, 'DAY'))
+"""
+import calendar
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import pandas as pd
+import pymysql
+
+QUERY_DIR = "./queries"
+SQLITE_QUERY_DIR = "./queries/sqlite"
+SQLITE_SCHEMA = "schema.sql"
+
+
+def load_query(query_file, query_dir=QUERY_DIR):
+    """쿼리 파일 조회
+
+    Args:
+        query_file (str): sql이 저장된 파일명.
+        query_dir (str, optional): 쿼리 파일 경로. Defaults to QUERY_DIR.
+
+    Returns:
+        str: sql
+    """
+    with open(os.path.join(query_dir, query_file), "r") as query:
+        return query.read()
+
+
+class MySQLDataSource:
+    """MySQL data source
+
+    Args:
+        get_pool (function): DB 연결 pool을 반환하는 함수 (settings.get_pool)
+    """
+
+    name = "mysql"
+    # 조회를 동시에 실행하면 DB 서버에서 병렬로 처리된다 (settings.gather)
+    concurrent_reads = True
+
+    def __init__(self, get_pool):
+        self.get_pool = get_pool
+
+    @contextmanager
+    def connection(self):
+        """pool의 연결. 연결 오류가 발생한 연결은 반환하지 않고 종료한다.
+
+        오류는 출력만 하고 호출자에게 전달하지 않는다(기존 open_db_connection 동작).
+
+        Yields:
+            Object: DB Connection Object
+        """
+        pool = self.get_pool()
+        conn = pool.acquire()
+        discard = False
+        try:
+            yield conn
+        except Exception as err:
+            print(err)
+            discard = isinstance(
+                err, (pymysql.OperationalError, pymysql.InterfaceError)
+            )
+        finally:
+            pool.release(conn, discard=discard)
+
+    def read(self, query_file, params):
+        """쿼리 실행 결과 조회
+
+        Returns:
+            dataframe: 추출한 데이터
+        """
+        sql = load_query(query_file)
+
+        with self.connection() as conn:
+            df = pd.read_sql(sql=sql, con=conn, params=params)
+
+        return df
+
+    def stream(self, query_file, params, chunksize):
+        """쿼리 결과를 chunksize 행씩 조회 (SSCursor, settings.stream_rows 참고)
+
+        Yields:
+            list: 컬럼명 리스트
+            list: 행(tuple) 리스트
+        """
+        sql = load_query(query_file)
+
+        pool = self.get_pool()
+        conn = pool.acquire()
+        discard = True
+        try:
+            with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+                cursor.execute(sql, params)
+                columns = [desc[0] for desc in cursor.description]
+
+                while True:
+                    rows = cursor.fetchmany(chunksize)
+                    if not rows:
+                        break
+                    yield columns, rows
+
+                discard = False
+        finally:
+            pool.release(conn, discard=discard)
+
+    @contextmanager
+    def transaction(self):
+        """트랜잭션. 정상 종료시 commit하고 오류는 호출자에게 전달한다.
+
+        Yields:
+            Transaction: 쿼리 파일 실행 객체
+        """
+        pool = self.get_pool()
+        conn = pool.acquire()
+        discard = False
+        try:
+            with conn.cursor() as cursor:
+                yield Transaction(cursor, load_query)
+            conn.commit()
+        except Exception as err:
+            discard = isinstance(
+                err, (pymysql.OperationalError, pymysql.InterfaceError)
+            )
+            raise
+        finally:
+            pool.release(conn, discard=discard)
+
+
+class SQLiteDataSource:
+    """SQLite data source
+
+    연결은 thread별로 만든다. fork된 프로세스에서는 부모의 연결을 사용하지 않는다.
+
+    Args:
+        path (str): DB 파일 경로
+    """
+
+    name = "sqlite"
+    # 쿼리의 MySQL 함수를 Python 함수로 실행하므로(GIL) 동시에 실행해도 빨라지지 않는다
+    concurrent_reads = False
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def connect(self):
+        """MySQL 함수를 등록한 새 연결
+
+        Returns:
+            Object: sqlite3 Connection Object
+        """
+        conn = sqlite3.connect(self.path, timeout=30)
+        for name, n_args, func, deterministic in _FUNCTIONS:
+            conn.create_function(name, n_args, func, deterministic=deterministic)
+
+        return conn
+
+    def _connection(self):
+        conn, pid = getattr(self._local, "conn", (None, None))
+
+        if conn is None or pid != os.getpid():
+            conn = self.connect()
+            self._local.conn = (conn, os.getpid())
+
+        return conn
+
+    def create_schema(self):
+        """스키마(SQLITE_SCHEMA)의 테이블, 인덱스 생성"""
+        self._connection().executescript(
+            load_query(SQLITE_SCHEMA, query_dir=SQLITE_QUERY_DIR)
+        )
+
+    def read(self, query_file, params):
+        """쿼리 실행 결과 조회
+
+        Returns:
+            dataframe: 추출한 데이터
+        """
+        sql, params = to_sqlite(load_sqlite_query(query_file), params)
+
+        return pd.read_sql(sql=sql, con=self._connection(), params=params)
+
+    def stream(self, query_file, params, chunksize):
+        """쿼리 결과를 chunksize 행씩 조회
+
+        Yields:
+            list: 컬럼명 리스트
+            list: 행(tuple) 리스트
+        """
+        sql, params = to_sqlite(load_sqlite_query(query_file), params)
+
+        cursor = self._connection().execute(sql, params)
+        try:
+            columns = [desc[0] for desc in cursor.description]
+
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                yield columns, rows
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def transaction(self):
+        """트랜잭션. 정상 종료시 commit, 오류시 rollback 후 호출자에게 전달한다.
+
+        Yields:
+            Transaction: 쿼리 파일 실행 객체
+        """
+        conn = self._connection()
+        try:
+            yield Transaction(_SQLiteCursor(conn.cursor()), load_sqlite_query)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+class Transaction:
+    """트랜잭션 내에서 쿼리 파일 실행
+
+    Args:
+        cursor (Object): DB Cursor Object
+        load (function): 쿼리 파일 조회 함수
+    """
+
+    def __init__(self, cursor, load):
+        self.cursor = cursor
+        self.load = load
+
+    def execute(self, query_file, params=None):
+        """쿼리 파일 실행
+
+        Returns:
+            int: 처리 건수
+        """
+        return self.cursor.execute(self.load(query_file), params)
+
+    def executemany(self, query_file, seq_params):
+        """같은 쿼리 파일을 여러 파라미터로 실행 (INSERT는 여러 행을 한번에 저장)
+
+        Returns:
+            int: 처리 건수
+        """
+        return self.cursor.executemany(self.load(query_file), seq_params)
+
+
+class _SQLiteCursor:
+    """pymysql 형식의 쿼리, 파라미터를 받는 sqlite3 cursor"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, sql, params=None):
+        sql, params = to_sqlite(sql, params)
+
+        return self.cursor.execute(sql, params).rowcount
+
+    def executemany(self, sql, seq_params):
+        sql, _ = to_sqlite(sql, None)
+
+        return self.cursor.executemany(sql, seq_params).rowcount
+
+
+@lru_cache(maxsize=None)
+def load_sqlite_query(query_file):
+    """SQLite용 쿼리 파일 조회 (없으면 공통 쿼리 파일)
+
+    Returns:
+        str: sql
+    """
+    if os.path.exists(os.path.join(SQLITE_QUERY_DIR, query_file)):
+        return load_query(query_file, query_dir=SQLITE_QUERY_DIR)
+
+    return load_query(query_file)
+
+
+_PARAM = re.compile(r"%\((\w+)\)s")
+
+
+def to_sqlite(sql, params):
+    """pymysql 형식(%(name)s)의 쿼리, 파라미터를 sqlite3 형식(:name)으로 변환
+
+    tuple, list 파라미터(IN 조건)는 값마다 파라미터를 만든다.
+
+    Args:
+        sql (str): pymysql 형식의 sql
+        params (dict): 파라미터
+
+    Returns:
+        str: sqlite3 형식의 sql
+        dictionary: 파라미터
+    """
+    params = params or {}
+    converted = {}
+
+    def replace(match):
+        name = match.group(1)
+        value = params.get(name)
+
+        if isinstance(value, (tuple, list)):
+            names = [f"{name}_{i}" for i in range(len(value))]
+            converted.update(zip(names, value))
+            return "(" + ", ".join(f":{n}" for n in names) + ")" if names else "(NULL)"
+
+        converted[name] = value
+        return f":{name}"
+
+    return _PARAM.sub(replace, sql).replace("%%", "%"), converted
+
+
+# MySQL 날짜 형식 -> Python 날짜 형식
+_FORMATS = {"%i": "%M", "%s": "%S", "%H": "%H", "%Y": "%Y", "%m": "%m", "%d": "%d"}
+_FORMAT = re.compile("|".join(_FORMATS))
+
+
+@lru_cache(maxsize=4096)
+def _parse(value):
+    """일자/일시 문자열(YYYYMMDD, YYYYMMDDHHMM, ISO 형식)을 datetime으로 변환
+
+    Returns:
+        datetime: 일시
+        bool: 시각 포함여부
+    """
+    value = str(value)
+
+    if value.isdigit():
+        if len(value) == 8:
+            return datetime.strptime(value, "%Y%m%d"), False
+        return datetime.strptime(value, "%Y%m%d%H%M"), True
+
+    return datetime.fromisoformat(value), len(value) > 10
+
+
+def _format(dt, has_time):
+    return dt.strftime("%Y-%m-%d %H:%M:%S" if has_time else "%Y-%m-%d")
+
+
+def _str_to_date(value, fmt):
+    if value is None:
+        return None
+
+    value = str(value)
+    # 분단위 로그의 일시(COLLECT_DATE + COLLECT_TIME)는 자주 사용하므로 바로 변환
+    if fmt == "%Y%m%d%H%i" and len(value) == 12:
+        return f"{value[:4]}-{value[4:6]}-{value[6:8]} {value[8:10]}:{value[10:]}:00"
+
+    dt = datetime.strptime(value, _FORMAT.sub(lambda m: _FORMATS[m.group()], fmt))
+    return _format(dt, any(f in fmt for f in ("%H", "%i", "%s")))
+
+
+def _date_format(value, fmt):
+    if value is None:
+        return None
+
+    dt, _ = _parse(value)
+    return dt.strftime(_FORMAT.sub(lambda m: _FORMATS[m.group()], fmt))
+
+
+def _dayofweek(value):
+    if value is None:
+        return None
+
+    # MySQL DAYOFWEEK: 1(일요일) ~ 7(토요일)
+    return (_parse(value)[0].weekday() + 1) % 7 + 1
+
+
+def _dayname(value):
+    if value is None:
+        return None
+
+    return calendar.day_name[_parse(value)[0].weekday()]
+
+
+def _date_add(value, amount, unit):
+    if value is None:
+        return None
+
+    dt, has_time = _parse(value)
+    unit = unit.upper()
+
+    if unit == "MONTH":
+        month = dt.month - 1 + int(amount)
+        year, month = dt.year + month // 12, month % 12 + 1
+        # 말일을 넘으면 해당 월의 말일 (MySQL과 같음)
+        day = min(dt.day, calendar.monthrange(year, month)[1])
+        return _format(dt.replace(year=year, month=month, day=day), has_time)
+
+    delta = timedelta(**{unit.lower() + "s": int(amount)})
+    return _format(dt + delta, has_time or unit in ("HOUR", "MINUTE", "SECOND"))
+
+
+def _datediff(end, start):
+    if end is None or start is None:
+        return None
+
+    return (_parse(end)[0].date() - _parse(start)[0].date()).days
+
+
+def _timestampdiff(unit, start, end):
+    if start is None or end is None:
+        return None
+
+    seconds = (_parse(end)[0] - _parse(start)[0]).total_seconds()
+    return int(seconds // {"SECOND": 1, "MINUTE": 60, "HOUR": 3600}[unit.upper()])
+
+
+def _concat(*values):
+    if any(value is None for value in values):
+        return None
+
+    return "".join(str(value) for value in values)
+
+
+def _ceil(value):
+    if value is None:
+        return None
+
+    return -int(-value // 1)
+
+
+# (함수명, 인자 수, 함수, deterministic)
+_FUNCTIONS = [
+    ("STR_TO_DATE", 2, _str_to_date, True),
+    ("DATE_FORMAT", 2, _date_format, True),
+    ("DAYOFWEEK", 1, _dayofweek, True),
+    ("DAYNAME", 1, _dayname, True),
+    ("DATE_ADD", 3, _date_add, True),
+    ("DATEDIFF", 2, _datediff, True),
+    ("TIMESTAMPDIFF", 3, _timestampdiff, True),
+    ("CONCAT", -1, _concat, True),
+    ("CEIL", 1, _ceil, True),
+    ("IF", 3, lambda cond, a, b: a if cond else b, True),
+    ("NOW", 0, lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"), False),
+]
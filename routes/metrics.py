@@ -0,0 +1,264 @@
+"""단계별 처리시간 측정
+
+요청(라우트)별 처리시간과 요청 안의 단계(DB 조회, csv 조회, 모델 로드, sliding window,
+예측, JSON 변환 등)별 처리시간을 히스토그램으로 집계하고 예외 종류별 오류 건수를 센다.
+집계 결과는 Prometheus text format(/metrics)으로 제공한다.
+
+현재 요청은 스레드별로 관리하므로 common 모듈은 Flask와 관계없이 span만 사용한다.
+요청 밖(학습작업 스레드 등)의 span은 scope로 지정한 이름, 없으면 NO_ROUTE로 집계한다.
+집계는 프로세스별이며 재시작하면 초기화된다.
+
+    usage example:
+        with metrics.span("load_datas", query_file):
+            ...
+
+        @metrics.timed("sliding_window")
+        def sliding_window_transform(...):
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 측정 사용여부
+ENABLED = os.environ.get("AIHEMS_METRICS", "1") != "0"
+# 히스토그램 구간(초)
+BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+# 요청 밖에서 측정한 span의 route
+NO_ROUTE = "none"
+# metric 이름 접두어
+PREFIX = "aihems"
+
+_lock = threading.Lock()
+_local = threading.local()
+
+# (route,) -> [구간별 건수, 합계, 건수]
+_requests = {}
+# (route, stage, detail) -> [구간별 건수, 합계, 건수]
+_stages = {}
+# (route, exception) -> 건수
+_errors = {}
+
+
+def _observe(histograms, key, seconds):
+    with _lock:
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+
+        histogram[0][bisect.bisect_left(BUCKETS, seconds)] += 1
+        histogram[1] += seconds
+        histogram[2] += 1
+
+
+def current_route():
+    """현재 스레드의 route (요청 밖이면 NO_ROUTE)"""
+    return getattr(_local, "route", None) or NO_ROUTE
+
+
+def begin(route):
+    """요청 시작 (현재 스레드의 route 지정)
+
+    Args:
+        route (str): route 이름 (ex. /label)
+    """
+    _local.route = route
+    _local.started = time.perf_counter()
+
+
+def end(error=None):
+    """요청 종료. 요청 처리시간과 오류를 집계하고 route를 해제한다.
+
+    Args:
+        error (Exception, optional): 처리되지 않은 오류. Defaults to None.
+    """
+    route = getattr(_local, "route", None)
+    if route is None:
+        return
+
+    if ENABLED:
+        _observe(_requests, (route,), time.perf_counter() - _local.started)
+        if error is not None:
+            count_error(error)
+
+    _local.route = None
+
+
+@contextmanager
+def scope(route):
+    """요청 밖의 작업을 route 이름으로 집계 (ex. job/status)
+
+    Args:
+        route (str): route 이름
+    """
+    previous = getattr(_local, "route", None), getattr(_local, "started", None)
+    begin(route)
+    error = None
+    try:
+        yield
+    except Exception as ex:
+        error = ex
+        raise
+    finally:
+        end(error)
+        _local.route, _local.started = previous
+
+
+@contextmanager
+def bind(route):
+    """다른 스레드의 route로 span을 집계 (요청 처리시간은 집계하지 않음)
+
+    Args:
+        route (str): route 이름 (current_route 반환값)
+    """
+    previous = getattr(_local, "route", None)
+    _local.route = None if route == NO_ROUTE else route
+    try:
+        yield
+    finally:
+        _local.route = previous
+
+
+@contextmanager
+def span(stage, detail=""):
+    """단계 처리시간 측정
+
+    Args:
+        stage (str): 단계 이름 (ex. load_datas, predict)
+        detail (str, optional): 단계 상세 (ex. 쿼리 파일명). Defaults to "".
+    """
+    if not ENABLED:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _observe(
+            _stages,
+            (current_route(), stage, detail),
+            time.perf_counter() - started,
+        )
+
+
+def timed(stage, detail=""):
+    """함수 처리시간을 span으로 측정하는 decorator
+
+    Args:
+        stage (str): 단계 이름
+        detail (str, optional): 단계 상세. Defaults to "".
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage, detail):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count_error(error, route=None):
+    """예외 종류별 오류 건수 집계
+
+    Args:
+        error (Exception): 오류
+        route (str, optional): route 이름. Defaults to None(현재 route).
+    """
+    if not ENABLED:
+        return
+
+    key = (route or current_route(), type(error).__name__)
+    with _lock:
+        _errors[key] = _errors.get(key, 0) + 1
+
+
+def reset():
+    """집계 초기화"""
+    with _lock:
+        _requests.clear()
+        _stages.clear()
+        _errors.clear()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    labels = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}"
+
+
+def _histogram_lines(name, names, histograms):
+    lines = []
+    for key, (counts, total, count) in sorted(histograms.items()):
+        cumulative = 0
+        for bound, bucket in zip(BUCKETS + ("+Inf",), counts):
+            cumulative += bucket
+            le = f'le="{bound}"'
+            lines.append(f"{name}_bucket{_labels(names, key, le)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(names, key)} {total}")
+        lines.append(f"{name}_count{_labels(names, key)} {count}")
+
+    return lines
+
+
+def render():
+    """집계 결과를 Prometheus text format으로 반환
+
+    Returns:
+        str: metrics
+    """
+    with _lock:
+        requests = {key: (list(h[0]), h[1], h[2]) for key, h in _requests.items()}
+        stages = {key: (list(h[0]), h[1], h[2]) for key, h in _stages.items()}
+        errors = dict(_errors)
+
+    lines = [
+        f"# HELP {PREFIX}_request_duration_seconds 요청 처리시간",
+        f"# TYPE {PREFIX}_request_duration_seconds histogram",
+    ]
+    lines += _histogram_lines(
+        f"{PREFIX}_request_duration_seconds", ("route",), requests
+    )
+    lines += [
+        f"# HELP {PREFIX}_stage_duration_seconds 요청 단계별 처리시간",
+        f"# TYPE {PREFIX}_stage_duration_seconds histogram",
+    ]
+    lines += _histogram_lines(
+        f"{PREFIX}_stage_duration_seconds", ("route", "stage", "detail"), stages
+    )
+    lines += [
+        f"# HELP {PREFIX}_errors_total 예외 종류별 오류 건수",
+        f"# TYPE {PREFIX}_errors_total counter",
+    ]
+    lines += [
+        f"{PREFIX}_errors_total{_labels(('route', 'exception'), key)} {count}"
+        for key, count in sorted(errors.items())
+    ]
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,218 @@
+"""Database 연결 Pool
+
+요청마다 DB 연결을 새로 맺지 않도록 연결을 재사용한다.
+반환된 연결은 rollback 후 보관하고, 다시 사용할 때 연결상태(ping)와
+최대 사용시간을 확인한다.
+"""
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """대기시간 내에 연결을 얻지 못한 경우"""
+
+
+class ConnectionPool:
+    """Thread-safe DB 연결 Pool
+
+    Args:
+        connect (function): 새 연결을 생성하는 함수
+        min_size (int, optional): 최소 유지 연결 수. Defaults to 1.
+        max_size (int, optional): 최대 연결 수. Defaults to 10.
+        max_age (float, optional): 연결 최대 사용시간(초). Defaults to 3600.
+        acquire_timeout (float, optional): 연결 대기시간(초). Defaults to 10.
+    """
+
+    def __init__(
+        self, connect, min_size=1, max_size=10, max_age=3600, acquire_timeout=10
+    ):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_age = max_age
+        self.acquire_timeout = acquire_timeout
+
+        self._cond = threading.Condition()
+        # (연결, 생성시각)
+        self._idle = deque()
+        self._created_at = {}
+        self._size = 0
+
+        self._created = 0
+        self._closed = 0
+        self._acquired = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._timeouts = 0
+
+    def fill(self):
+        """최소 연결 수만큼 미리 연결"""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+
+            try:
+                conn = self._create()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+
+            self.release(conn)
+
+    def _create(self):
+        conn = self.connect()
+
+        with self._cond:
+            self._created_at[conn] = time.monotonic()
+            self._created += 1
+
+        return conn
+
+    def _close(self, conn):
+        """연결 종료. 호출전에 _size를 줄여야 한다."""
+        with self._cond:
+            self._created_at.pop(conn, None)
+            self._closed += 1
+            self._cond.notify()
+
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _expired(self, conn):
+        created_at = self._created_at.get(conn, 0)
+        return time.monotonic() - created_at > self.max_age
+
+    def acquire(self, timeout=None):
+        """연결 획득
+
+        Args:
+            timeout (float, optional): 대기시간(초). Defaults to acquire_timeout.
+
+        Raises:
+            PoolTimeout: 대기시간 내에 연결을 얻지 못한 경우
+
+        Returns:
+            Object: DB Connection Object
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            conn = None
+            create = False
+
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"connection pool exhausted ({self.max_size})"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    conn = self._idle.pop()
+                else:
+                    self._size += 1
+                    create = True
+
+            if create:
+                try:
+                    conn = self._create()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif self._expired(conn) or not self._alive(conn):
+                with self._cond:
+                    self._size -= 1
+                self._close(conn)
+                continue
+
+            wait_time = time.monotonic() - started
+
+            with self._cond:
+                self._acquired += 1
+                if waited:
+                    self._waits += 1
+                self._wait_time += wait_time
+                self._max_wait_time = max(self._max_wait_time, wait_time)
+
+            return conn
+
+    @staticmethod
+    def _alive(conn):
+        """연결상태 확인"""
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def release(self, conn, discard=False):
+        """연결 반환
+
+        진행중인 트랜잭션은 rollback하여 다음 사용시 이전 snapshot을 보지 않도록 한다.
+
+        Args:
+            conn (Object): DB Connection Object
+            discard (bool, optional): 연결 종료 여부. Defaults to False.
+        """
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        if discard or self._expired(conn):
+            with self._cond:
+                self._size -= 1
+            self._close(conn)
+            return
+
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def close(self):
+        """보관중인 연결을 모두 종료"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self):
+        """Pool 현황
+
+        Returns:
+            dictionary: 연결 수, 사용중 연결 수, 대기시간 등
+        """
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+                "created": self._created,
+                "closed": self._closed,
+                "acquired": self._acquired,
+                "waits": self._waits,
+                "wait_time_total": self._wait_time,
+                "wait_time_max": self._max_wait_time,
+                "timeouts": self._timeouts,
+            }
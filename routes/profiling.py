@@ -0,0 +1,236 @@
+"""요청 단위 프로파일링
+
+요청 header(HEADER)가 있거나 SAMPLE_RATE 확률로 선택된 요청을 cProfile로 실행하고
+동시에 SAMPLE_INTERVAL 간격으로 요청 스레드의 호출 stack을 수집한다.
+결과는 PROFILE_DIR에 route, 대상(디바이스ID, 가구식별번호 등), 처리시간을 붙여 저장한다.
+
+    - {이름}.pstats: cProfile 결과 (python -m pstats, snakeviz 등으로 조회)
+    - {이름}.collapsed: collapsed stack (flamegraph.pl, speedscope 등으로 조회)
+    - {이름}.json: route, 대상, 처리시간 등 메타정보
+
+cProfile은 한번에 하나만 실행할 수 있으므로 다른 요청을 프로파일링하는 중이면
+건너뛴다. 저장된 프로파일은 MAX_PROFILES개, MAX_BYTES를 넘으면 오래된 것부터 삭제한다.
+header 요청은 외부에서 임의로 프로파일링을 실행할 수 있으므로 AIHEMS_PROFILE_HEADER=1로
+설정한 경우에만 허용한다(기본 미사용). header와 sampling을 모두 사용하지 않으면
+(ENABLED False) Flask hook을 등록하지 않는다.
+
+    usage example:
+        root> set AIHEMS_PROFILE_HEADER=1
+        root> set AIHEMS_PROFILE_SAMPLE_RATE=0.01
+        root> python api.py
+        curl -X POST -H "X-AIHEMS-Profile: 1" -H "Content-Type: application/json"
+             -d "{\"house_no\":\"20180810000008\",\"date\":\"20191201\"}"
+             http://127.0.0.1:5000/elec
+"""
+import cProfile
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+# 프로파일링 요청 header
+HEADER = "X-AIHEMS-Profile"
+# header로 프로파일링 요청 허용여부 (기본 미사용)
+HEADER_ENABLED = os.environ.get("AIHEMS_PROFILE_HEADER", "0") == "1"
+# 임의로 선택하여 프로파일링할 요청 비율 (0: 미사용)
+SAMPLE_RATE = float(os.environ.get("AIHEMS_PROFILE_SAMPLE_RATE", "0"))
+# 프로파일링 사용여부
+ENABLED = HEADER_ENABLED or SAMPLE_RATE > 0
+# 저장 경로
+PROFILE_DIR = os.environ.get("AIHEMS_PROFILE_DIR", "./datas/profiles")
+# 호출 stack 수집 간격(초)
+SAMPLE_INTERVAL = 0.005
+# 최대 저장 프로파일 수
+MAX_PROFILES = 100
+# 최대 저장 크기(bytes)
+MAX_BYTES = 200 * 1024 * 1024
+
+EXTENSIONS = (".pstats", ".collapsed", ".json")
+
+_lock = threading.Lock()
+
+
+def requested(header_value):
+    """요청을 프로파일링할지 여부
+
+    Args:
+        header_value (str): HEADER 값 (없으면 None)
+
+    Returns:
+        str: 선택 사유 (header, sample), 프로파일링하지 않으면 None
+    """
+    if HEADER_ENABLED and header_value and header_value != "0":
+        return "header"
+    if SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE:
+        return "sample"
+
+    return None
+
+
+class StackSampler(threading.Thread):
+    """대상 스레드의 호출 stack을 주기적으로 수집
+
+    Args:
+        thread_id (int): 대상 스레드 ID
+        interval (float, optional): 수집 간격(초). Defaults to SAMPLE_INTERVAL.
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                    f":{code.co_firstlineno})".replace(";", ",")
+                )
+                frame = frame.f_back
+
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def collapsed(self):
+        """collapsed stack 형식 ("a;b;c 수집횟수" 줄 단위)"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class Profile:
+    """요청 하나의 프로파일
+
+    Args:
+        reason (str): 선택 사유 (header, sample)
+    """
+
+    def __init__(self, reason):
+        self.reason = reason
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self._profiler = cProfile.Profile()
+        self._sampler = StackSampler(threading.get_ident())
+        self._sampler.start()
+        self._profiler.enable()
+
+    def stop(self):
+        """프로파일링 종료
+
+        Returns:
+            float: 처리시간(초)
+        """
+        self._profiler.disable()
+        self._sampler.stop()
+        _lock.release()
+
+        return time.perf_counter() - self._started
+
+    def save(self, route, target, duration, profile_dir=PROFILE_DIR):
+        """프로파일 저장
+
+        Args:
+            route (str): route 이름 (ex. /elec)
+            target (str): 대상 (디바이스ID, 가구식별번호 등, 없으면 None)
+            duration (float): 처리시간(초)
+            profile_dir (str, optional): 저장 경로. Defaults to PROFILE_DIR.
+
+        Returns:
+            str: 저장된 프로파일 이름 (확장자 제외)
+        """
+        os.makedirs(profile_dir, exist_ok=True)
+        name = "_".join(
+            [
+                self.started_at.strftime("%Y%m%d%H%M%S%f"),
+                _slug(route),
+                _slug(target or "-"),
+                f"{duration * 1000:.0f}ms",
+            ]
+        )
+        base = os.path.join(profile_dir, name)
+
+        self._profiler.dump_stats(base + ".pstats")
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            f.write(self._sampler.collapsed())
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "route": route,
+                    "target": target,
+                    "duration": duration,
+                    "reason": self.reason,
+                    "started_at": self.started_at.strftime("%Y-%m-%d %H:%M:%S.%f"),
+                    "samples": sum(self._sampler.stacks.values()),
+                    "sample_interval": self._sampler.interval,
+                },
+                f,
+                ensure_ascii=False,
+            )
+
+        prune(profile_dir)
+
+        return name
+
+
+def start(reason):
+    """프로파일링 시작
+
+    Args:
+        reason (str): 선택 사유 (requested 반환값)
+
+    Returns:
+        Profile: 프로파일, 다른 요청을 프로파일링 중이면 None
+    """
+    if not _lock.acquire(blocking=False):
+        return None
+
+    try:
+        return Profile(reason)
+    except Exception:
+        _lock.release()
+        raise
+
+
+def prune(profile_dir=PROFILE_DIR, max_profiles=MAX_PROFILES, max_bytes=MAX_BYTES):
+    """오래된 프로파일 삭제 (최대 수, 최대 크기 초과분)
+
+    Args:
+        profile_dir (str, optional): 저장 경로. Defaults to PROFILE_DIR.
+        max_profiles (int, optional): 최대 프로파일 수. Defaults to MAX_PROFILES.
+        max_bytes (int, optional): 최대 저장 크기. Defaults to MAX_BYTES.
+    """
+    profiles = {}
+    for entry in os.scandir(profile_dir):
+        base, ext = os.path.splitext(entry.name)
+        if ext in EXTENSIONS:
+            profiles[base] = profiles.get(base, 0) + entry.stat().st_size
+
+    # 이름이 시작일시로 시작하므로 이름순이 생성순
+    names = sorted(profiles)
+    total = sum(profiles.values())
+
+    while names and (len(names) > max_profiles or total > max_bytes):
+        name = names.pop(0)
+        total -= profiles[name]
+        for ext in EXTENSIONS:
+            try:
+                os.remove(os.path.join(profile_dir, name + ext))
+            except FileNotFoundError:
+                pass
+
+
+def _slug(value):
+    return re.sub(r"[^0-9A-Za-z.-]+", "-", str(value)).strip("-") or "root"
@@ -1,7 +1,14 @@
-from contextlib import contextmanager
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pymysql
 import pandas as pd
 
+from routes.pool import ConnectionPool
+from routes import columnar, datasource, metrics
+
 # db 연결 정보
 HOST = "aihems-service-db.cnz3sewvscki.ap-northeast-2.rds.amazonaws.com"
 DB = "aihems_api_db"
@@ -10,23 +17,134 @@ USER = "aihems"
 PASSWORD = "#cslee1234"
 CHARSET = "utf8"
 
+# db 연결 pool 설정
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = 10
+# 연결 최대 사용시간(초)
+POOL_MAX_AGE = 3600
+# 연결 대기시간(초)
+POOL_ACQUIRE_TIMEOUT = 10
+# 스트리밍 조회시 한번에 가져올 행 수
+STREAM_CHUNK_SIZE = 10000
+# 동시 조회(gather) 최대 thread 수 (프로세스 공용, POOL_MAX_SIZE 이하)
+FETCH_MAX_WORKERS = 8
+
+# 데이터 조회 방식: mysql(운영 DB), sqlite(로컬 DB, routes.datasource 참고)
+DATA_SOURCE = os.environ.get("AIHEMS_DATA_SOURCE", "mysql")
+SQLITE_PATH = os.environ.get("AIHEMS_SQLITE_PATH", "./datas/aihems.sqlite")
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+_data_source = None
+_data_source_lock = threading.Lock()
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_fetch_local = threading.local()
+
+
+def connect():
+    """Database 신규 연결
+
+    Returns:
+        Object: DB Connection Object
+    """
+    return pymysql.connect(
+        host=HOST, port=PORT, user=USER, passwd=PASSWORD, db=DB, charset=CHARSET
+    )
+
+
+def get_pool():
+    """프로세스 공용 DB 연결 pool
+
+    fork된 프로세스에서는 부모의 연결을 공유하지 않도록 새로 생성한다.
+
+    Returns:
+        ConnectionPool: DB 연결 pool
+    """
+    global _pool, _pool_pid
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ConnectionPool(
+                connect,
+                min_size=POOL_MIN_SIZE,
+                max_size=POOL_MAX_SIZE,
+                max_age=POOL_MAX_AGE,
+                acquire_timeout=POOL_ACQUIRE_TIMEOUT,
+            )
+            _pool_pid = os.getpid()
+            _pool.fill()
+
+    return _pool
+
+
+def pool_stats():
+    """DB 연결 pool 현황
+
+    Returns:
+        dictionary: 연결 수, 사용중 연결 수, 대기시간 등
+    """
+    return get_pool().stats()
+
+
+_mysql = datasource.MySQLDataSource(get_pool)
+
 
-@contextmanager
 def open_db_connection():
     """Database 연결
 
+    pool에서 연결을 가져오고 사용이 끝나면 pool에 반환한다.
+    연결 오류가 발생한 연결은 반환하지 않고 종료한다.
+
     Yields:
         Object: DB Connection Object
     """
-    conn = pymysql.connect(
-        host=HOST, port=PORT, user=USER, passwd=PASSWORD, db=DB, charset=CHARSET
-    )
-    try:
-        yield conn
-    except Exception as err:
-        print(err)
-    finally:
-        conn.close()
+    return _mysql.connection()
+
+
+def get_data_source():
+    """프로세스 공용 data source (DATA_SOURCE 설정)
+
+    Returns:
+        Object: MySQLDataSource 또는 SQLiteDataSource
+    """
+    global _data_source
+
+    with _data_source_lock:
+        if _data_source is None:
+            if DATA_SOURCE == "sqlite":
+                _data_source = datasource.SQLiteDataSource(SQLITE_PATH)
+            else:
+                _data_source = _mysql
+
+    return _data_source
+
+
+def set_data_source(source):
+    """data source 변경 (벤치마크 등에서 사용)
+
+    Args:
+        source (Object): MySQLDataSource 또는 SQLiteDataSource
+    """
+    global _data_source
+
+    with _data_source_lock:
+        _data_source = source
+
+
+def open_db_transaction():
+    """Database 트랜잭션
+
+    정상 종료시 commit한다. 오류가 발생하면 rollback 후 오류를 호출자에게 그대로 전달한다.
+
+    Yields:
+        Transaction: 쿼리 파일 실행 객체 (execute, executemany)
+    """
+    return get_data_source().transaction()
 
 
 def load_datas(query_file, params):
@@ -42,13 +160,131 @@ def load_datas(query_file, params):
     if not query_file:
         return None
 
-    with open("./queries/" + query_file, "r") as query:
-        sql = query.read()
+    with metrics.span("load_datas", query_file):
+        return get_data_source().read(query_file, params)
 
-    with open_db_connection() as conn:
-        df = pd.read_sql(sql=sql, con=conn, params=params)
 
-    return df
+def get_executor():
+    """프로세스 공용 동시 조회 thread pool
+
+    fork된 프로세스에서는 새로 생성한다.
+
+    Returns:
+        ThreadPoolExecutor: FETCH_MAX_WORKERS개 thread pool
+    """
+    global _executor, _executor_pid
+
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=FETCH_MAX_WORKERS, thread_name_prefix="fetch"
+            )
+            _executor_pid = os.getpid()
+
+    return _executor
+
+
+def gather(*calls):
+    """서로 독립적인 조회를 동시에 실행하고 모두 끝나면 결과를 반환
+
+    각 조회는 thread pool에서 pool의 연결을 따로 사용하므로 처리시간이
+    조회시간의 합에서 가장 긴 조회시간으로 줄어든다. 조회 중 span은
+    호출한 요청의 route로 집계한다. 동시 조회 안에서 다시 호출하거나
+    (thread pool이 모두 대기하지 않도록) data source가 동시 조회를 지원하지
+    않으면(concurrent_reads) 순서대로 실행한다.
+
+    Args:
+        *calls (function): 인자 없는 조회 함수
+
+    Returns:
+        list: 조회 결과 (calls 순서). 오류가 있으면 모두 끝난 후 첫 오류를 전달
+    """
+    if (
+        len(calls) < 2
+        or getattr(_fetch_local, "active", False)
+        or not get_data_source().concurrent_reads
+    ):
+        return [call() for call in calls]
+
+    route = metrics.current_route()
+
+    def run(call):
+        _fetch_local.active = True
+        try:
+            with metrics.bind(route):
+                return call()
+        finally:
+            _fetch_local.active = False
+
+    futures = [get_executor().submit(run, call) for call in calls]
+    errors = [future.exception() for future in futures]
+
+    for error in errors:
+        if error is not None:
+            raise error
+
+    return [future.result() for future in futures]
+
+
+def stream_rows(query_file, params, chunksize=STREAM_CHUNK_SIZE):
+    """쿼리 결과를 chunksize 행씩 조회 (서버측 cursor)
+
+    MySQL은 SSCursor를 사용하여 결과를 클라이언트에 모두 받아두지 않고 읽는 만큼만
+    가져오므로 조회 건수와 관계없이 메모리 사용량이 chunksize 행으로 제한된다.
+    결과를 끝까지 읽지 않고 중단하면 남은 결과를 받지 않도록 연결을 종료한다.
+
+    Args:
+        query_file (str): sql이 저장된 파일명.
+        params (dict): sql에 들어갈 파라미터.
+        chunksize (int, optional): 한번에 가져올 행 수. Defaults to STREAM_CHUNK_SIZE.
+
+    Yields:
+        list: 컬럼명 리스트
+        list: 행(tuple) 리스트
+    """
+    yield from get_data_source().stream(query_file, params, chunksize)
+
+
+def load_arrays(query_file, params, dtypes, chunksize=STREAM_CHUNK_SIZE):
+    """쿼리 결과를 컬럼별 numpy 배열로 조회
+
+    stream_rows로 chunksize 행씩 읽어 타입이 지정된 배열에 바로 채운다.
+    DataFrame이나 전체 행의 Python 객체를 만들지 않으며, 배열이 부족하면 2배씩 늘리고
+    마지막에 조회 건수만큼 줄인다.
+
+    Args:
+        query_file (str): sql이 저장된 파일명.
+        params (dict): sql에 들어갈 파라미터.
+        dtypes (dict): 컬럼명별 배열 타입 (ex. {"power": np.float64})
+                float 컬럼의 NULL은 nan으로 저장된다.
+        chunksize (int, optional): 한번에 가져올 행 수. Defaults to STREAM_CHUNK_SIZE.
+
+    Returns:
+        dictionary: 컬럼명별 배열
+    """
+    capacity = chunksize
+    arrays = {col: np.empty(capacity, dtype=dtype) for col, dtype in dtypes.items()}
+    size = 0
+
+    with metrics.span("load_arrays", query_file):
+        for columns, rows in stream_rows(query_file, params, chunksize=chunksize):
+            end = size + len(rows)
+
+            if end > capacity:
+                capacity = max(end, 2 * capacity)
+                for arr in arrays.values():
+                    arr.resize(capacity, refcheck=False)
+
+            for col, arr in arrays.items():
+                i = columns.index(col)
+                arr[size:end] = [row[i] for row in rows]
+
+            size = end
+
+    for arr in arrays.values():
+        arr.resize(size, refcheck=False)
+
+    return arrays
 
 
 def load_datas_from_csv(csv_file, condition=None):
@@ -61,14 +297,41 @@ def load_datas_from_csv(csv_file, condition=None):
     Returns:
         dataframe: 추출한 데이터
     """
-    df = pd.read_csv("./datas/" + csv_file)
+    with metrics.span("load_csv", csv_file):
+        df = pd.read_csv("./datas/" + csv_file)
 
-    if condition:
-        df.query(condition, inplace=True)
+        if condition:
+            df.query(condition, inplace=True)
 
     return df
 
 
+def load_indexed_datas_from_csv(
+    csv_file, key_col, key, range_col=None, start=None, end=None, include_end=True
+):
+    """csv에서 키에 해당하는 데이터만 조회.
+
+    최초 조회시 csv를 키 순으로 정렬된 컬럼 파일로 변환해두고
+    이후에는 해당 키의 구간만 읽는다.
+
+    Args:
+        csv_file (str): csv 파일
+        key_col (str): 조회키 컬럼명 (ex. device_id, house_no)
+        key (str): 조회키
+        range_col (str, optional): 구간 조회 컬럼명 (ex. collect_dd). Defaults to None.
+        start (optional): 구간 시작값(이상). Defaults to None.
+        end (optional): 구간 종료값. Defaults to None.
+        include_end (bool, optional): 종료값 포함여부. Defaults to True.
+
+    Returns:
+        dataframe: 추출한 데이터
+    """
+    with metrics.span("load_csv", csv_file):
+        table = columnar.get_table("./datas/" + csv_file, key_col, sort_col=range_col)
+
+        return table.select(key, start=start, end=end, include_end=include_end)
+
+
 # if __name__ == '__main__':
 #     with open_db_connection() as conn:
 #         print(conn)